@@ -36,6 +36,9 @@ app.conf.task_routes = {
     "billing.tasks.process_subscription_auto_renewals": {"queue": "billing"},
     "billing.tasks.sync_stripe_credit_balances": {"queue": "billing"},
     "billing.tasks.cleanup_webhook_event_logs": {"queue": "billing"},
+    "billing.tasks.refresh_billing_transaction_rollup": {"queue": "billing"},
+    "billing.tasks.generate_invoice_pdf": {"queue": "billing"},
+    "billing.tasks.record_refund_task": {"queue": "billing"},
 
 
     # Default queue
@@ -201,6 +204,11 @@ app.conf.beat_schedule = {
         "schedule": crontab(hour=4, minute=0),
         "options": {"queue": "billing"},
     },
+    "refresh_billing_transaction_rollup_daily": {
+        "task": "billing.tasks.refresh_billing_transaction_rollup",
+        "schedule": crontab(hour=4, minute=30),
+        "options": {"queue": "billing"},
+    },
 }
 
 
@@ -168,6 +168,18 @@ DATABASES = {
 }
 
 
+# Cache
+# Shared Redis cache when configured; falls back to Django's per-process local memory cache.
+REDIS_CACHE_URL = config('REDIS_CACHE_URL', default='')
+if REDIS_CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_CACHE_URL,
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -301,6 +313,11 @@ LOGGING = {
             'format': '{levelname} {message}',
             'style': '{',
         },
+        'billing_json': {
+            '()': 'billing.observability.logging.BillingJsonFormatter',
+            'format': '{levelname} {message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
@@ -320,6 +337,11 @@ LOGGING = {
             'filename': os.path.join(LOGS_DIR, 'celery.log'),
             'formatter': 'verbose',
         },
+        'billing_console': {
+            'level': 'INFO',
+            'class': 'logging.StreamHandler',
+            'formatter': 'billing_json',
+        },
     },
     'loggers': {
         'django': {
@@ -342,6 +364,12 @@ LOGGING = {
             'level': 'INFO',
             'propagate': True,
         },
+        # Structured billing events only; module loggers under billing.* keep the root handlers.
+        'billing.events': {
+            'handlers': ['billing_console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
     },
 }
 
@@ -651,6 +651,7 @@ class WorkspaceSubscriptionAdmin(admin.ModelAdmin):
     )
     list_filter = (
         "status",
+        "is_active",
         "auto_renew_enabled",
         "plan",
         "pending_plan",
@@ -725,7 +726,7 @@ class WorkspaceSubscriptionAdmin(admin.ModelAdmin):
 
     @admin.display(description="Active?", boolean=True)
     def is_active_display(self, obj):
-        return obj.is_active
+        return obj.has_active_status
 
 
 @admin.register(PlanChangeRequest)
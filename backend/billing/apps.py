@@ -2,7 +2,7 @@ import logging
 from decimal import Decimal
 from typing import Dict, List
 from django.apps import AppConfig
-from django.db.models.signals import post_migrate
+from django.db.models.signals import post_delete, post_migrate, post_save
 
 logger = logging.getLogger(__name__)
 
@@ -94,6 +94,13 @@ class BillingConfig(AppConfig):
         # Connect signal so plans are ensured after every migrate run
         post_migrate.connect(init_plans_after_migrate, sender=self)
 
+        # Keep the cached plan-name lookup in step with catalog edits
+        from .models import WorkspacePlan
+        from .services.plan_lookup import invalidate_plan_lookup
+
+        post_save.connect(invalidate_plan_lookup, sender=WorkspacePlan, dispatch_uid="billing_plan_lookup_save")
+        post_delete.connect(invalidate_plan_lookup, sender=WorkspacePlan, dispatch_uid="billing_plan_lookup_delete")
+
         # Ensure workspace plans are present during normal app start-up as well.
         # The helper already guards against database availability issues and will
         # skip duplicate work within the same process.
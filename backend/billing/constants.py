@@ -1,3 +1,32 @@
 """Shared billing constants."""
+from functools import lru_cache
+from types import MappingProxyType
 
 MANUAL_AUTORENEW_DISABLED_FLAG = "[MANUAL_AUTO_RENEW_DISABLED]"
+
+PLAN_KEY_OVERRIDES = MappingProxyType({
+    "free": "Free",
+    "basic": "Basic",
+    "pro": "Pro",
+    "enterprise": "Enterprise",
+})
+
+PLAN_LABEL_TO_KEY = MappingProxyType({label.lower(): key for key, label in PLAN_KEY_OVERRIDES.items()})
+
+
+@lru_cache(maxsize=256)
+def resolve_plan_name(key: str) -> str:
+    label = PLAN_KEY_OVERRIDES.get(key)
+    if label:
+        return label
+    return key.replace("_", " ").title()
+
+
+@lru_cache(maxsize=256)
+def resolve_plan_key(name: str) -> str:
+    normalized = (name or '').strip().lower()
+    if not normalized:
+        return normalized
+    if normalized in PLAN_LABEL_TO_KEY:
+        return PLAN_LABEL_TO_KEY[normalized]
+    return normalized.replace(' ', '_')
@@ -0,0 +1,69 @@
+"""Database helpers shared by billing services."""
+from __future__ import annotations
+
+import functools
+import time
+
+from django.db import OperationalError, connection, transaction
+
+SERIALIZATION_FAILURE = "40001"
+
+
+def _is_serialization_failure(exc: OperationalError) -> bool:
+    cause = exc.__cause__
+    return getattr(cause, "pgcode", None) == SERIALIZATION_FAILURE or getattr(cause, "sqlstate", None) == SERIALIZATION_FAILURE
+
+
+def serializable_atomic(func=None, *, max_attempts: int = 5, base_delay: float = 0.05):
+    """Run the decorated function in a SERIALIZABLE transaction, retrying on conflicts.
+
+    Meant for read-then-write paths where a concurrent writer could invalidate
+    what was read (write skew). When called inside an outer ``atomic`` block the
+    function simply joins it, since isolation can only be set on the outermost
+    transaction and a retry would have to replay the caller's work too.
+    """
+
+    def decorator(inner):
+        @functools.wraps(inner)
+        def wrapper(*args, **kwargs):
+            if connection.in_atomic_block:
+                with transaction.atomic():
+                    return inner(*args, **kwargs)
+
+            for attempt in range(1, max_attempts + 1):
+                try:
+                    with transaction.atomic():
+                        if connection.vendor == "postgresql":
+                            with connection.cursor() as cursor:
+                                cursor.execute("SET TRANSACTION ISOLATION LEVEL SERIALIZABLE")
+                        return inner(*args, **kwargs)
+                except OperationalError as exc:
+                    if attempt == max_attempts or not _is_serialization_failure(exc):
+                        raise
+                    time.sleep(base_delay * (2 ** (attempt - 1)))
+
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+def rebind_upserted_pks(objs, unique_field: str) -> None:
+    """Point ``objs`` at the primary keys actually stored after ``bulk_create(update_conflicts=True)``.
+
+    Django does not copy a returned primary key onto instances that already carry one,
+    so a row that lost the conflict to a concurrent insert would keep a client-side
+    UUID that was never written. Re-read the keys by ``unique_field`` before building
+    rows that reference these instances.
+    """
+
+    if not objs:
+        return
+    model = type(objs[0])
+    stored = dict(
+        model._default_manager.filter(**{f"{unique_field}__in": [getattr(obj, unique_field) for obj in objs]})
+        .values_list(unique_field, "pk")
+    )
+    for obj in objs:
+        obj.pk = stored[getattr(obj, unique_field)]
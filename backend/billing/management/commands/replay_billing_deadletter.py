@@ -37,7 +37,7 @@ class Command(BaseCommand):
         limit: Optional[int] = options.get("limit")
         dry_run: bool = options.get("dry_run")
 
-        queryset = BillingEventDeadLetter.objects.order_by("created_at")
+        queryset = BillingEventDeadLetter.all_fields.order_by("created_at")
         if event_ids:
             queryset = queryset.filter(event_id__in=list(event_ids))
 
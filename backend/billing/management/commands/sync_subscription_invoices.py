@@ -1,14 +1,17 @@
 """Management command to sync missing invoices for subscriptions."""
 from django.core.management.base import BaseCommand
-from django.db import transaction
 import stripe
 from billing.models import WorkspaceSubscription, InvoiceRecord
 from billing.services.stripe_payments import _configure_stripe
-from billing.services.payments import process_invoice_paid_event
+from billing.services.payments import process_invoice_paid_events
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Missing invoices are written this many at a time; a failed batch is retried one
+# invoice at a time so a single bad payload only costs its own invoice.
+WRITE_BATCH_SIZE = 100
+
 
 class Command(BaseCommand):
     help = "Sync missing invoices and transactions for active subscriptions"
@@ -42,7 +45,7 @@ class Command(BaseCommand):
         subscriptions = WorkspaceSubscription.objects.filter(
             status='active',
             stripe_subscription_id__isnull=False,
-        ).exclude(stripe_subscription_id='')
+        ).exclude(stripe_subscription_id='').select_related('billing_owner')
 
         if workspace_id:
             subscriptions = subscriptions.filter(workspace_id=workspace_id)
@@ -51,6 +54,7 @@ class Command(BaseCommand):
 
         synced_count = 0
         error_count = 0
+        pending = []
 
         for sub in subscriptions:
             try:
@@ -88,20 +92,9 @@ class Command(BaseCommand):
                     invoice_data = stripe.Invoice.retrieve(invoice_id)
                     invoice_dict = invoice_data.to_dict_recursive()
 
-                    # Get initiator from subscription's billing owner
-                    initiator = sub.billing_owner
-
-                    # Process the invoice
-                    with transaction.atomic():
-                        result = process_invoice_paid_event(invoice_dict, initiator=initiator)
-                        self.stdout.write(self.style.SUCCESS(
-                            f"  ✓ Created invoice {result.invoice.id}"
-                        ))
-                        if result.payment:
-                            self.stdout.write(self.style.SUCCESS(
-                                f"  ✓ Created payment {result.payment.id}"
-                            ))
-                        synced_count += 1
+                    # Queue with the subscription's billing owner as initiator; all
+                    # missing invoices are written together once Stripe has been read.
+                    pending.append((invoice_dict, sub.billing_owner))
                 else:
                     self.stdout.write("  (skipped - dry run)")
 
@@ -114,6 +107,11 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.ERROR(f"  ✗ Error: {e}"))
                 logger.error(f"Error syncing subscription {sub.id}: {e}", exc_info=True)
 
+        for start in range(0, len(pending), WRITE_BATCH_SIZE):
+            synced, errors = self._write_invoices(pending[start:start + WRITE_BATCH_SIZE])
+            synced_count += synced
+            error_count += errors
+
         self.stdout.write("\n" + "="*50)
         if dry_run:
             self.stdout.write(self.style.WARNING("DRY RUN COMPLETE"))
@@ -121,3 +119,27 @@ class Command(BaseCommand):
             self.stdout.write(self.style.SUCCESS(f"Synced {synced_count} invoices"))
         if error_count:
             self.stdout.write(self.style.ERROR(f"Encountered {error_count} errors"))
+
+    def _write_invoices(self, batch):
+        """Write ``batch`` in one transaction, falling back to one invoice at a time."""
+        try:
+            results = process_invoice_paid_events(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                invoice_id = batch[0][0].get('id')
+                self.stdout.write(self.style.ERROR(f"  ✗ Error writing invoice {invoice_id}: {e}"))
+                logger.error(f"Error writing synced invoice {invoice_id}: {e}", exc_info=True)
+                return 0, 1
+            logger.warning(f"Batch of {len(batch)} synced invoices failed, retrying one at a time: {e}")
+            synced_count = error_count = 0
+            for entry in batch:
+                synced, errors = self._write_invoices([entry])
+                synced_count += synced
+                error_count += errors
+            return synced_count, error_count
+
+        for result in results:
+            self.stdout.write(self.style.SUCCESS(f"  ✓ Created invoice {result.invoice.id}"))
+            if result.payment:
+                self.stdout.write(self.style.SUCCESS(f"  ✓ Created payment {result.payment.id}"))
+        return len(results), 0
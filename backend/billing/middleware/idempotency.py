@@ -3,9 +3,13 @@ from __future__ import annotations
 
 import hashlib
 import json
+from datetime import timedelta
 from typing import Iterable, Optional
 
+from django.core.cache import cache
+from django.db import transaction
 from django.http import JsonResponse
+from django.utils import timezone
 from django.utils.deprecation import MiddlewareMixin
 
 from billing.models import BillingIdempotencyKey
@@ -16,6 +20,51 @@ IDEMPOTENCY_REQUIRED_PATH_FRAGMENTS: tuple[str, ...] = (
     "/api/workspaces/",
 )
 
+IDEMPOTENCY_CACHE_PREFIX = "billing:idem:"
+IDEMPOTENCY_CACHE_TTL = 24 * 60 * 60
+# Short lease for in-flight requests so a crashed worker does not block retries for a day.
+IDEMPOTENCY_PENDING_TTL = 5 * 60
+
+
+def _cache_key(key: str) -> str:
+    return f"{IDEMPOTENCY_CACHE_PREFIX}{key}"
+
+
+def reserve_idempotency(key: str, request_hash: str) -> Optional[BillingIdempotencyKey]:
+    """Claim ``key`` for a new attempt, using the ``BillingIdempotencyKey`` row as the source of truth.
+
+    Returns ``None`` when the key was free (or its last attempt failed, or its pending
+    lease expired) and is now marked pending. Otherwise the stored row is returned
+    untouched so the caller can report why the request cannot run.
+    """
+    with transaction.atomic():
+        record, created = BillingIdempotencyKey.objects.get_or_create(
+            key=key,
+            defaults={
+                "request_hash": request_hash,
+                "scope": BillingIdempotencyKey.Scope.SYSTEM,
+                "last_result": BillingIdempotencyKey.LastResult.PENDING,
+                "metadata": {},
+            },
+        )
+        if created:
+            return None
+
+        # The row lock serialises concurrent retries of a failed attempt.
+        record = BillingIdempotencyKey.objects.select_for_update().get(pk=record.pk)
+        if record.request_hash != request_hash:
+            return record
+        if record.last_result == BillingIdempotencyKey.LastResult.SUCCESS:
+            return record
+        lease_expiry = record.last_seen_at + timedelta(seconds=IDEMPOTENCY_PENDING_TTL)
+        if record.last_result == BillingIdempotencyKey.LastResult.PENDING and lease_expiry > timezone.now():
+            return record
+
+        record.scope = BillingIdempotencyKey.Scope.SYSTEM
+        record.last_result = BillingIdempotencyKey.LastResult.PENDING
+        record.save(update_fields=["scope", "last_result", "last_seen_at"])
+        return None
+
 
 class BillingIdempotencyMiddleware(MiddlewareMixin):
     """Require Idempotency-Key for billing payment write operations."""
@@ -30,7 +79,7 @@ class BillingIdempotencyMiddleware(MiddlewareMixin):
 
     def process_request(self, request):
         if not self._requires_idempotency(request):
-            request._billing_idempotency_record = None  # type: ignore[attr-defined]
+            request._billing_idempotency_reservation = None  # type: ignore[attr-defined]
             return None
 
         key = request.headers.get("Idempotency-Key")
@@ -43,55 +92,71 @@ class BillingIdempotencyMiddleware(MiddlewareMixin):
 
         payload_hash = self._hash_request(request, key)
 
-        try:
-            record, created = BillingIdempotencyKey.objects.get_or_create(
-                key=key,
-                defaults={
-                    "request_hash": payload_hash,
-                    "scope": BillingIdempotencyKey.Scope.SYSTEM,
-                    "metadata": {},
-                },
-            )
-        except BillingIdempotencyKey.MultipleObjectsReturned:
-            # Should not happen under unique constraint but handle defensively.
-            return self._error_response(
-                status=409,
-                code="idempotency_conflict",
-                message="Conflicting idempotency keys detected.",
-            )
+        # Completed keys are final, so the cache can answer replays without a database
+        # round trip; anything else is decided against the database row.
+        cached = cache.get(_cache_key(key))
+        if cached is not None:
+            return self._rejection(cached["request_hash"], cached["last_result"], cached.get("response_code"), payload_hash)
+
+        record = reserve_idempotency(key, payload_hash)
+        if record is not None:
+            if record.last_result == BillingIdempotencyKey.LastResult.SUCCESS:
+                self._remember_success(key, record.request_hash, record.response_code)
+            return self._rejection(record.request_hash, record.last_result, record.response_code, payload_hash)
 
-        if not created and record.request_hash != payload_hash:
+        request._billing_idempotency_reservation = (key, payload_hash)  # type: ignore[attr-defined]
+        return None
+
+    def _rejection(self, stored_hash: str, last_result: str, response_code: Optional[int], payload_hash: str):
+        if stored_hash != payload_hash:
             return self._error_response(
                 status=409,
                 code="idempotency_conflict",
                 message="Idempotency-Key has been used with a different request payload.",
             )
 
-        if not created and record.last_result == BillingIdempotencyKey.LastResult.SUCCESS:
+        if last_result == BillingIdempotencyKey.LastResult.SUCCESS:
             return self._error_response(
                 status=409,
                 code="duplicate_request",
                 message="This request has already been processed successfully.",
-                details={"response_code": record.response_code},
+                details={"response_code": response_code},
             )
 
-        record.scope = BillingIdempotencyKey.Scope.SYSTEM
-        record.last_result = BillingIdempotencyKey.LastResult.PENDING
-        record.save(update_fields=["scope", "last_result", "last_seen_at"])
+        return self._error_response(
+            status=409,
+            code="idempotency_in_progress",
+            message="A request with this Idempotency-Key is still being processed.",
+        )
 
-        request._billing_idempotency_record = record  # type: ignore[attr-defined]
-        return None
+    @staticmethod
+    def _remember_success(key: str, request_hash: str, response_code: Optional[int]) -> None:
+        cache.set(
+            _cache_key(key),
+            {
+                "request_hash": request_hash,
+                "last_result": BillingIdempotencyKey.LastResult.SUCCESS,
+                "response_code": response_code,
+            },
+            IDEMPOTENCY_CACHE_TTL,
+        )
 
     def process_response(self, request, response):
-        record = getattr(request, "_billing_idempotency_record", None)
-        if record:
+        reservation = getattr(request, "_billing_idempotency_reservation", None)
+        if reservation:
+            key, payload_hash = reservation
             status_family = 200 <= response.status_code < 300
-            record.last_result = (
+            last_result = (
                 BillingIdempotencyKey.LastResult.SUCCESS if status_family
                 else BillingIdempotencyKey.LastResult.FAILURE
             )
-            record.response_code = response.status_code
-            record.save(update_fields=["last_result", "response_code", "last_seen_at"])
+            BillingIdempotencyKey.objects.filter(key=key).update(
+                last_result=last_result,
+                response_code=response.status_code,
+                last_seen_at=timezone.now(),
+            )
+            if status_family:
+                self._remember_success(key, payload_hash, response.status_code)
         return response
 
     @staticmethod
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:06
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0012_user_credit_transaction'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='creditaccount',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_customer_id'), name='credit_account_stripe_up_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_event_id'), name='credit_tx_event_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='credittransaction',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_transaction_id'), name='credit_tx_stripe_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tokentransaction',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_payment_id'), name='token_tx_stripe_pay_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userbillingprofile',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_customer_id'), name='user_profile_stripe_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercredittransaction',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_event_id'), name='user_credit_tx_event_up_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usercredittransaction',
+            index=models.Index(django.db.models.functions.text.Upper('stripe_transaction_id'), name='user_credit_tx_stripe_up_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0013_stripe_id_upper_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workspacesubscription',
+            name='is_active',
+            field=models.GeneratedField(db_persist=True, expression=models.ExpressionWrapper(models.Q(('status__in', ('active', 'trialing'))), output_field=models.BooleanField()), help_text='Whether the subscription is active (computed from status)', output_field=models.BooleanField()),
+        ),
+        migrations.AddIndex(
+            model_name='workspacesubscription',
+            index=models.Index(condition=models.Q(('current_period_end__isnull', False), ('is_active', True)), fields=['current_period_end'], name='ws_sub_renewal_due_idx'),
+        ),
+    ]
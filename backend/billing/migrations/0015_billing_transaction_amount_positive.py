@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0014_workspace_subscription_is_active_generated'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='billingtransaction',
+            constraint=models.CheckConstraint(condition=models.Q(('amount__gt', 0)), name='billing_tx_amount_positive'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0015_billing_transaction_amount_positive'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='billingtransaction',
+            index=models.Index(fields=['workspace', 'status', '-occurred_at'], include=('category', 'amount', 'currency'), name='billing_tx_ws_status_date_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:17
+
+from django.db import migrations, models
+
+
+ROLLUP_VIEW_SQL = """
+CREATE MATERIALIZED VIEW IF NOT EXISTS billing_transaction_daily_rollup AS
+SELECT
+    md5(concat_ws(':', workspace_id, category, direction, currency, date_trunc('day', occurred_at))) AS id,
+    workspace_id,
+    category,
+    direction,
+    currency,
+    date_trunc('day', occurred_at) AS day,
+    SUM(amount) AS total,
+    COUNT(*) AS n
+FROM billing_transaction
+WHERE archived_at IS NULL
+GROUP BY workspace_id, category, direction, currency, date_trunc('day', occurred_at)
+"""
+
+# REFRESH ... CONCURRENTLY requires a unique index on the view.
+ROLLUP_INDEX_SQL = """
+CREATE UNIQUE INDEX IF NOT EXISTS billing_tx_rollup_key
+ON billing_transaction_daily_rollup (workspace_id, category, direction, currency, day)
+"""
+
+
+def create_rollup_view(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(ROLLUP_VIEW_SQL)
+    schema_editor.execute(ROLLUP_INDEX_SQL)
+
+
+def drop_rollup_view(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP MATERIALIZED VIEW IF EXISTS billing_transaction_daily_rollup")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0016_billing_transaction_covering_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillingTransactionDailyRollup',
+            fields=[
+                ('id', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('category', models.CharField(choices=[('token_purchase', 'Token Purchase'), ('token_consume', 'Token Consumption'), ('subscription_invoice', 'Subscription Invoice'), ('credit_adjustment', 'Credit Adjustment'), ('payment', 'Payment'), ('refund', 'Refund'), ('manual', 'Manual Adjustment')], max_length=40)),
+                ('direction', models.CharField(choices=[('credit', 'Credit'), ('debit', 'Debit')], max_length=10)),
+                ('currency', models.CharField(max_length=3)),
+                ('day', models.DateTimeField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('n', models.PositiveIntegerField()),
+            ],
+            options={
+                'db_table': 'billing_transaction_daily_rollup',
+                'ordering': ['-day'],
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_rollup_view, drop_rollup_view),
+    ]
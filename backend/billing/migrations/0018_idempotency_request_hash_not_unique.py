@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0017_billing_transaction_daily_rollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billingidempotencykey',
+            name='request_hash',
+            field=models.CharField(help_text='Hash of method, path, and canonical payload.', max_length=64),
+        ),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+
+# The ledger is append-only and rows arrive in occurred_at order, so a BRIN
+# index gives block-range pruning for time-scoped scans at a fraction of the
+# size of a btree.
+OCCURRED_BRIN_SQL = """
+CREATE INDEX IF NOT EXISTS billing_tx_occurred_brin
+ON billing_transaction USING brin (occurred_at) WITH (pages_per_range = 32)
+"""
+
+
+def create_occurred_brin(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(OCCURRED_BRIN_SQL)
+
+
+def drop_occurred_brin(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS billing_tx_occurred_brin")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0018_idempotency_request_hash_not_unique'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_occurred_brin, drop_occurred_brin),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0019_billing_transaction_occurred_brin'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='billingtransaction',
+            name='billing_tx_ws_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='billingtransaction',
+            name='billing_tx_ws_status_date_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='invoicerecord',
+            name='billing_invoice_ws_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='paymentrecord',
+            name='billing_payment_ws_status_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='refundrecord',
+            name='billing_refund_ws_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='billingtransaction',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['workspace', '-occurred_at'], name='billing_tx_active_ws_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='billingtransaction',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['workspace', 'status', '-occurred_at'], include=('category', 'amount', 'currency'), name='billing_tx_ws_status_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='invoicerecord',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['workspace', 'status'], name='billing_invoice_active_ws_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentrecord',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['workspace', 'status'], name='billing_payment_active_ws_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='refundrecord',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['workspace', 'status'], name='billing_refund_active_ws_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+from django.db import migrations
+
+
+# jsonb_path_ops keeps the index small and serves @> containment lookups,
+# e.g. metadata @> '{"stripe_event_id": "evt_..."}'.
+METADATA_GIN_INDEXES = (
+    ("billing_tx_metadata_gin", "billing_transaction"),
+    ("billing_invoice_metadata_gin", "billing_invoice_record"),
+)
+
+
+def create_metadata_gin(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, table in METADATA_GIN_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} USING gin (metadata jsonb_path_ops)"
+        )
+
+
+def drop_metadata_gin(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _table in METADATA_GIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0020_ledger_active_partial_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_metadata_gin, drop_metadata_gin),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 13:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0021_ledger_metadata_gin'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='usercredittransaction',
+            name='user_credit_tx_event_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='usercredittransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('stripe_event_id__isnull', False)), fields=('stripe_event_id',), name='user_credit_transaction_event'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0022_user_credit_tx_event_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userbillingprofile',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Optimistic concurrency counter bumped on every ledger balance change.'),
+        ),
+    ]
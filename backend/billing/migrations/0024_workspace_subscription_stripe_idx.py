@@ -0,0 +1,60 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:24
+
+from django.db import migrations, models
+
+
+# Webhook traffic hits this table on every delivery, so the indexes are built
+# CONCURRENTLY on PostgreSQL to avoid blocking writes while they are created.
+STRIPE_REFERENCE_INDEXES = (
+    models.Index(
+        condition=models.Q(('stripe_subscription_id__isnull', False)),
+        fields=['stripe_subscription_id'],
+        name='ws_sub_stripe_sub_idx',
+    ),
+    models.Index(
+        condition=models.Q(('stripe_customer_id__isnull', False)),
+        fields=['stripe_customer_id'],
+        name='ws_sub_stripe_customer_idx',
+    ),
+)
+
+
+def create_stripe_reference_indexes(apps, schema_editor):
+    model = apps.get_model('billing', 'WorkspaceSubscription')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in STRIPE_REFERENCE_INDEXES:
+        if concurrently:
+            schema_editor.add_index(model, index, concurrently=True)
+        else:
+            schema_editor.add_index(model, index)
+
+
+def drop_stripe_reference_indexes(apps, schema_editor):
+    model = apps.get_model('billing', 'WorkspaceSubscription')
+    concurrently = schema_editor.connection.vendor == 'postgresql'
+    for index in STRIPE_REFERENCE_INDEXES:
+        if concurrently:
+            schema_editor.remove_index(model, index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('billing', '0023_user_billing_profile_version'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='workspacesubscription', index=index)
+                for index in STRIPE_REFERENCE_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_stripe_reference_indexes, drop_stripe_reference_indexes),
+            ],
+        ),
+    ]
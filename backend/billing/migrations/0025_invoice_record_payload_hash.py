@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-17 14:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0024_workspace_subscription_stripe_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoicerecord',
+            name='payload_hash',
+            field=models.CharField(blank=True, help_text='Digest of the last Stripe payload applied, used to skip identical redeliveries.', max_length=32),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0025_invoice_record_payload_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoicerecord',
+            name='pdf_failure',
+            field=models.CharField(blank=True, choices=[('not_found', 'Not found'), ('failed', 'Failed')], help_text='Outcome of the last failed background PDF generation, cleared once reported.', max_length=16),
+        ),
+        migrations.AddField(
+            model_name='invoicerecord',
+            name='pdf_failure_message',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.6 on 2026-10-17 15:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0026_invoice_record_pdf_failure'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='workspacesubscription',
+            name='ws_sub_renewal_due_idx',
+        ),
+        migrations.AddIndex(
+            model_name='workspacesubscription',
+            index=models.Index(condition=models.Q(('auto_renew_enabled', True), ('current_period_end__isnull', False)), fields=['current_period_end'], name='ws_sub_renewal_due_idx'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 """Billing models for credit/token accounting, webhook logging, and subscriptions."""
 import uuid
 from decimal import Decimal
+from functools import cached_property
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
@@ -8,8 +9,10 @@ from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
 from django.db.models import Q
+from django.db.models.functions import Upper
 from django.utils import timezone
 
+from billing.constants import resolve_plan_key
 from workspace.models import Workspace
 
 User = get_user_model()
@@ -20,6 +23,21 @@ def _default_currency() -> str:
     return getattr(settings, "STRIPE_CURRENCY", "aud").lower()
 
 
+class _DeferredFieldsManager(models.Manager):
+    """Default manager that leaves heavy JSON columns out of ``SELECT`` lists.
+
+    Models using it expose an ``all_fields`` manager for callers that need the
+    deferred columns on every row (retry workers, detail endpoints).
+    """
+
+    def __init__(self, *deferred_fields: str):
+        super().__init__()
+        self._deferred_fields = deferred_fields
+
+    def get_queryset(self):
+        return super().get_queryset().defer(*self._deferred_fields)
+
+
 class TokenAccount(models.Model):
     """Stores the token balance for either a user or a workspace."""
 
@@ -142,6 +160,10 @@ class TokenTransaction(models.Model):
                 name="unique_token_transaction_stripe_payment_id",
             ),
         ]
+        indexes = [
+            # Case-insensitive lookups (admin search, ``__iexact``) compare on UPPER().
+            models.Index(Upper("stripe_payment_id"), name="token_tx_stripe_pay_upper_idx"),
+        ]
 
     def save(self, *args, **kwargs):
         if self.pk and TokenTransaction.objects.filter(pk=self.pk).exists():
@@ -192,6 +214,10 @@ class UserBillingProfile(models.Model):
         default=Decimal("0.00"),
         help_text="Most recent Stripe-reported balance for reconciliation.",
     )
+    version = models.PositiveIntegerField(
+        default=0,
+        help_text="Optimistic concurrency counter bumped on every ledger balance change.",
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -200,6 +226,9 @@ class UserBillingProfile(models.Model):
         verbose_name = "User billing profile"
         verbose_name_plural = "User billing profiles"
         ordering = ["user__id"]
+        indexes = [
+            models.Index(Upper("stripe_customer_id"), name="user_profile_stripe_upper_idx"),
+        ]
 
     def __str__(self):
         return f"UserBillingProfile<{self.user_id}>"
@@ -260,6 +289,7 @@ class CreditAccount(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["stripe_customer_id"], name="credit_account_stripe_idx"),
+            models.Index(Upper("stripe_customer_id"), name="credit_account_stripe_up_idx"),
         ]
 
     def clean(self):
@@ -331,6 +361,9 @@ class CreditTransaction(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = _DeferredFieldsManager("metadata")
+    all_fields = models.Manager()
+
     class Meta:
         db_table = "billing_credit_transaction"
         verbose_name = "Credit transaction"
@@ -354,6 +387,8 @@ class CreditTransaction(models.Model):
         ]
         indexes = [
             models.Index(fields=["stripe_event_id"], name="credit_tx_event_idx"),
+            models.Index(Upper("stripe_event_id"), name="credit_tx_event_upper_idx"),
+            models.Index(Upper("stripe_transaction_id"), name="credit_tx_stripe_upper_idx"),
             models.Index(fields=["created_at"], name="credit_tx_created_idx"),
         ]
 
@@ -431,6 +466,9 @@ class UserCreditTransaction(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = _DeferredFieldsManager("metadata")
+    all_fields = models.Manager()
+
     class Meta:
         db_table = "billing_user_credit_transaction"
         verbose_name = "User credit transaction"
@@ -451,9 +489,15 @@ class UserCreditTransaction(models.Model):
                 condition=Q(stripe_transaction_id__isnull=False),
                 name="user_credit_transaction_stripe",
             ),
+            models.UniqueConstraint(
+                fields=["stripe_event_id"],
+                condition=Q(stripe_event_id__isnull=False),
+                name="user_credit_transaction_event",
+            ),
         ]
         indexes = [
-            models.Index(fields=["stripe_event_id"], name="user_credit_tx_event_idx"),
+            models.Index(Upper("stripe_event_id"), name="user_credit_tx_event_up_idx"),
+            models.Index(Upper("stripe_transaction_id"), name="user_credit_tx_stripe_up_idx"),
             models.Index(fields=["created_at"], name="user_credit_tx_created_idx"),
         ]
 
@@ -533,6 +577,24 @@ class WebhookEventLog(models.Model):
     def __str__(self):
         return f"WebhookEventLog<{self.event_id}:{self.status}>"
 
+    @classmethod
+    def record(cls, event, *, payload_hash: str = ""):
+        """Fetch or insert the log row for a Stripe event, deduplicated on ``event_id``.
+
+        Returns a ``(log_entry, created)`` tuple; callers can acknowledge the
+        webhook straight away when ``created`` is False and the entry is handled.
+        """
+        event_id = event["id"]
+        return cls.objects.get_or_create(
+            event_id=event_id,
+            defaults={
+                "event_type": event.get("type") or "",
+                "status": cls.Status.RECEIVED,
+                "payload_hash": payload_hash or "",
+                "idempotency_key": event_id,
+            },
+        )
+
 
 class BillingAuditLog(models.Model):
     """Structured audit log for key billing lifecycle events."""
@@ -567,6 +629,9 @@ class BillingAuditLog(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = _DeferredFieldsManager("details")
+    all_fields = models.Manager()
+
     class Meta:
         db_table = "billing_audit_log"
         verbose_name = "Billing audit log"
@@ -605,6 +670,9 @@ class BillingEventDeadLetter(models.Model):
     )
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = _DeferredFieldsManager("payload")
+    all_fields = models.Manager()
+
     class Meta:
         db_table = "billing_event_dead_letter"
         verbose_name = "Billing dead-letter event"
@@ -649,6 +717,16 @@ class WorkspacePlan(models.Model):
     def __str__(self):
         return f"WorkspacePlan<{self.name}>"
 
+    @cached_property
+    def key(self) -> str:
+        """Stable API key for the plan (``free``, ``pro``...), resolved once per instance."""
+        return resolve_plan_key(self.name)
+
+    @cached_property
+    def monthly_price_str(self) -> str:
+        """String form of ``monthly_price`` for API payloads, computed once per instance."""
+        return str(self.monthly_price)
+
 class WorkspaceSubscription(models.Model):
     """
     Workspace Subscription Management - Connects Workspace and WorkspacePlan
@@ -706,6 +784,7 @@ class WorkspaceSubscription(models.Model):
         default='active',
         help_text="Subscription status"
     )
+    ACTIVE_STATUSES = ('active', 'trialing')
 
     class RenewalStatus(models.TextChoices):
         NEVER = "never", "Never Attempted"
@@ -778,10 +857,40 @@ class WorkspaceSubscription(models.Model):
         help_text="Admin notes"
     )
 
-    @property
-    def is_active(self):
-        """Check if the subscription is active"""
-        return self.status in ['active', 'trialing']
+    # Stored generated column so "active" filters run in SQL. The instance value is
+    # only as fresh as the last save and cannot be read before the first one; use
+    # ``has_active_status`` for an in-memory status change.
+    is_active = models.GeneratedField(
+        expression=models.ExpressionWrapper(
+            Q(status__in=ACTIVE_STATUSES),
+            output_field=models.BooleanField(),
+        ),
+        output_field=models.BooleanField(),
+        db_persist=True,
+        help_text="Whether the subscription is active (computed from status)"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(
+                # Matches the auto-renewal scan, which also retries past-due subscriptions.
+                fields=['current_period_end'],
+                condition=Q(auto_renew_enabled=True, current_period_end__isnull=False),
+                name='ws_sub_renewal_due_idx',
+            ),
+            # Webhook handlers resolve workspaces by these Stripe references; free
+            # plans leave them NULL, so only rows that carry one are indexed.
+            models.Index(
+                fields=['stripe_subscription_id'],
+                condition=Q(stripe_subscription_id__isnull=False),
+                name='ws_sub_stripe_sub_idx',
+            ),
+            models.Index(
+                fields=['stripe_customer_id'],
+                condition=Q(stripe_customer_id__isnull=False),
+                name='ws_sub_stripe_customer_idx',
+            ),
+        ]
 
     @property
     def is_trial(self):
@@ -792,6 +901,11 @@ class WorkspaceSubscription(models.Model):
             return True
         return self.trial_end > timezone.now()
 
+    @property
+    def has_active_status(self):
+        """Whether ``status`` is active right now, without waiting for ``save()``."""
+        return self.status in self.ACTIVE_STATUSES
+
     @property
     def days_until_renewal(self):
         """Return days remaining until the current period ends."""
@@ -808,6 +922,8 @@ class WorkspaceSubscription(models.Model):
         Sync the workspace’s plan field and limits when saving a subscription
         """
         super().save(*args, **kwargs)
+        # The database computes is_active; mirror it so the instance is not stale
+        self.is_active = self.has_active_status
 
         # Create plan name mapping (WorkspacePlan.name -> workspace.plan)
         plan_name_mapping = {
@@ -954,6 +1070,39 @@ class PlanChangeRequest(models.Model):
 
 
 
+class BillingTransactionQuerySet(models.QuerySet):
+    """Query helpers for the unified billing ledger."""
+
+    def with_sources(self):
+        """Join every ledger source and actor so list serialization stays at one query."""
+
+        return self.select_related(
+            "token_transaction",
+            "credit_transaction",
+            "invoice",
+            "payment",
+            "refund",
+            "workspace",
+            "user",
+            "initiator",
+        )
+
+
+class _ActiveLedgerManager(models.Manager):
+    """Manager that hides soft-deleted ledger rows (``archived_at`` set).
+
+    Querying through it lets Postgres use the ``archived_at IS NULL`` partial
+    indexes declared on the ledger models.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(archived_at__isnull=True)
+
+
+class BillingTransactionActiveManager(_ActiveLedgerManager.from_queryset(BillingTransactionQuerySet)):
+    """Active-only ledger manager that keeps the ``with_sources()`` helper."""
+
+
 class BillingTransaction(models.Model):
     """Unified immutable transaction view across token, invoice, and refund ledgers."""
 
@@ -1085,17 +1234,31 @@ class BillingTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = BillingTransactionQuerySet.as_manager()
+    active_objects = BillingTransactionActiveManager()
+
     class Meta:
         db_table = "billing_transaction"
         verbose_name = "Billing transaction"
         verbose_name_plural = "Billing transactions"
         ordering = ["-occurred_at", "-created_at"]
         indexes = [
-            models.Index(fields=["workspace", "-occurred_at"], name="billing_tx_ws_date_idx"),
+            models.Index(
+                fields=["workspace", "-occurred_at"],
+                condition=Q(archived_at__isnull=True),
+                name="billing_tx_active_ws_date_idx",
+            ),
             models.Index(fields=["category"], name="billing_tx_category_idx"),
             models.Index(fields=["status"], name="billing_tx_status_idx"),
+            models.Index(
+                fields=["workspace", "status", "-occurred_at"],
+                name="billing_tx_ws_status_date_idx",
+                include=["category", "amount", "currency"],
+                condition=Q(archived_at__isnull=True),
+            ),
         ]
         constraints = [
+            models.CheckConstraint(check=Q(amount__gt=0), name="billing_tx_amount_positive"),
             models.CheckConstraint(
                 check=~Q(token_transaction__isnull=False, credit_transaction__isnull=False),
                 name="billing_tx_single_ledger_source",
@@ -1118,6 +1281,9 @@ class BillingTransaction(models.Model):
 
     def clean(self):
         super().clean()
+        self._check_invariants()
+
+    def _check_invariants(self):
         if self.currency:
             self.currency = self.currency.lower()
         if not self.occurred_at:
@@ -1125,14 +1291,59 @@ class BillingTransaction(models.Model):
         if self.amount is None or self.amount <= 0:
             raise ValidationError({"amount": "Amount must be greater than zero."})
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, skip_validation: bool = False, **kwargs):
+        # Only the invariants above are checked here; uniqueness and the ledger
+        # source rules are enforced by database constraints.
+        if not skip_validation:
+            self._check_invariants()
         return super().save(*args, **kwargs)
 
+    @classmethod
+    def normalize(cls, obj: "BillingTransaction") -> "BillingTransaction":
+        """Apply the save-time invariants to an unsaved instance and return it."""
+        obj._check_invariants()
+        return obj
+
+    @classmethod
+    def bulk_record(cls, objs, *, batch_size: int = 500):
+        """Insert many transactions with multi-row INSERTs instead of per-row saves."""
+        return cls.objects.bulk_create([cls.normalize(obj) for obj in objs], batch_size=batch_size)
+
     def __str__(self):
         return f"BillingTransaction<{self.category}:{self.amount} {self.currency}>"
 
 
+class BillingTransactionDailyRollup(models.Model):
+    """Read-only daily totals backed by the ``billing_transaction_daily_rollup`` materialized view.
+
+    The view exists on PostgreSQL only and is refreshed by
+    ``billing.tasks.refresh_billing_transaction_rollup``.
+    """
+
+    id = models.CharField(max_length=32, primary_key=True)
+    workspace = models.ForeignKey(
+        Workspace,
+        on_delete=models.DO_NOTHING,
+        null=True,
+        related_name="+",
+        db_constraint=False,
+    )
+    category = models.CharField(max_length=40, choices=BillingTransaction.Category.choices)
+    direction = models.CharField(max_length=10, choices=BillingTransaction.Direction.choices)
+    currency = models.CharField(max_length=3)
+    day = models.DateTimeField()
+    total = models.DecimalField(max_digits=14, decimal_places=2)
+    n = models.PositiveIntegerField()
+
+    class Meta:
+        managed = False
+        db_table = "billing_transaction_daily_rollup"
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"BillingTransactionDailyRollup<{self.workspace_id}:{self.category}:{self.day:%Y-%m-%d}>"
+
+
 class InvoiceRecord(models.Model):
     """Local cache of Stripe invoices with workspace scoping."""
 
@@ -1143,6 +1354,10 @@ class InvoiceRecord(models.Model):
         UNCOLLECTIBLE = "uncollectible", "Uncollectible"
         VOID = "void", "Void"
 
+    class PdfFailure(models.TextChoices):
+        NOT_FOUND = "not_found", "Not found"
+        FAILED = "failed", "Failed"
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     workspace = models.ForeignKey(
         Workspace,
@@ -1171,6 +1386,13 @@ class InvoiceRecord(models.Model):
         blank=True,
         help_text="Internal storage path used for proxying invoice PDFs.",
     )
+    pdf_failure = models.CharField(
+        max_length=16,
+        choices=PdfFailure.choices,
+        blank=True,
+        help_text="Outcome of the last failed background PDF generation, cleared once reported.",
+    )
+    pdf_failure_message = models.CharField(max_length=255, blank=True)
     issued_at = models.DateTimeField(null=True, blank=True)
     due_at = models.DateTimeField(null=True, blank=True)
     paid_at = models.DateTimeField(null=True, blank=True)
@@ -1178,29 +1400,45 @@ class InvoiceRecord(models.Model):
     last_payment_attempt_at = models.DateTimeField(null=True, blank=True)
     failure_reason = models.CharField(max_length=255, blank=True)
     metadata = models.JSONField(blank=True, null=True)
+    payload_hash = models.CharField(
+        max_length=32,
+        blank=True,
+        help_text="Digest of the last Stripe payload applied, used to skip identical redeliveries.",
+    )
     archived_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = models.Manager()
+    active_objects = _ActiveLedgerManager()
+
     class Meta:
         db_table = "billing_invoice_record"
         verbose_name = "Invoice record"
         verbose_name_plural = "Invoice records"
         ordering = ["-issued_at", "-created_at"]
         indexes = [
-            models.Index(fields=["workspace", "status"], name="billing_invoice_ws_status_idx"),
+            models.Index(
+                fields=["workspace", "status"],
+                condition=Q(archived_at__isnull=True),
+                name="billing_invoice_active_ws_idx",
+            ),
             models.Index(fields=["issued_at"], name="billing_invoice_issued_idx"),
         ]
 
     def clean(self):
         super().clean()
+        self._check_invariants()
+
+    def _check_invariants(self):
         if self.currency:
             self.currency = self.currency.lower()
         if self.amount_due is None:
             self.amount_due = Decimal("0.00")
 
-    def save(self, *args, **kwargs):
-        self.full_clean()
+    def save(self, *args, skip_validation: bool = False, **kwargs):
+        if not skip_validation:
+            self._check_invariants()
         return super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1262,13 +1500,20 @@ class PaymentRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = models.Manager()
+    active_objects = _ActiveLedgerManager()
+
     class Meta:
         db_table = "billing_payment_record"
         verbose_name = "Payment record"
         verbose_name_plural = "Payment records"
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["workspace", "status"], name="billing_payment_ws_status_idx"),
+            models.Index(
+                fields=["workspace", "status"],
+                condition=Q(archived_at__isnull=True),
+                name="billing_payment_active_ws_idx",
+            ),
             models.Index(fields=["retryable_until"], name="billing_payment_retry_idx"),
         ]
         constraints = [
@@ -1281,13 +1526,17 @@ class PaymentRecord(models.Model):
 
     def clean(self):
         super().clean()
+        self._check_invariants()
+
+    def _check_invariants(self):
         if self.currency:
             self.currency = self.currency.lower()
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, skip_validation: bool = False, **kwargs):
         if self.invoice_id and not self.workspace_id:
             self.workspace = self.invoice.workspace
-        self.full_clean()
+        if not skip_validation:
+            self._check_invariants()
         return super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1343,13 +1592,20 @@ class RefundRecord(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = models.Manager()
+    active_objects = _ActiveLedgerManager()
+
     class Meta:
         db_table = "billing_refund_record"
         verbose_name = "Refund record"
         verbose_name_plural = "Refund records"
         ordering = ["-created_at"]
         indexes = [
-            models.Index(fields=["workspace", "status"], name="billing_refund_ws_status_idx"),
+            models.Index(
+                fields=["workspace", "status"],
+                condition=Q(archived_at__isnull=True),
+                name="billing_refund_active_ws_idx",
+            ),
             models.Index(fields=["created_at"], name="billing_refund_created_idx"),
         ]
         constraints = [
@@ -1362,13 +1618,17 @@ class RefundRecord(models.Model):
 
     def clean(self):
         super().clean()
+        self._check_invariants()
+
+    def _check_invariants(self):
         if self.currency:
             self.currency = self.currency.lower()
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, skip_validation: bool = False, **kwargs):
         if self.payment_id and not self.workspace_id:
             self.workspace = self.payment.workspace
-        self.full_clean()
+        if not skip_validation:
+            self._check_invariants()
         return super().save(*args, **kwargs)
 
     def __str__(self):
@@ -1392,7 +1652,6 @@ class BillingIdempotencyKey(models.Model):
     key = models.CharField(max_length=255, unique=True)
     request_hash = models.CharField(
         max_length=64,
-        unique=True,
         help_text="Hash of method, path, and canonical payload.",
     )
     scope = models.CharField(max_length=20, choices=Scope.choices, default=Scope.SYSTEM)
@@ -1,14 +1,30 @@
 """Structured logging helper for billing endpoints."""
 from __future__ import annotations
 
+import json
 import logging
 from typing import Any, Dict, Optional
 
-logger = logging.getLogger("billing")
+logger = logging.getLogger("billing.events")
+
+
+class BillingJsonFormatter(logging.Formatter):
+    """Emit records carrying a ``billing`` payload as a single JSON line."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = getattr(record, "billing", None)
+        if payload is None:
+            return super().format(record)
+        return json.dumps(
+            {"level": record.levelname, "logger": record.name, **payload},
+            default=str,
+        )
 
 
 def log_billing_event(*, message: str, request_id: Optional[str] = None, workspace_id: Optional[str] = None,
                       actor: Optional[str] = None, extra: Optional[Dict[str, Any]] = None) -> None:
+    if not logger.isEnabledFor(logging.INFO):
+        return
     payload: Dict[str, Any] = {"message": message}
     if request_id:
         payload["request_id"] = request_id
@@ -18,4 +34,4 @@ def log_billing_event(*, message: str, request_id: Optional[str] = None, workspa
         payload["actor"] = actor
     if extra:
         payload.update(extra)
-    logger.info(payload)
+    logger.info(message, extra={"billing": payload})
@@ -1,6 +1,8 @@
 """Prometheus metrics helpers for billing domain."""
 from __future__ import annotations
 
+from functools import lru_cache
+
 from prometheus_client import Counter, Histogram
 
 BILLING_REQUEST_COUNT = Counter(
@@ -13,19 +15,20 @@ BILLING_REQUEST_LATENCY = Histogram(
     "billing_request_duration_seconds",
     "Latency of billing API requests",
     labelnames=("endpoint", "method"),
-    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5),
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2, 5),
 )
 
+# Payment counters are deliberately not labelled per workspace: tenant ids are
+# unbounded. Per-workspace attribution comes from the billing transaction tables.
 PAYMENT_SUCCESS_COUNT = Counter(
     "billing_payment_success_total",
     "Count of successful payment attempts",
-    labelnames=("workspace_id",),
 )
 
 PAYMENT_FAILURE_COUNT = Counter(
     "billing_payment_failure_total",
     "Count of failed payment attempts",
-    labelnames=("workspace_id", "reason"),
+    labelnames=("reason",),
 )
 
 WEBHOOK_BACKLOG = Counter(
@@ -33,3 +36,32 @@ WEBHOOK_BACKLOG = Counter(
     "Total dead-lettered Stripe webhook events",
     labelnames=("event_type",),
 )
+
+
+# ``.labels()`` hashes the label values and takes a lock on every call; the
+# helpers below resolve each child once and hand back the bound metric.
+
+@lru_cache(maxsize=None)
+def request_counter(endpoint: str, method: str, status: str):
+    return BILLING_REQUEST_COUNT.labels(endpoint=endpoint, method=method, status=status)
+
+
+@lru_cache(maxsize=None)
+def request_latency(endpoint: str, method: str):
+    return BILLING_REQUEST_LATENCY.labels(endpoint=endpoint, method=method)
+
+
+@lru_cache(maxsize=None)
+def payment_failure_counter(reason: str):
+    return PAYMENT_FAILURE_COUNT.labels(reason=reason)
+
+
+# (endpoint_label, method) pairs timed by the billing views; bound at import so
+# the series exist from the first scrape and lookups never miss the cache.
+KNOWN_ROUTES = (
+    ("payments.retry", "POST"),
+    ("payments.refund", "POST"),
+)
+
+for _endpoint, _method in KNOWN_ROUTES:
+    request_latency(_endpoint, _method)
@@ -1,7 +1,7 @@
 """Custom pagination classes for billing endpoints."""
 from __future__ import annotations
 
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class BoundedPageNumberPagination(PageNumberPagination):
@@ -10,3 +10,39 @@ class BoundedPageNumberPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = "page_size"
     max_page_size = 100
+
+
+class BillingCursorPagination(CursorPagination):
+    """Keyset pagination for billing ledgers, with a page-number fallback.
+
+    Clients opt in by sending the ``cursor`` parameter (``?cursor=`` for the
+    first page); requests without it keep the ``page``/``count`` contract of
+    :class:`BoundedPageNumberPagination`. Views may set ``cursor_ordering``
+    when their leading ordering column is nullable.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = ("-occurred_at", "-created_at", "-id")
+    fallback_class = BoundedPageNumberPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self._fallback = self.fallback_class()
+            return self._fallback.paginate_queryset(queryset, request, view)
+        self._fallback = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        return getattr(view, "cursor_ordering", self.ordering)
+
+    def get_paginated_response(self, data):
+        if self._fallback is not None:
+            return self._fallback.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self._fallback is not None:
+            return self._fallback.to_html()
+        return super().to_html()
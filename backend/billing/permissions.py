@@ -9,6 +9,7 @@ Defines four levels of permissions:
 """
 import logging
 from enum import Enum
+from functools import cached_property
 from typing import Optional
 
 from django.contrib.auth import get_user_model
@@ -30,6 +31,39 @@ class BillingPermissionLevel(Enum):
     MANAGE_BILLING = "manage_billing"   # Manage billing/plans
 
 
+# WorkspacePermission columns consulted by billing checks
+_BILLING_PERMISSION_FIELDS = (
+    "permissions__can_view_billing",
+    "permissions__can_update_token_balance",
+    "permissions__can_manage_billing",
+)
+
+# Billing capabilities packed into a bitmask so each level check is one AND
+PERM_VIEW_BILLING = 1 << 0
+PERM_MANAGE_TOKENS = 1 << 1
+PERM_MANAGE_BILLING = 1 << 2
+_ALL_BILLING_PERMS = PERM_VIEW_BILLING | PERM_MANAGE_TOKENS | PERM_MANAGE_BILLING
+
+_PERMISSION_MASKS = {
+    "can_view_billing": PERM_VIEW_BILLING,
+    "can_update_token_balance": PERM_MANAGE_TOKENS,
+    "can_manage_billing": PERM_MANAGE_BILLING,
+}
+
+_LEVEL_MASKS = {
+    BillingPermissionLevel.VIEW_BASIC: 0,  # Members can view basic info
+    BillingPermissionLevel.VIEW_BILLING: PERM_VIEW_BILLING,
+    BillingPermissionLevel.MANAGE_TOKENS: PERM_MANAGE_TOKENS,
+    BillingPermissionLevel.MANAGE_BILLING: PERM_MANAGE_BILLING,
+}
+
+_LEVEL_DESCRIPTIONS = {
+    BillingPermissionLevel.VIEW_BILLING: "view billing information",
+    BillingPermissionLevel.MANAGE_TOKENS: "manage token top-ups",
+    BillingPermissionLevel.MANAGE_BILLING: "manage billing and plans",
+}
+
+
 class WorkspaceBillingPermissions:
     """
     Workspace Billing Permission Checker
@@ -41,29 +75,57 @@ class WorkspaceBillingPermissions:
     def __init__(self, user: User, workspace: Workspace):
         self.user = user
         self.workspace = workspace
-        self._membership = None
 
-    @property
+    @cached_property
     def membership(self) -> Optional[Membership]:
-        """Get the user’s membership in the workspace"""
-        if self._membership is None:
-            try:
-                self._membership = Membership.objects.get(
+        """Get the user’s membership in the workspace (memoised per checker)"""
+        try:
+            # Join the permission overrides and load only what has_permission() reads
+            return (
+                Membership.objects.select_related("permissions")
+                .only("id", "role", "is_active", "custom_permissions", *_BILLING_PERMISSION_FIELDS)
+                .get(
                     workspace=self.workspace,
                     user=self.user,
                     is_active=True
                 )
-            except Membership.DoesNotExist:
-                self._membership = False  # Use False as a marker for non-existence
-        return self._membership if self._membership is not False else None
+            )
+        except Membership.DoesNotExist:
+            return None
+
+    @cached_property
+    def is_member_cached(self) -> bool:
+        return self.membership is not None
+
+    @cached_property
+    def is_owner_cached(self) -> bool:
+        return self.is_owner()
+
+    @cached_property
+    def permission_flags(self) -> int:
+        """Billing capabilities of the user, resolved once into a bitmask"""
+        # The owner always has all permissions
+        if self.is_owner_cached:
+            return _ALL_BILLING_PERMS
+
+        membership = self.membership
+        if not membership:
+            return 0
+
+        flags = 0
+        for permission_name, mask in _PERMISSION_MASKS.items():
+            if membership.has_permission(permission_name):
+                flags |= mask
+        return flags
 
     def is_member(self) -> bool:
         """Check whether the user is a workspace member"""
-        return self.membership is not None
+        return self.is_member_cached
 
     def is_owner(self) -> bool:
         """Check whether the user is the workspace owner"""
-        return self.workspace.owner == self.user
+        # Compare ids so the owner row never has to be loaded
+        return self.workspace.owner_id == self.user.pk
 
     def has_permission(self, permission_name: str) -> bool:
         """
@@ -75,8 +137,12 @@ class WorkspaceBillingPermissions:
         Returns:
             bool: Whether the user has the permission
         """
+        mask = _PERMISSION_MASKS.get(permission_name)
+        if mask is not None:
+            return self.permission_flags & mask != 0
+
         # The owner always has all permissions
-        if self.is_owner():
+        if self.is_owner_cached:
             return True
 
         # Check membership permissions
@@ -101,27 +167,13 @@ class WorkspaceBillingPermissions:
             raise NotAuthenticated("User not logged in")
 
         # Check whether the user is a workspace member
-        if not self.is_member():
+        if not self.is_member_cached:
             raise PermissionDenied("You are not a member of this workspace")
 
-        # Map required permission by level
-        permission_mapping = {
-            BillingPermissionLevel.VIEW_BASIC: None,  # Members can view basic info
-            BillingPermissionLevel.VIEW_BILLING: "can_view_billing",
-            BillingPermissionLevel.MANAGE_TOKENS: "can_update_token_balance",
-            BillingPermissionLevel.MANAGE_BILLING: "can_manage_billing",
-        }
-
-        required_permission = permission_mapping[level]
-
-        # If a specific permission is required, check it
-        if required_permission and not self.has_permission(required_permission):
-            permission_names = {
-                "can_view_billing": "view billing information",
-                "can_update_token_balance": "manage token top-ups",
-                "can_manage_billing": "manage billing and plans",
-            }
-            permission_desc = permission_names.get(required_permission, required_permission)
+        # If a specific permission is required, check its bit
+        required_mask = _LEVEL_MASKS[level]
+        if required_mask and not self.permission_flags & required_mask:
+            permission_desc = _LEVEL_DESCRIPTIONS[level]
             raise PermissionDenied(f"You do not have permission to {permission_desc}")
 
         logger.debug(
@@ -134,7 +186,8 @@ class WorkspaceBillingPermissions:
 def check_workspace_billing_permission(
     user: User,
     workspace_id: str,
-    level: BillingPermissionLevel
+    level: BillingPermissionLevel,
+    request=None,
 ) -> tuple[Workspace, WorkspaceBillingPermissions]:
     """
     Convenience function: check workspace billing permission
@@ -143,6 +196,8 @@ def check_workspace_billing_permission(
         user: User object
         workspace_id: Workspace ID
         level: Required permission level
+        request: Optional current request; repeated checks for the same
+            (user, workspace) within it reuse the loaded workspace and checker
 
     Returns:
         tuple: (workspace object, permission checker object)
@@ -152,12 +207,28 @@ def check_workspace_billing_permission(
         NotAuthenticated: User not logged in
         PermissionDenied: Insufficient permission
     """
+    cache = None
+    cache_key = (getattr(user, "pk", None), str(workspace_id))
+    if request is not None:
+        cache = getattr(request, "_billing_perm_cache", None)
+        if cache is None:
+            cache = {}
+            request._billing_perm_cache = cache
+        cached = cache.get(cache_key)
+        if cached is not None:
+            workspace, permissions = cached
+            # The checker memoises membership and flags, so this is a dict/bit test
+            permissions.check_permission(level)
+            return workspace, permissions
+
     try:
-        workspace = Workspace.objects.get(id=workspace_id)
+        workspace = Workspace.objects.select_related("owner").get(id=workspace_id)
     except Workspace.DoesNotExist:
         raise Workspace.DoesNotExist("Workspace does not exist")
 
     permissions = WorkspaceBillingPermissions(user, workspace)
+    if cache is not None:
+        cache[cache_key] = (workspace, permissions)
     permissions.check_permission(level)
 
     return workspace, permissions
@@ -178,7 +249,8 @@ def require_workspace_billing_permission(level: BillingPermissionLevel):
                 workspace, permissions = check_workspace_billing_permission(
                     user=request.user,
                     workspace_id=workspace_id,
-                    level=level
+                    level=level,
+                    request=request,
                 )
             except NotAuthenticated as exc:
                 return Response({"detail": str(exc)}, status=status.HTTP_401_UNAUTHORIZED)
@@ -2,12 +2,23 @@
 from __future__ import annotations
 
 from decimal import Decimal
+from functools import cached_property
+from types import MappingProxyType
 from typing import Any, Dict, Optional
 
+from django.db.models import Prefetch
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 from rest_framework.exceptions import NotAuthenticated, PermissionDenied
-
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
+
+from billing.constants import (  # noqa: F401 - plan helpers re-exported for existing imports
+    PLAN_KEY_OVERRIDES,
+    PLAN_LABEL_TO_KEY,
+    resolve_plan_key,
+    resolve_plan_name,
+)
 from billing.models import (
     BillingAuditLog,
     BillingTransaction,
@@ -20,8 +31,10 @@ from billing.models import (
     WorkspacePlan,
     WorkspaceSubscription,
     UserBillingProfile,
+    _default_currency,
 )
 from billing.permissions import BillingPermissionLevel, WorkspaceBillingPermissions
+from billing.services.plan_lookup import get_plan_by_name
 from billing.services.product_catalog import (
     CatalogConfigurationError,
     ProductNotFound,
@@ -31,6 +44,127 @@ from billing.services.product_catalog import (
 
 TOKEN_PURCHASE_MAX_QUANTITY = 10
 
+# Choice sets are fixed, so build them once rather than on every class/field copy
+PLAN_CHANGE_ACTION_CHOICES = ('cancel', 'confirm')
+PLAN_CHANGE_TIMING_CHOICES = tuple(choice[0] for choice in PlanChangeRequest.TIMING_CHOICES)
+BILLING_CYCLE_CHOICES = ("monthly", "yearly")
+
+# Static validation payloads; ValidationError copies them, so sharing is safe
+_ERR_TOKEN_ACCOUNT_CONTEXT_MISSING = {"non_field_errors": [_("Token account context is missing.")]}
+_ERR_TOKEN_ACCOUNT_NOT_OWNED = {"non_field_errors": [_("Token account does not belong to the user.")]}
+_ERR_PERMISSIONS_CONTEXT_MISSING = {"non_field_errors": [_("Workspace permissions context is missing.")]}
+_ERR_TOKEN_ACCOUNT_WORKSPACE_MISMATCH = {"non_field_errors": [_("Token account does not match workspace.")]}
+_ERR_INSUFFICIENT_TOKENS = {"amount": [_("Insufficient token balance.")]}
+_ERR_SUBSCRIPTION_CONTEXT_MISSING = {"non_field_errors": [_("Workspace subscription context is missing.")]}
+_ERR_CURRENT_PLAN_INVALID = {"non_field_errors": [_("Current subscription plan is invalid.")]}
+_ERR_ALREADY_ON_PLAN = {"target_plan": [_("Workspace is already on the requested plan.")]}
+_ERR_PLAN_UNAVAILABLE = {"target_plan": [_("Requested plan is not available.")]}
+
+
+# Columns read by the compact plan payloads (pending plan, plan change from/to)
+PLAN_PAYLOAD_FIELDS = ("id", "name", "monthly_price", "max_users", "max_storage_gb")
+
+
+def plan_payload_prefetch(lookup: str) -> Prefetch:
+    """Prefetch a plan relation loading only the columns the plan payloads read."""
+    return Prefetch(lookup, queryset=WorkspacePlan.objects.only(*PLAN_PAYLOAD_FIELDS))
+
+
+class EagerLoadingMixin:
+    """Let list views load a serializer's relations up front instead of per row."""
+
+    SELECT_RELATED: tuple[str, ...] = ()
+    PREFETCH_RELATED: tuple[str, ...] = ()
+    PLAN_PAYLOAD_RELATED: tuple[str, ...] = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.SELECT_RELATED:
+            queryset = queryset.select_related(*cls.SELECT_RELATED)
+        if cls.PREFETCH_RELATED:
+            queryset = queryset.prefetch_related(*cls.PREFETCH_RELATED)
+        if cls.PLAN_PAYLOAD_RELATED:
+            queryset = queryset.prefetch_related(*map(plan_payload_prefetch, cls.PLAN_PAYLOAD_RELATED))
+        return queryset
+
+
+def _user_payload(user) -> Optional[dict[str, object]]:
+    """Compact user reference shared by every billing payload."""
+    if user is None:
+        return None
+    return {
+        'id': str(user.id),
+        'username': user.username,
+        'email': user.email,
+    }
+
+
+def _plan_payload(plan: Optional[WorkspacePlan]) -> Optional[dict[str, object]]:
+    """Compact plan reference; plan FKs are either a loaded plan or ``None``."""
+    if plan is None:
+        return None
+    return {
+        'id': str(plan.id),
+        'key': plan.key,
+        'name': plan.name,
+        'monthly_price': plan.monthly_price_str,
+        'max_users': plan.max_users,
+        'max_storage_gb': plan.max_storage_gb,
+    }
+
+
+# Shared, immutable stand-in for rows without metadata
+_EMPTY_METADATA = MappingProxyType({})
+
+
+class MetadataField(serializers.JSONField):
+    """Read-only ledger metadata passed through as stored; empty or null becomes ``{}``."""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault("read_only", True)
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        return super().get_attribute(instance) or _EMPTY_METADATA
+
+    def to_representation(self, value):
+        return value
+
+
+class CachedReadableFieldsMixin:
+    """Build the readable field list once per bound serializer, not once per row.
+
+    DRF already constructs nested serializers once per parent; what remains per
+    row is regenerating ``_readable_fields`` for the parent and every nested
+    instance, which adds up on paginated lists.
+    """
+
+    @cached_property
+    def _readable_fields(self):
+        return [field for field in self.fields.values() if not field.write_only]
+
+
+class WorkspacePermissionsContextMixin:
+    """Resolve the ``workspace_permissions`` checker the view passes in context."""
+
+    _workspace_permissions: Optional[WorkspaceBillingPermissions] = None
+
+    def get_workspace_permissions(self) -> WorkspaceBillingPermissions:
+        if self._workspace_permissions is None:
+            permissions = self.context.get("workspace_permissions")
+            if not isinstance(permissions, WorkspaceBillingPermissions):
+                raise serializers.ValidationError(_ERR_PERMISSIONS_CONTEXT_MISSING)
+            self._workspace_permissions = permissions
+        return self._workspace_permissions
+
+    def require_workspace_permission(self, level: BillingPermissionLevel) -> WorkspaceBillingPermissions:
+        permissions = self.get_workspace_permissions()
+        try:
+            permissions.check_permission(level)
+        except PermissionDenied as exc:
+            raise PermissionDenied(detail=str(exc)) from exc
+        return permissions
+
 
 class BaseTokenAccountSerializer(serializers.Serializer):
     """Shared helpers for serializers that operate on a token account."""
@@ -38,7 +172,7 @@ class BaseTokenAccountSerializer(serializers.Serializer):
     def get_token_account(self) -> TokenAccount:
         account = self.context.get("token_account")
         if not isinstance(account, TokenAccount):
-            raise serializers.ValidationError({"non_field_errors": [_("Token account context is missing.")]})
+            raise serializers.ValidationError(_ERR_TOKEN_ACCOUNT_CONTEXT_MISSING)
         return account
 
     def ensure_authenticated(self) -> None:
@@ -71,30 +205,21 @@ class UserTokenPurchaseSerializer(BaseTokenPurchaseSerializer):
         request = self.context["request"]
         account = attrs["token_account"]
         if account.user != request.user:
-            raise serializers.ValidationError({"non_field_errors": [_("Token account does not belong to the user.")]})
+            raise serializers.ValidationError(_ERR_TOKEN_ACCOUNT_NOT_OWNED)
         return attrs
 
 
-class WorkspaceTokenPurchaseSerializer(BaseTokenPurchaseSerializer):
+class WorkspaceTokenPurchaseSerializer(WorkspacePermissionsContextMixin, BaseTokenPurchaseSerializer):
     """Token purchase request scoped to a workspace."""
 
-    def get_workspace_permissions(self) -> WorkspaceBillingPermissions:
-        permissions = self.context.get("workspace_permissions")
-        if not isinstance(permissions, WorkspaceBillingPermissions):
-            raise serializers.ValidationError({"non_field_errors": [_("Workspace permissions context is missing.")]})
-        return permissions
-
     def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        # Reject unauthorised callers before paying for catalog or balance checks
+        permissions = self.require_workspace_permission(BillingPermissionLevel.MANAGE_TOKENS)
         attrs = super().validate(attrs)
-        permissions = self.get_workspace_permissions()
-        try:
-            permissions.check_permission(BillingPermissionLevel.MANAGE_TOKENS)
-        except PermissionDenied as exc:
-            raise PermissionDenied(detail=str(exc)) from exc
 
         account = attrs["token_account"]
         if account.workspace != permissions.workspace:
-            raise serializers.ValidationError({"non_field_errors": [_("Token account does not match workspace.")]})
+            raise serializers.ValidationError(_ERR_TOKEN_ACCOUNT_WORKSPACE_MISMATCH)
         attrs["workspace"] = permissions.workspace
         return attrs
 
@@ -107,7 +232,7 @@ class BaseTokenConsumptionSerializer(BaseTokenAccountSerializer):
         attrs = super().validate(attrs)
         account = self.get_token_account()
         if account.balance < attrs["amount"]:
-            raise serializers.ValidationError({"amount": [_("Insufficient token balance.")]})
+            raise serializers.ValidationError(_ERR_INSUFFICIENT_TOKENS)
         attrs["token_account"] = account
         return attrs
 
@@ -121,61 +246,26 @@ class UserTokenConsumptionSerializer(BaseTokenConsumptionSerializer):
         request = self.context["request"]
         account = attrs["token_account"]
         if account.user != request.user:
-            raise serializers.ValidationError({"non_field_errors": [_("Token account does not belong to the user.")]})
+            raise serializers.ValidationError(_ERR_TOKEN_ACCOUNT_NOT_OWNED)
         return attrs
 
 
-class WorkspaceTokenConsumptionSerializer(BaseTokenConsumptionSerializer):
+class WorkspaceTokenConsumptionSerializer(WorkspacePermissionsContextMixin, BaseTokenConsumptionSerializer):
     """Token deduction billed to a workspace."""
 
-    def get_workspace_permissions(self) -> WorkspaceBillingPermissions:
-        permissions = self.context.get("workspace_permissions")
-        if not isinstance(permissions, WorkspaceBillingPermissions):
-            raise serializers.ValidationError({"non_field_errors": [_("Workspace permissions context is missing.")]})
-        return permissions
-
     def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        # Reject unauthorised callers before paying for catalog or balance checks
+        permissions = self.require_workspace_permission(BillingPermissionLevel.MANAGE_TOKENS)
         attrs = super().validate(attrs)
-        permissions = self.get_workspace_permissions()
-        try:
-            permissions.check_permission(BillingPermissionLevel.MANAGE_TOKENS)
-        except PermissionDenied as exc:
-            raise PermissionDenied(detail=str(exc)) from exc
 
         account = attrs["token_account"]
         if account.workspace != permissions.workspace:
-            raise serializers.ValidationError({"non_field_errors": [_("Token account does not match workspace.")]})
+            raise serializers.ValidationError(_ERR_TOKEN_ACCOUNT_WORKSPACE_MISMATCH)
         attrs["workspace"] = permissions.workspace
         return attrs
 
 
-PLAN_KEY_OVERRIDES = {
-    "free": "Free",
-    "basic": "Basic",
-    "pro": "Pro",
-    "enterprise": "Enterprise",
-}
-
-
-PLAN_LABEL_TO_KEY = {label.lower(): key for key, label in PLAN_KEY_OVERRIDES.items()}
-
-def resolve_plan_name(key: str) -> str:
-    label = PLAN_KEY_OVERRIDES.get(key)
-    if label:
-        return label
-    return key.replace("_", " ").title()
-
-
-def resolve_plan_key(name: str) -> str:
-    normalized = (name or '').strip().lower()
-    if not normalized:
-        return normalized
-    if normalized in PLAN_LABEL_TO_KEY:
-        return PLAN_LABEL_TO_KEY[normalized]
-    return normalized.replace(' ', '_')
-
-
-class WorkspacePlanSerializer(serializers.ModelSerializer):
+class WorkspacePlanSerializer(CachedReadableFieldsMixin, serializers.ModelSerializer):
     """Expose plan catalog details with a computed key and current flag."""
 
     key = serializers.SerializerMethodField()
@@ -196,21 +286,33 @@ class WorkspacePlanSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_key(self, obj: WorkspacePlan) -> str:
-        return resolve_plan_key(obj.name)
+        return obj.key
 
-    def get_is_current(self, obj: WorkspacePlan) -> bool:
+    @cached_property
+    def _current_plan_match(self) -> tuple[Optional[str], Optional[str]]:
+        # Context is fixed for the whole pass, so normalise it once rather than per plan
         current_plan_name = self.context.get('current_plan_name')
-        if isinstance(current_plan_name, str) and current_plan_name.lower() == obj.name.lower():
-            return True
         current_plan_key = self.context.get('current_plan_key')
-        if isinstance(current_plan_key, str):
-            return resolve_plan_key(obj.name) == current_plan_key.strip().lower()
+        return (
+            current_plan_name.lower() if isinstance(current_plan_name, str) else None,
+            current_plan_key.strip().lower() if isinstance(current_plan_key, str) else None,
+        )
+
+    def get_is_current(self, obj: WorkspacePlan) -> bool:
+        current_name, current_key = self._current_plan_match
+        if current_name is not None and current_name == obj.name.lower():
+            return True
+        if current_key is not None:
+            return obj.key == current_key
         return False
 
 
-class WorkspaceSubscriptionSerializer(serializers.ModelSerializer):
+class WorkspaceSubscriptionSerializer(CachedReadableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
     """Snapshot of a workspace subscription and its associated plan."""
 
+    SELECT_RELATED = ("plan", "billing_owner", "workspace")
+    PLAN_PAYLOAD_RELATED = ("pending_plan",)
+
     plan = WorkspacePlanSerializer(read_only=True)
     plan_key = serializers.SerializerMethodField()
     latest_invoice_message = serializers.SerializerMethodField()
@@ -248,52 +350,36 @@ class WorkspaceSubscriptionSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_plan_key(self, obj: WorkspaceSubscription) -> Optional[str]:
-        plan = getattr(obj, 'plan', None)
-        if not isinstance(plan, WorkspacePlan):
-            return None
-        return resolve_plan_key(plan.name)
+        plan = obj.plan
+        return None if plan is None else plan.key
 
     def get_latest_invoice_message(self, obj: WorkspaceSubscription) -> Optional[str]:
-        notes = getattr(obj, 'notes', '') or ''
-        for line in reversed(notes.splitlines()):
+        # Only the tail matters, so peel lines off the end instead of splitting them all
+        notes = (getattr(obj, 'notes', '') or '').rstrip()
+        while notes:
+            notes, _, line = notes.rpartition('\n')
             line = line.strip()
             if line:
                 return line
         return None
 
     def get_pending_plan(self, obj: WorkspaceSubscription) -> Optional[dict[str, object]]:
-        plan = getattr(obj, 'pending_plan', None)
-        if not isinstance(plan, WorkspacePlan):
-            return None
-        return {
-            'id': str(plan.id),
-            'key': resolve_plan_key(plan.name),
-            'name': plan.name,
-            'monthly_price': str(plan.monthly_price),
-            'max_users': plan.max_users,
-            'max_storage_gb': plan.max_storage_gb,
-        }
+        return _plan_payload(obj.pending_plan)
 
     def get_pending_plan_key(self, obj: WorkspaceSubscription) -> Optional[str]:
-        plan = getattr(obj, 'pending_plan', None)
-        if not isinstance(plan, WorkspacePlan):
-            return None
-        return resolve_plan_key(plan.name)
+        plan = obj.pending_plan
+        return None if plan is None else plan.key
 
     def get_billing_owner(self, obj: WorkspaceSubscription) -> Optional[dict[str, object]]:
-        owner = getattr(obj, 'billing_owner', None)
-        if not owner:
-            return None
-        return {
-            'id': str(owner.id),
-            'username': owner.username,
-            'email': owner.email,
-        }
+        return _user_payload(obj.billing_owner)
 
 
-class PlanChangeRequestSerializer(serializers.ModelSerializer):
+class PlanChangeRequestSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     """Representation for plan change request records."""
 
+    SELECT_RELATED = ("requested_by", "processed_by", "workspace")
+    PLAN_PAYLOAD_RELATED = ("from_plan", "to_plan")
+
     from_plan = serializers.SerializerMethodField()
     to_plan = serializers.SerializerMethodField()
     requested_by = serializers.SerializerMethodField()
@@ -318,40 +404,17 @@ class PlanChangeRequestSerializer(serializers.ModelSerializer):
         )
         read_only_fields = fields
 
-    @staticmethod
-    def _plan_payload(plan: Optional[WorkspacePlan]) -> Optional[dict[str, object]]:
-        if not isinstance(plan, WorkspacePlan):
-            return None
-        return {
-            'id': str(plan.id),
-            'key': resolve_plan_key(plan.name),
-            'name': plan.name,
-            'monthly_price': str(plan.monthly_price),
-            'max_users': plan.max_users,
-            'max_storage_gb': plan.max_storage_gb,
-        }
-
     def get_from_plan(self, obj: PlanChangeRequest) -> Optional[dict[str, object]]:
-        return self._plan_payload(obj.from_plan)
+        return _plan_payload(obj.from_plan)
 
     def get_to_plan(self, obj: PlanChangeRequest) -> Optional[dict[str, object]]:
-        return self._plan_payload(obj.to_plan)
-
-    @staticmethod
-    def _user_payload(user) -> Optional[dict[str, object]]:
-        if not user:
-            return None
-        return {
-            'id': str(getattr(user, 'id', '')),
-            'username': getattr(user, 'username', None),
-            'email': getattr(user, 'email', None),
-        }
+        return _plan_payload(obj.to_plan)
 
     def get_requested_by(self, obj: PlanChangeRequest) -> Optional[dict[str, object]]:
-        return self._user_payload(obj.requested_by)
+        return _user_payload(obj.requested_by)
 
     def get_processed_by(self, obj: PlanChangeRequest) -> Optional[dict[str, object]]:
-        return self._user_payload(obj.processed_by)
+        return _user_payload(obj.processed_by)
 
 
 class UserBillingProfileSerializer(serializers.ModelSerializer):
@@ -376,84 +439,65 @@ class UserBillingProfileSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_user(self, obj: UserBillingProfile) -> dict[str, object]:
-        user = obj.user
-        return {
-            "id": str(user.id),
-            "username": getattr(user, "username", None),
-            "email": getattr(user, "email", None),
-        }
+        return _user_payload(obj.user)
 
     def get_currency(self, obj: UserBillingProfile) -> str:
-        from billing.models import _default_currency  # Lazy import to reuse helper
-
         return _default_currency()
 
 
 class PlanChangeActionSerializer(serializers.Serializer):
     """Validate user actions to mutate plan change request state."""
 
-    action = serializers.ChoiceField(choices=('cancel', 'confirm'))
+    action = serializers.ChoiceField(choices=PLAN_CHANGE_ACTION_CHOICES)
     admin_notes = serializers.CharField(required=False, allow_blank=True)
 
 
-class WorkspacePlanChangeSerializer(serializers.Serializer):
+class WorkspacePlanChangeSerializer(WorkspacePermissionsContextMixin, serializers.Serializer):
     """Serializer for workspace plan upgrade/downgrade requests."""
 
     target_plan = serializers.CharField()
     effective_timing = serializers.ChoiceField(
-        choices=[choice[0] for choice in PlanChangeRequest.TIMING_CHOICES],
+        choices=PLAN_CHANGE_TIMING_CHOICES,
         required=False,
         allow_null=True,
     )
     effective_date = serializers.DateTimeField(required=False)
     reason = serializers.CharField(required=False, allow_blank=True)
     billing_cycle = serializers.ChoiceField(
-        choices=("monthly", "yearly"),
+        choices=BILLING_CYCLE_CHOICES,
         required=False,
         allow_null=True,
     )
 
-    def get_workspace_permissions(self) -> WorkspaceBillingPermissions:
-        permissions = self.context.get("workspace_permissions")
-        if not isinstance(permissions, WorkspaceBillingPermissions):
-            raise serializers.ValidationError({"non_field_errors": [_("Workspace permissions context is missing.")]})
-        return permissions
-
     def get_subscription(self) -> WorkspaceSubscription:
         subscription = self.context.get("subscription")
         if not isinstance(subscription, WorkspaceSubscription):
-            raise serializers.ValidationError({"non_field_errors": [_("Workspace subscription context is missing.")]})
+            raise serializers.ValidationError(_ERR_SUBSCRIPTION_CONTEXT_MISSING)
         return subscription
 
-    def validate_target_plan(self, value: str) -> str:
-        try:
-            get_workspace_plan_product(value)
-        except (ProductNotFound, CatalogConfigurationError) as exc:
-            raise serializers.ValidationError(str(exc)) from exc
-        return value
-
     def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
         attrs = super().validate(attrs)
-        permissions = self.get_workspace_permissions()
+        # Check permissions before the catalog lookup so denied callers cost nothing
+        self.require_workspace_permission(BillingPermissionLevel.MANAGE_BILLING)
         try:
-            permissions.check_permission(BillingPermissionLevel.MANAGE_BILLING)
-        except PermissionDenied as exc:
-            raise PermissionDenied(detail=str(exc)) from exc
+            get_workspace_plan_product(attrs["target_plan"])
+        except (ProductNotFound, CatalogConfigurationError) as exc:
+            raise serializers.ValidationError({"target_plan": [str(exc)]}) from exc
 
         subscription = self.get_subscription()
         current_plan = subscription.plan
-        if not isinstance(current_plan, WorkspacePlan):
-            raise serializers.ValidationError({"non_field_errors": [_("Current subscription plan is invalid.")]})
+        if current_plan is None:
+            raise serializers.ValidationError(_ERR_CURRENT_PLAN_INVALID)
 
         target_key = attrs["target_plan"]
         target_name = resolve_plan_name(target_key)
 
         if current_plan.name.lower() == target_name.lower():
-            raise serializers.ValidationError({"target_plan": [_("Workspace is already on the requested plan.")]})
+            raise serializers.ValidationError(_ERR_ALREADY_ON_PLAN)
 
-        target_plan_obj = WorkspacePlan.objects.filter(name__iexact=target_name).first()
+        target_plan_obj = get_plan_by_name(target_name)
         if not target_plan_obj:
-            raise serializers.ValidationError({"target_plan": [_("Requested plan is not available.")]})
+            raise serializers.ValidationError(_ERR_PLAN_UNAVAILABLE)
 
         attrs["subscription"] = subscription
         attrs["target_plan_obj"] = target_plan_obj
@@ -493,10 +537,11 @@ class WorkspacePlanChangeSerializer(serializers.Serializer):
         return "change"
 
 
-class BillingTransactionSerializer(serializers.ModelSerializer):
+class BillingTransactionSerializer(CachedReadableFieldsMixin, serializers.ModelSerializer):
     workspace_id = serializers.UUIDField(source="workspace.id", read_only=True)
     user_id = serializers.IntegerField(source="user.id", read_only=True)
     initiator = serializers.SerializerMethodField()
+    metadata = MetadataField()
 
     class Meta:
         model = BillingTransaction
@@ -519,19 +564,13 @@ class BillingTransactionSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_initiator(self, obj: BillingTransaction) -> Optional[dict[str, object]]:
-        user = getattr(obj, "initiator", None)
-        if not user:
-            return None
-        return {
-            'id': str(user.id),
-            'username': user.username,
-            'email': user.email,
-        }
+        return _user_payload(obj.initiator)
 
 
-class InvoiceRecordSerializer(serializers.ModelSerializer):
+class InvoiceRecordSerializer(CachedReadableFieldsMixin, serializers.ModelSerializer):
     workspace_id = serializers.UUIDField(source="workspace.id", read_only=True)
     initiator = serializers.SerializerMethodField()
+    metadata = MetadataField()
 
     class Meta:
         model = InvoiceRecord
@@ -559,20 +598,16 @@ class InvoiceRecordSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_initiator(self, obj: InvoiceRecord) -> Optional[dict[str, object]]:
-        user = getattr(obj, "initiator", None)
-        if not user:
-            return None
-        return {
-            'id': str(user.id),
-            'username': user.username,
-            'email': user.email,
-        }
+        return _user_payload(obj.initiator)
+
 
+class PaymentRecordSerializer(CachedReadableFieldsMixin, EagerLoadingMixin, serializers.ModelSerializer):
+    SELECT_RELATED = ("invoice", "invoice__workspace", "invoice__initiator", "initiator", "workspace")
 
-class PaymentRecordSerializer(serializers.ModelSerializer):
     workspace_id = serializers.UUIDField(source="workspace.id", read_only=True)
     invoice = InvoiceRecordSerializer(read_only=True)
     initiator = serializers.SerializerMethodField()
+    metadata = MetadataField()
 
     class Meta:
         model = PaymentRecord
@@ -597,32 +632,39 @@ class PaymentRecordSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_initiator(self, obj: PaymentRecord) -> Optional[dict[str, object]]:
-        user = getattr(obj, "initiator", None)
-        if not user:
-            return None
-        return {
-            'id': str(user.id),
-            'username': user.username,
-            'email': user.email,
-        }
+        return _user_payload(obj.initiator)
+
+    # Only the initiating user sees Stripe identifiers and raw metadata
+    PRIVATE_FIELDS = frozenset({"stripe_payment_intent_id", "stripe_charge_id", "idempotency_key"})
+
+    @cached_property
+    def _public_readable_fields(self):
+        return [field for field in self._readable_fields if field.field_name not in self.PRIVATE_FIELDS]
 
     def to_representation(self, instance: PaymentRecord) -> dict[str, Any]:
-        data = super().to_representation(instance)
         request = self.context.get("request")
-        if not request:
-            return data
-
-        initiator_id = getattr(instance.initiator, "id", None)
-        if initiator_id and initiator_id != getattr(request.user, "id", None):
-            data.pop("stripe_payment_intent_id", None)
-            data.pop("stripe_charge_id", None)
-            data.pop("idempotency_key", None)
-            data["metadata"] = {}
+        initiator_id = instance.initiator_id
+        if not request or not initiator_id or initiator_id == getattr(request.user, "id", None):
+            return super().to_representation(instance)
+
+        # Skip private fields up front instead of serialising and discarding them
+        data: dict[str, Any] = {}
+        for field in self._public_readable_fields:
+            if field.field_name == "metadata":
+                data["metadata"] = _EMPTY_METADATA
+                continue
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            data[field.field_name] = None if check_for_none is None else field.to_representation(attribute)
         return data
 
 
-class RefundRecordSerializer(serializers.ModelSerializer):
+class RefundRecordSerializer(CachedReadableFieldsMixin, serializers.ModelSerializer):
     workspace_id = serializers.UUIDField(source="workspace.id", read_only=True)
+    metadata = MetadataField()
 
     class Meta:
         model = RefundRecord
@@ -656,7 +698,7 @@ class PaymentRefundRequestSerializer(serializers.Serializer):
         return value
 
 
-class BillingAuditLogSerializer(serializers.ModelSerializer):
+class BillingAuditLogSerializer(CachedReadableFieldsMixin, serializers.ModelSerializer):
     workspace_id = serializers.UUIDField(source="workspace.id", read_only=True)
 
     class Meta:
@@ -674,7 +716,7 @@ class BillingAuditLogSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class WebhookEventLogSerializer(serializers.ModelSerializer):
+class WebhookEventLogSerializer(CachedReadableFieldsMixin, serializers.ModelSerializer):
     workspace_id = serializers.UUIDField(source="workspace.id", read_only=True)
 
     class Meta:
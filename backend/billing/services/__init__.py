@@ -1,7 +1,17 @@
 
 """Expose commonly used billing services."""
 
-from .invoice_pdf import resolve_invoice_pdf, InvoicePdfError, InvoicePdfNotFound, ResolvedInvoicePdf
+from .invoice_pdf import (
+    resolve_invoice_pdf,
+    resolve_invoice_pdf_sync,
+    find_stored_invoice_pdf,
+    ensure_invoice_pdf_async,
+    pop_invoice_pdf_failure,
+    record_invoice_pdf_failure,
+    InvoicePdfError,
+    InvoicePdfNotFound,
+    ResolvedInvoicePdf,
+)
 from .subscription_toggle import (
     set_auto_renew,
     AutoRenewToggleResult,
@@ -1,16 +1,25 @@
 """User credit ledger helpers with idempotent Stripe integrations."""
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
+from datetime import datetime, timedelta
 from decimal import ROUND_HALF_UP, Decimal
 from typing import Optional, Union
 
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F
 from django.utils import timezone
 
 from billing.models import UserBillingProfile, UserCreditTransaction
 
 TWO_PLACES = Decimal("0.01")
+_ZERO = Decimal("0.00")
+_HUNDRED = Decimal(100)
+MAX_BALANCE_WRITE_ATTEMPTS = 3
+BALANCE_RETRY_BACKOFF_SECONDS = 0.02
+# Replayed Stripe events inside this window do not rewrite unchanged sync markers.
+SYNC_MARKER_DEBOUNCE = timedelta(seconds=30)
 
 
 class CreditLedgerError(Exception):
@@ -25,6 +34,14 @@ class IdempotencyConflict(CreditLedgerError):
     """Raised when an idempotency key collides with different mutation semantic."""
 
 
+class BalanceWriteConflict(CreditLedgerError):
+    """Raised when concurrent writers keep moving the balance underneath a reconciliation."""
+
+
+class _StaleBalance(Exception):
+    """Internal signal used to roll back a ledger write whose profile version went stale."""
+
+
 @dataclass(frozen=True)
 class CreditLedgerResult:
     profile: UserBillingProfile
@@ -52,34 +69,28 @@ def apply_stripe_balance_delta(
         raise ValueError("stripe_customer_id is required.")
 
     normalized_balance = _from_stripe_minor_amount(new_balance_minor)
+    now = timezone.now()
 
-    with transaction.atomic():
-        profile = (
-            UserBillingProfile.objects.select_for_update()
-            .filter(stripe_customer_id=stripe_customer_id)
-            .first()
-        )
+    for attempt in range(MAX_BALANCE_WRITE_ATTEMPTS):
+        _wait_before_retry(attempt)
+        profile = UserBillingProfile.objects.filter(stripe_customer_id=stripe_customer_id).first()
         if profile is None:
             raise CreditAccountNotFound(f"No billing profile mapped to customer {stripe_customer_id}.")
 
+        # A replayed event reports the transaction it produced the first time, even when
+        # the balance has since moved back to the replayed value.
         existing = UserCreditTransaction.objects.filter(stripe_event_id=event_id).first()
-        if existing:
-            return CreditLedgerResult(
-                profile=profile,
-                transaction=existing,
-                created=False,
-                delta=existing.amount,
-            )
+        if existing is not None:
+            return CreditLedgerResult(profile=profile, transaction=existing, created=False, delta=existing.amount)
 
-        previous_balance = profile.credit_balance or Decimal("0.00")
+        previous_balance = profile.credit_balance or _ZERO
         delta = (normalized_balance - previous_balance).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
 
         if delta == 0:
-            _update_sync_markers(profile, normalized_balance)
-            profile.save(update_fields=["last_synced_at", "last_stripe_balance", "updated_at"])
-            return CreditLedgerResult(profile=profile, transaction=None, created=False, delta=Decimal("0.00"))
+            _update_sync_markers(profile, normalized_balance, now)
+            return CreditLedgerResult(profile=profile, transaction=None, created=False, delta=_ZERO)
 
-        transaction_record = UserCreditTransaction.objects.create(
+        transaction_record = UserCreditTransaction(
             profile=profile,
             amount=delta,
             type=UserCreditTransaction.TransactionType.SYNC,
@@ -89,13 +100,26 @@ def apply_stripe_balance_delta(
             description="Stripe customer.balance reconciliation delta",
             metadata=metadata or {},
         )
+        try:
+            with transaction.atomic():
+                existing = _record_ledger_movement(
+                    transaction_record, profile, delta, normalized_balance, now=now, stripe_event_id=event_id
+                )
+        except _StaleBalance:
+            continue
 
-        profile.credit_balance = previous_balance + delta
-        _update_sync_markers(profile, normalized_balance)
-        profile.save(update_fields=["credit_balance", "last_synced_at", "last_stripe_balance", "updated_at"])
+        if existing is not None:
+            return CreditLedgerResult(
+                profile=profile,
+                transaction=existing,
+                created=False,
+                delta=existing.amount,
+            )
 
         return CreditLedgerResult(profile=profile, transaction=transaction_record, created=True, delta=delta)
 
+    raise BalanceWriteConflict(f"Balance for customer {stripe_customer_id} changed during reconciliation.")
+
 
 def record_manual_adjustment(
     *,
@@ -114,41 +138,47 @@ def record_manual_adjustment(
     normalized_amount = _to_decimal_amount(amount)
     if normalized_amount == 0:
         raise ValueError("Adjustment amount must be non-zero.")
+    now = timezone.now()
 
-    with transaction.atomic():
-        locked_profile = UserBillingProfile.objects.select_for_update().get(pk=profile.pk)
-
-        if idempotency_key:
-            existing = UserCreditTransaction.objects.filter(idempotency_key=idempotency_key).first()
-            if existing:
-                _validate_idempotent(existing, locked_profile, normalized_amount)
-                return CreditLedgerResult(
-                    profile=locked_profile,
-                    transaction=existing,
-                    created=False,
-                    delta=existing.amount,
-                )
+    for attempt in range(MAX_BALANCE_WRITE_ATTEMPTS):
+        _wait_before_retry(attempt)
+        current_profile = UserBillingProfile.objects.get(pk=profile.pk)
 
         tx_type = UserCreditTransaction.TransactionType.MANUAL_ADJUSTMENT
-        transaction_record = UserCreditTransaction.objects.create(
-            profile=locked_profile,
+        transaction_record = UserCreditTransaction(
+            profile=current_profile,
             amount=normalized_amount,
             type=tx_type,
             idempotency_key=idempotency_key,
             description=reason or "",
             metadata=_merge_metadata(metadata, {"actor": actor} if actor else None),
         )
+        try:
+            with transaction.atomic():
+                existing = _record_ledger_movement(
+                    transaction_record, current_profile, normalized_amount, now=now, idempotency_key=idempotency_key
+                )
+        except _StaleBalance:
+            continue
 
-        locked_profile.credit_balance = (locked_profile.credit_balance or Decimal("0.00")) + normalized_amount
-        locked_profile.save(update_fields=["credit_balance", "updated_at"])
+        if existing is not None:
+            _validate_idempotent(existing, current_profile, normalized_amount)
+            return CreditLedgerResult(
+                profile=current_profile,
+                transaction=existing,
+                created=False,
+                delta=existing.amount,
+            )
 
         return CreditLedgerResult(
-            profile=locked_profile,
+            profile=current_profile,
             transaction=transaction_record,
             created=True,
             delta=normalized_amount,
         )
 
+    raise BalanceWriteConflict(f"Balance for billing profile {profile.pk} changed during adjustment.")
+
 
 def reconcile_balance(
     *,
@@ -160,40 +190,46 @@ def reconcile_balance(
     """Hard reconcile the local ledger to Stripe-reported balance."""
 
     normalized_balance = _from_stripe_minor_amount(stripe_balance_minor)
+    now = timezone.now()
 
-    with transaction.atomic():
-        locked_profile = UserBillingProfile.objects.select_for_update().get(pk=profile.pk)
+    for attempt in range(MAX_BALANCE_WRITE_ATTEMPTS):
+        _wait_before_retry(attempt)
+        current_profile = UserBillingProfile.objects.get(pk=profile.pk)
 
-        previous_balance = locked_profile.credit_balance or Decimal("0.00")
+        previous_balance = current_profile.credit_balance or _ZERO
         delta = (normalized_balance - previous_balance).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
 
         if delta == 0:
-            _update_sync_markers(locked_profile, normalized_balance)
-            locked_profile.save(update_fields=["last_synced_at", "last_stripe_balance", "updated_at"])
-            return CreditLedgerResult(profile=locked_profile, transaction=None, created=False, delta=Decimal("0.00"))
-
-        key = idempotency_key or f"reconcile:{locked_profile.id}:{timezone.now().date()}"
-        existing = UserCreditTransaction.objects.filter(idempotency_key=key).first()
-        if existing:
-            _validate_idempotent(existing, locked_profile, delta)
-            _update_sync_markers(locked_profile, normalized_balance)
-            locked_profile.save(update_fields=["last_synced_at", "last_stripe_balance", "updated_at"])
-            return CreditLedgerResult(profile=locked_profile, transaction=existing, created=False, delta=existing.amount)
-
-        transaction_record = UserCreditTransaction.objects.create(
-            profile=locked_profile,
+            _update_sync_markers(current_profile, normalized_balance, now)
+            return CreditLedgerResult(profile=current_profile, transaction=None, created=False, delta=_ZERO)
+
+        key = idempotency_key or f"reconcile:{current_profile.id}:{now.date()}"
+        transaction_record = UserCreditTransaction(
+            profile=current_profile,
             amount=delta,
             type=UserCreditTransaction.TransactionType.SYNC,
             idempotency_key=key,
             description="Stripe balance reconciliation adjustment",
             metadata=metadata or {},
         )
+        try:
+            with transaction.atomic():
+                existing = _record_ledger_movement(
+                    transaction_record, current_profile, delta, normalized_balance, now=now, idempotency_key=key
+                )
+        except _StaleBalance:
+            continue
 
-        locked_profile.credit_balance = previous_balance + delta
-        _update_sync_markers(locked_profile, normalized_balance)
-        locked_profile.save(update_fields=["credit_balance", "last_synced_at", "last_stripe_balance", "updated_at"])
+        if existing is not None:
+            _validate_idempotent(existing, current_profile, delta)
+            _update_sync_markers(current_profile, normalized_balance, now)
+            return CreditLedgerResult(
+                profile=current_profile, transaction=existing, created=False, delta=existing.amount
+            )
+
+        return CreditLedgerResult(profile=current_profile, transaction=transaction_record, created=True, delta=delta)
 
-        return CreditLedgerResult(profile=locked_profile, transaction=transaction_record, created=True, delta=delta)
+    raise BalanceWriteConflict(f"Balance for billing profile {profile.pk} changed during reconciliation.")
 
 
 def _validate_idempotent(
@@ -207,26 +243,148 @@ def _validate_idempotent(
         raise IdempotencyConflict("Existing transaction amount mismatch for idempotent request.")
 
 
-def _update_sync_markers(profile: UserBillingProfile, normalized_balance: Decimal) -> None:
-    profile.last_synced_at = timezone.now()
+def _record_ledger_movement(
+    transaction_record: UserCreditTransaction,
+    profile: UserBillingProfile,
+    delta: Decimal,
+    normalized_balance: Optional[Decimal] = None,
+    *,
+    now: datetime,
+    **conflict_lookup,
+) -> Optional[UserCreditTransaction]:
+    """Insert ``transaction_record`` and move the profile balance by ``delta``.
+
+    Returns ``None`` once both writes landed, or the transaction that already owns the
+    event id / idempotency key. Raises ``_StaleBalance`` when the profile version moved.
+    """
+
+    existing = _insert_ledger_row(transaction_record, **conflict_lookup)
+    if existing is None:
+        _apply_balance_delta(profile, delta, normalized_balance, now)
+    return existing
+
+
+def _insert_ledger_row(
+    transaction_record: UserCreditTransaction,
+    **conflict_lookup,
+) -> Optional[UserCreditTransaction]:
+    """Insert ``transaction_record`` and let the unique constraints enforce idempotency.
+
+    Returns ``None`` once the row is written, or the transaction that already owns the
+    event id / idempotency key. ``bulk_create`` skips the per-constraint lookups that
+    ``full_clean`` would otherwise run ahead of the INSERT.
+    """
+
+    try:
+        with transaction.atomic():
+            UserCreditTransaction.objects.bulk_create([transaction_record])
+    except IntegrityError:
+        if not any(conflict_lookup.values()):
+            raise
+        existing = UserCreditTransaction.objects.filter(**conflict_lookup).first()
+        if existing is None:
+            raise
+        return existing
+    return None
+
+
+def _apply_balance_delta(
+    profile: UserBillingProfile,
+    delta: Decimal,
+    normalized_balance: Optional[Decimal],
+    now: datetime,
+) -> None:
+    """Move ``credit_balance`` by ``delta`` with one version-guarded UPDATE.
+
+    The write only lands while the stored ``version`` still matches the one read into
+    ``profile``; otherwise ``_StaleBalance`` is raised so the caller rolls back and retries.
+    Passing ``normalized_balance`` also refreshes the Stripe sync markers.
+    """
+
+    changes = {
+        "credit_balance": F("credit_balance") + delta,
+        "version": F("version") + 1,
+        "updated_at": now,
+    }
+    if normalized_balance is not None:
+        changes["last_stripe_balance"] = normalized_balance
+        changes["last_synced_at"] = now
+
+    updated = UserBillingProfile.objects.filter(pk=profile.pk, version=profile.version).update(**changes)
+    if not updated:
+        raise _StaleBalance()
+
+    _mark_balance_applied(profile, delta, normalized_balance, now)
+
+
+def _mark_balance_applied(
+    profile: UserBillingProfile,
+    delta: Decimal,
+    normalized_balance: Optional[Decimal],
+    now: datetime,
+) -> None:
+    profile.credit_balance = (profile.credit_balance or _ZERO) + delta
+    profile.version += 1
+    profile.updated_at = now
+    if normalized_balance is not None:
+        profile.last_stripe_balance = normalized_balance
+        profile.last_synced_at = now
+
+
+def _wait_before_retry(attempt: int) -> None:
+    if attempt:
+        time.sleep(BALANCE_RETRY_BACKOFF_SECONDS * 2 ** (attempt - 1))
+
+
+def _update_sync_markers(profile: UserBillingProfile, normalized_balance: Decimal, now: datetime) -> None:
+    """Persist the sync markers with a single autocommit UPDATE; no row lock is taken."""
+
+    if (
+        profile.last_synced_at is not None
+        and now - profile.last_synced_at < SYNC_MARKER_DEBOUNCE
+        and profile.last_stripe_balance == normalized_balance
+    ):
+        return
+
+    UserBillingProfile.objects.filter(pk=profile.pk).update(
+        last_synced_at=now,
+        last_stripe_balance=normalized_balance,
+        updated_at=now,
+    )
+    profile.last_synced_at = now
     profile.last_stripe_balance = normalized_balance
+    profile.updated_at = now
 
 
 def _from_stripe_minor_amount(value: Union[int, str, Decimal]) -> Decimal:
-    decimal_value = Decimal(str(value))
-    return (decimal_value / Decimal("100")).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+    return (_coerce_decimal(value) / _HUNDRED).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
 
 
 def _to_decimal_amount(value: Union[int, str, Decimal]) -> Decimal:
-    decimal_value = Decimal(str(value))
-    return decimal_value.quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+    return _coerce_decimal(value).quantize(TWO_PLACES, rounding=ROUND_HALF_UP)
+
+
+def _coerce_decimal(value: Union[int, str, Decimal]) -> Decimal:
+    # Integers and Decimals convert exactly; only other inputs (str, float) need
+    # the ``str()`` round-trip to avoid binary float artefacts.
+    if isinstance(value, Decimal):
+        return value
+    if isinstance(value, int):
+        return Decimal(value)
+    return Decimal(str(value))
 
 
 def _merge_metadata(base: Optional[dict], extra: Optional[dict]) -> Optional[dict]:
-    if not base and not extra:
-        return None
-    merged = dict(base or {})
+    filtered = None
     if extra:
-        merged.update({k: v for k, v in extra.items() if v is not None})
-    return merged
+        for key, value in extra.items():
+            if value is None:
+                continue
+            if filtered is None:
+                filtered = {}
+            filtered[key] = value
+
+    if filtered is None:
+        return base or None
+    return {**base, **filtered} if base else filtered
 
@@ -3,20 +3,28 @@ Utilities for resolving and streaming invoice PDFs.
 """
 from __future__ import annotations
 
+import inspect
 import logging
 import os
 import re
+import shutil
+import time
 from dataclasses import dataclass
-from io import BytesIO
+from functools import lru_cache
+from tempfile import SpooledTemporaryFile
 from typing import Iterable, Optional
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
-from django.core.files.base import ContentFile
-from django.core.files.storage import default_storage
+from django.core.cache import cache
+from django.core.files.base import ContentFile, File
+from django.core.files.storage import default_storage, storages
 
 from decimal import Decimal
 from billing.models import InvoiceRecord
+from workspace.models import Workspace
 from billing.services.stripe_payments import retrieve_invoice, StripeServiceError, StripeInvoiceNotFound
 
 logger = logging.getLogger(__name__)
@@ -25,6 +33,56 @@ DEFAULT_STORAGE_PREFIX = getattr(
     settings, "BILLING_INVOICE_PDF_PREFIX", "billing/invoices"
 )
 MAX_PDF_BYTES = getattr(settings, "BILLING_INVOICE_PDF_MAX_BYTES", 10 * 1024 * 1024)
+# Downloads stay in memory up to this size before spilling to a temporary file.
+PDF_SPOOL_MAX_MEMORY = 1024 * 1024
+# Only this much of a non-PDF response is decoded for the HTML fallback link; Stripe
+# places the PDF href near the top of the document.
+HTML_SCAN_BYTES = 128 * 1024
+# A queued PDF build suppresses further enqueues from download polls for this long.
+PDF_QUEUE_TTL = 300
+# ``_looks_like_pdf`` never inspects more than this many leading bytes.
+PDF_MAGIC_SCAN_BYTES = 8
+# Stored PDFs are written once per path, so their sizes can be memoised briefly.
+STORAGE_SIZE_CACHE_TTL = 60
+STORAGE_SIZE_CACHE_MAX_ENTRIES = 1024
+_storage_size_cache: dict[str, tuple[float, int]] = {}
+# Lifetime of pre-signed download URLs on object storage backends.
+SIGNED_URL_TTL_SECONDS = 300
+
+_PDF_LINK_RE = re.compile(r'href="(?P<link>https://(?:invoice|pay)\.stripe\.com/[^"]+pdf[^"]*)"')
+
+
+def _build_http_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=50,
+        max_retries=Retry(total=2, backoff_factor=0.2),
+    )
+    session.mount("https://", adapter)
+    return session
+
+
+# Shared across downloads so connections to Stripe's invoice hosts are pooled.
+_HTTP = _build_http_session()
+
+# Placeholder PDF objects that never change between invoices; only the content
+# stream (object 4) is rendered per call.
+_PDF_HEADER = b"%PDF-1.4\n"
+_STATIC_OBJ1 = b"1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n"
+_STATIC_OBJ2 = b"2 0 obj << /Type /Pages /Count 1 /Kids [3 0 R] >> endobj\n"
+_STATIC_OBJ3 = (
+    b"3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+    b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >> endobj\n"
+)
+_STATIC_OBJ5 = b"5 0 obj << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> endobj\n"
+_OBJ4_TRAILER = b"\nendstream\nendobj\n"
+_PDF_PRELUDE = _PDF_HEADER + _STATIC_OBJ1 + _STATIC_OBJ2 + _STATIC_OBJ3
+_PRELUDE_OFFSETS = (
+    len(_PDF_HEADER),
+    len(_PDF_HEADER) + len(_STATIC_OBJ1),
+    len(_PDF_HEADER) + len(_STATIC_OBJ1) + len(_STATIC_OBJ2),
+)
 
 
 class InvoicePdfError(RuntimeError):
@@ -41,6 +99,7 @@ class ResolvedInvoicePdf:
     filename: str
     size: Optional[int]
     is_absolute: bool = False
+    signed_url: Optional[str] = None
 
 
 def _guess_pdf_storage_path(invoice: InvoiceRecord) -> str:
@@ -49,48 +108,117 @@ def _guess_pdf_storage_path(invoice: InvoiceRecord) -> str:
     return os.path.join(DEFAULT_STORAGE_PREFIX, f"{suffix}.pdf")
 
 
-def _store_pdf_bytes(path: str, content: bytes) -> str:
+def _store_pdf_file(path: str, content: File) -> str:
     if os.path.isabs(path):
         os.makedirs(os.path.dirname(path), exist_ok=True)
+        content.seek(0)
         with open(path, "wb") as target:
-            target.write(content)
+            shutil.copyfileobj(content, target)
         return path
 
     try:
-        saved_path = default_storage.save(path, ContentFile(content))
+        saved_path = default_storage.save(path, content)
     except Exception as exc:  # pragma: no cover - storage backend specific failures
         raise InvoicePdfError(f"Failed to persist invoice PDF: {exc}") from exc
     return saved_path
 
 
+def _stored_pdf_size(path: str) -> Optional[int]:
+    """Return the stored file size, or ``None`` when the object is missing.
+
+    A single ``size()`` call doubles as the existence check, which saves a metadata
+    round trip on remote storage backends.
+    """
+
+    now = time.monotonic()
+    cached = _storage_size_cache.get(path)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+
+    try:
+        size = default_storage.size(path)
+    except OSError:
+        _storage_size_cache.pop(path, None)
+        return None
+
+    if len(_storage_size_cache) >= STORAGE_SIZE_CACHE_MAX_ENTRIES:
+        _storage_size_cache.clear()
+    _storage_size_cache[path] = (now + STORAGE_SIZE_CACHE_TTL, size)
+    return size
+
+
+@lru_cache(maxsize=None)
+def _storage_supports_expiring_urls(storage_class: type) -> bool:
+    try:
+        return "expire" in inspect.signature(storage_class.url).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+def _signed_storage_url(path: str) -> Optional[str]:
+    """Return a short-lived pre-signed URL when the storage backend can mint one (S3/GCS)."""
+
+    if not _storage_supports_expiring_urls(type(storages["default"])):
+        return None
+    try:
+        return default_storage.url(path, expire=SIGNED_URL_TTL_SECONDS)
+    except Exception as exc:  # pragma: no cover - storage backend specific failures
+        logger.warning("Unable to sign invoice PDF url for %s: %s", path, exc)
+        return None
+
+
 def _is_pdf_response(headers: dict[str, str]) -> bool:
     content_type = headers.get("Content-Type") or ""
     return "pdf" in content_type.lower()
 
 
-def _read_response_bytes(response: requests.Response) -> bytes:
-    chunks: list[bytes] = []
+def _read_response_file(response: requests.Response) -> File:
+    """Spool the response body so large PDFs never sit in memory as one ``bytes``."""
+
+    spool = SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_MEMORY)
     total = 0
-    for chunk in response.iter_content(chunk_size=1024 * 256):
-        if not chunk:
-            continue
-        total += len(chunk)
-        if total > MAX_PDF_BYTES:
-            raise InvoicePdfError("Stripe invoice PDF exceeds allowed size.")
-        chunks.append(chunk)
-    return b"".join(chunks)
+    try:
+        for chunk in response.iter_content(chunk_size=1024 * 256):
+            if not chunk:
+                continue
+            total += len(chunk)
+            if total > MAX_PDF_BYTES:
+                raise InvoicePdfError("Stripe invoice PDF exceeds allowed size.")
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    payload = File(spool)
+    payload.size = total
+    return payload
+
+
+def _read_head(payload: File, size: int) -> bytes:
+    head = payload.read(size)
+    payload.seek(0)
+    return head
 
 
 def _looks_like_pdf(payload: bytes) -> bool:
-    head = payload.lstrip()[:4]
-    return head == b"%PDF"
+    # Only a few leading whitespace bytes are tolerated; never strip the whole payload.
+    return payload[:PDF_MAGIC_SCAN_BYTES].lstrip()[:4] == b"%PDF"
 
 
 def _escape_pdf_text(value: str) -> str:
     return value.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
 
 
+def _ensure_workspace_loaded(invoice: InvoiceRecord) -> None:
+    """Populate ``invoice.workspace`` with a narrow query when the caller did not select it."""
+
+    if invoice.workspace_id is None or InvoiceRecord.workspace.is_cached(invoice):
+        return
+    invoice.workspace = Workspace.objects.only("id", "name").get(pk=invoice.workspace_id)
+
+
 def _build_placeholder_pdf(invoice: InvoiceRecord, invoice_data: dict) -> bytes:
+    _ensure_workspace_loaded(invoice)
     metadata = invoice_data.get("metadata") or {}
     currency = (invoice.currency or "aud").upper()
     amount = invoice.total_amount or Decimal("0.00")
@@ -121,41 +249,29 @@ def _build_placeholder_pdf(invoice: InvoiceRecord, invoice_data: dict) -> bytes:
     content_stream = "\n".join(content_commands)
     stream_bytes = content_stream.encode("utf-8")
 
-    buffer = BytesIO()
-    buffer.write(b"%PDF-1.4\n")
-    offsets = []
-
-    def write_obj(obj: str) -> None:
-        offsets.append(buffer.tell())
-        buffer.write(obj.encode("utf-8"))
-
-    write_obj("1 0 obj << /Type /Catalog /Pages 2 0 R >> endobj\n")
-    write_obj("2 0 obj << /Type /Pages /Count 1 /Kids [3 0 R] >> endobj\n")
-    write_obj(
-        "3 0 obj << /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
-        "/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >> endobj\n"
-    )
-    write_obj(f"4 0 obj << /Length {len(stream_bytes)} >> stream\n{content_stream}\nendstream\nendobj\n")
-    write_obj("5 0 obj << /Type /Font /Subtype /Type1 /BaseFont /Helvetica >> endobj\n")
-
-    xref_offset = buffer.tell()
-    buffer.write(b"xref\n")
-    buffer.write(f"0 {len(offsets)+1}\n".encode("utf-8"))
-    buffer.write(b"0000000000 65535 f \n")
+    object4 = f"4 0 obj << /Length {len(stream_bytes)} >> stream\n".encode("utf-8")
+    object4_offset = len(_PDF_PRELUDE)
+    object5_offset = object4_offset + len(object4) + len(stream_bytes) + len(_OBJ4_TRAILER)
+    offsets = (*_PRELUDE_OFFSETS, object4_offset, object5_offset)
+    xref_offset = object5_offset + len(_STATIC_OBJ5)
+
+    buffer = bytearray(_PDF_PRELUDE)
+    buffer += object4
+    buffer += stream_bytes
+    buffer += _OBJ4_TRAILER
+    buffer += _STATIC_OBJ5
+    buffer += f"xref\n0 {len(offsets) + 1}\n".encode("utf-8")
+    buffer += b"0000000000 65535 f \n"
     for off in offsets:
-        buffer.write(f"{off:010d} 00000 n \n".encode("utf-8"))
-    buffer.write(b"trailer << /Size ")
-    buffer.write(str(len(offsets)+1).encode("utf-8"))
-    buffer.write(b" /Root 1 0 R >>\nstartxref\n")
-    buffer.write(f"{xref_offset}\n".encode("utf-8"))
-    buffer.write(b"%%EOF")
+        buffer += f"{off:010d} 00000 n \n".encode("utf-8")
+    buffer += f"trailer << /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF".encode("utf-8")
 
-    return buffer.getvalue()
+    return bytes(buffer)
 
 
-def _download_pdf(url: str) -> bytes:
+def _download_pdf(url: str) -> File:
     try:
-        response = requests.get(url, timeout=30, stream=True, allow_redirects=True, headers={"Accept": "application/pdf"})
+        response = _HTTP.get(url, timeout=30, stream=True, allow_redirects=True, headers={"Accept": "application/pdf"})
     except requests.RequestException as exc:  # pragma: no cover - network failure handling
         raise InvoicePdfError(f"Unable to download invoice PDF: {exc}") from exc
 
@@ -164,36 +280,42 @@ def _download_pdf(url: str) -> bytes:
     if response.status_code >= 400:
         raise InvoicePdfError(f"Stripe invoice PDF download failed with status {response.status_code}.")
 
-    payload = _read_response_bytes(response)
+    payload = _read_response_file(response)
+    if _is_pdf_response(response.headers):
+        return payload
 
-    if _is_pdf_response(response.headers) or _looks_like_pdf(payload):
+    head = _read_head(payload, HTML_SCAN_BYTES)
+    if _looks_like_pdf(head):
         return payload
+    payload.close()
 
     # HTML fallback: attempt to locate a direct download link (invoice/.../pdf or invoice/...&download=1)
     html = ""
-    if payload:
+    if head:
         try:
-            html = payload.decode("utf-8", errors="ignore")
+            html = head.decode("utf-8", errors="ignore")
         except Exception:
             html = ""
 
     download_link = None
     if html:
-        match = re.search(r'href="(?P<link>https://(?:invoice|pay)\.stripe\.com/[^"]+pdf[^"]*)"', html)
+        match = _PDF_LINK_RE.search(html)
         if match:
             download_link = match.group("link")
 
-    alt_candidates = [
-        download_link,
-        url.replace("/i/", "/invoice/") if "/i/" in url else None,
-        url.replace("/invoice/", "/invoice/") + "&download=1" if "/invoice/" in url and "download=1" not in url else None,
-    ]
+    alt_candidates = dict.fromkeys(
+        (
+            download_link,
+            url.replace("/i/", "/invoice/") if "/i/" in url else None,
+            url + "&download=1" if "/invoice/" in url and "download=1" not in url else None,
+        )
+    )
 
     for candidate in alt_candidates:
-        if not candidate:
+        if not candidate or candidate == url:
             continue
         try:
-            alt_resp = requests.get(
+            alt_resp = _HTTP.get(
                 candidate,
                 timeout=30,
                 stream=True,
@@ -204,14 +326,108 @@ def _download_pdf(url: str) -> bytes:
             continue
         if alt_resp.status_code >= 400:
             continue
-        alt_payload = _read_response_bytes(alt_resp)
-        if _is_pdf_response(alt_resp.headers) or _looks_like_pdf(alt_payload):
+        alt_payload = _read_response_file(alt_resp)
+        if _is_pdf_response(alt_resp.headers) or _looks_like_pdf(_read_head(alt_payload, PDF_MAGIC_SCAN_BYTES)):
             return alt_payload
+        alt_payload.close()
 
     raise InvoicePdfError("Stripe returned a non-PDF payload.")
 
 
-def resolve_invoice_pdf(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
+def find_stored_invoice_pdf(invoice: InvoiceRecord) -> Optional[ResolvedInvoicePdf]:
+    """Return the already persisted PDF for ``invoice`` without contacting Stripe."""
+
+    storage_path = invoice.pdf_storage_path
+    if not storage_path:
+        return None
+
+    if os.path.isabs(storage_path):
+        if os.path.exists(storage_path):
+            filename = os.path.basename(storage_path) or f"{invoice.stripe_invoice_id or invoice.id}.pdf"
+            size = os.path.getsize(storage_path)
+            return ResolvedInvoicePdf(
+                storage_path=storage_path,
+                filename=filename,
+                size=size,
+                is_absolute=True,
+            )
+        logger.warning(
+            "Invoice %s absolute pdf path missing: %s",
+            invoice.stripe_invoice_id or invoice.id,
+            storage_path,
+        )
+        return None
+
+    size = _stored_pdf_size(storage_path)
+    if size is None:
+        return None
+    filename = os.path.basename(storage_path) or f"{invoice.stripe_invoice_id or invoice.id}.pdf"
+    return ResolvedInvoicePdf(
+        storage_path=storage_path,
+        filename=filename,
+        size=size,
+        is_absolute=False,
+        signed_url=_signed_storage_url(storage_path),
+    )
+
+
+def _invoice_pdf_queued_key(invoice_id) -> str:
+    return f"invoice_pdf:queued:{invoice_id}"
+
+
+def ensure_invoice_pdf_async(invoice_id) -> None:
+    """Queue background resolution of the PDF for ``invoice_id`` unless it is already queued."""
+
+    from billing.tasks import generate_invoice_pdf
+
+    key = _invoice_pdf_queued_key(invoice_id)
+    if not cache.add(key, 1, timeout=PDF_QUEUE_TTL):
+        return
+    try:
+        generate_invoice_pdf.delay(str(invoice_id))
+    except Exception:
+        cache.delete(key)
+        raise
+
+
+def clear_invoice_pdf_queued(invoice_id) -> None:
+    """Let the next poll queue ``invoice_id`` again once a build has finished."""
+
+    cache.delete(_invoice_pdf_queued_key(invoice_id))
+
+
+def record_invoice_pdf_failure(invoice_id, exc: InvoicePdfError) -> None:
+    """Store why background resolution failed on the invoice so the next poll can report it."""
+
+    InvoiceRecord.objects.filter(pk=invoice_id).update(
+        pdf_failure=(
+            InvoiceRecord.PdfFailure.NOT_FOUND
+            if isinstance(exc, InvoicePdfNotFound)
+            else InvoiceRecord.PdfFailure.FAILED
+        ),
+        pdf_failure_message=str(exc)[:255],
+    )
+
+
+def pop_invoice_pdf_failure(invoice: InvoiceRecord) -> Optional[dict]:
+    """Return and clear a recorded failure; the following request re-queues generation."""
+
+    if not invoice.pdf_failure:
+        return None
+    # Only the poll that clears the marker reports it; concurrent polls fall through and re-queue.
+    cleared = InvoiceRecord.objects.filter(pk=invoice.pk, pdf_failure=invoice.pdf_failure).update(
+        pdf_failure="",
+        pdf_failure_message="",
+    )
+    if not cleared:
+        return None
+    return {
+        "not_found": invoice.pdf_failure == InvoiceRecord.PdfFailure.NOT_FOUND,
+        "message": invoice.pdf_failure_message,
+    }
+
+
+def resolve_invoice_pdf_sync(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
     """
     Ensure a local PDF copy exists for ``invoice`` and return its storage metadata.
 
@@ -219,38 +435,20 @@ def resolve_invoice_pdf(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
         1. Existing ``pdf_storage_path`` when file is present.
         2. Download from Stripe's ``invoice_pdf`` URL, save, and hydrate the model.
 
+    Callers should fetch ``invoice`` with ``select_related("workspace")``; otherwise the
+    placeholder renderer issues its own workspace lookup. Request handlers should prefer
+    ``find_stored_invoice_pdf`` + ``ensure_invoice_pdf_async`` over calling this directly.
+
     Raises:
         InvoicePdfNotFound: when no PDF is available from storage or Stripe.
         InvoicePdfError: on download errors.
     """
 
-    storage_path = invoice.pdf_storage_path
-    if storage_path:
-        if os.path.isabs(storage_path):
-            if os.path.exists(storage_path):
-                filename = os.path.basename(storage_path) or f"{invoice.stripe_invoice_id or invoice.id}.pdf"
-                size = os.path.getsize(storage_path)
-                return ResolvedInvoicePdf(
-                    storage_path=storage_path,
-                    filename=filename,
-                    size=size,
-                    is_absolute=True,
-                )
-            logger.warning(
-                "Invoice %s absolute pdf path missing: %s",
-                invoice.stripe_invoice_id or invoice.id,
-                storage_path,
-            )
-        elif default_storage.exists(storage_path):
-            size = default_storage.size(storage_path)
-            filename = os.path.basename(storage_path) or f"{invoice.stripe_invoice_id or invoice.id}.pdf"
-            return ResolvedInvoicePdf(
-                storage_path=storage_path,
-                filename=filename,
-                size=size,
-                is_absolute=False,
-            )
+    stored = find_stored_invoice_pdf(invoice)
+    if stored is not None:
+        return stored
 
+    storage_path = invoice.pdf_storage_path
     metadata = invoice.metadata or {}
     invoice_data = metadata.get("stripe_invoice_snapshot")
     if invoice_data and not isinstance(invoice_data, dict):
@@ -293,7 +491,7 @@ def resolve_invoice_pdf(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
                 "Invoice %s missing invoice_pdf; generating placeholder.",
                 invoice.stripe_invoice_id or invoice.id,
             )
-            pdf_bytes = _build_placeholder_pdf(invoice, invoice_data)
+            pdf_file = ContentFile(_build_placeholder_pdf(invoice, invoice_data))
         else:
             logger.warning(
                 "Invoice %s does not expose invoice_pdf URL; falling back failed.",
@@ -302,14 +500,14 @@ def resolve_invoice_pdf(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
             raise InvoicePdfNotFound("Invoice PDF is not available from Stripe.")
     else:
         try:
-            pdf_bytes = _download_pdf(pdf_url)
+            pdf_file = _download_pdf(pdf_url)
         except InvoicePdfNotFound:
             if is_token_invoice:
                 logger.info(
                     "Invoice %s download failed; generating placeholder.",
                     invoice.stripe_invoice_id or invoice.id,
                 )
-                pdf_bytes = _build_placeholder_pdf(invoice, invoice_data)
+                pdf_file = ContentFile(_build_placeholder_pdf(invoice, invoice_data))
             else:
                 raise
 
@@ -317,14 +515,17 @@ def resolve_invoice_pdf(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
     inferred_path = (
         storage_path if storage_path and not os.path.isabs(storage_path) else _guess_pdf_storage_path(invoice)
     )
-    saved_path = _store_pdf_bytes(inferred_path, pdf_bytes)
+    size = pdf_file.size
+    try:
+        saved_path = _store_pdf_file(inferred_path, pdf_file)
+    finally:
+        pdf_file.close()
 
     if saved_path != invoice.pdf_storage_path:
         invoice.pdf_storage_path = saved_path
         invoice.save(update_fields=["pdf_storage_path", "updated_at"])
 
     filename = os.path.basename(saved_path) or f"{invoice.stripe_invoice_id or invoice.id}.pdf"
-    size = len(pdf_bytes)
 
     return ResolvedInvoicePdf(
         storage_path=saved_path,
@@ -332,3 +533,7 @@ def resolve_invoice_pdf(invoice: InvoiceRecord) -> ResolvedInvoicePdf:
         size=size,
         is_absolute=os.path.isabs(saved_path),
     )
+
+
+# Backwards-compatible name for callers that resolve inline.
+resolve_invoice_pdf = resolve_invoice_pdf_sync
@@ -2,14 +2,21 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
+import hashlib
+import json
 import logging
-from typing import Any, Dict, Optional, Tuple
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
 
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db import transaction
+from django.db.models import Case, IntegerField, Q, Value, When
 from django.utils import timezone
 
+from billing.db import rebind_upserted_pks
 from billing.models import (
     BillingTransaction,
     InvoiceRecord,
@@ -18,7 +25,95 @@ from billing.models import (
 )
 from workspace.models import Workspace
 
+User = get_user_model()
 RETRY_WINDOW = timedelta(hours=12)
+INVOICE_EVENT_DEDUP_TTL = 300  # seconds a processed invoice payload is remembered
+TWO_PLACES = Decimal("0.01")
+_ZERO = Decimal("0.00")
+_HUNDRED = Decimal(100)
+# Invoice fields copied onto payment and ledger rows. The full payload (line items
+# included) can run to tens of KB and is re-serialised on every update, so only
+# identifying and summary fields are kept; the invoice itself stays in Stripe.
+PERSISTED_INVOICE_KEYS = (
+    "id",
+    "object",
+    "number",
+    "status",
+    "billing_reason",
+    "customer",
+    "subscription",
+    "payment_intent",
+    "charge",
+    "currency",
+    "total",
+    "subtotal",
+    "amount_due",
+    "amount_paid",
+    "amount_remaining",
+    "attempt_count",
+    "attempted",
+    "paid",
+    "created",
+    "due_date",
+    "period_start",
+    "period_end",
+    "hosted_invoice_url",
+    "invoice_pdf",
+    "metadata",
+)
+# InvoiceRecord timestamp fields and the Stripe invoice keys they are read from.
+INVOICE_TIMESTAMP_SOURCES = (
+    ("issued_at", "created"),
+    ("due_at", "due_date"),
+    ("paid_at", "paid_at"),
+    ("canceled_at", "canceled_at"),
+)
+INVOICE_TIMESTAMP_FIELDS = tuple(field for field, _key in INVOICE_TIMESTAMP_SOURCES) + ("last_payment_attempt_at",)
+# Columns rewritten when an existing row is refreshed from a newer payload.
+INVOICE_REFRESH_FIELDS = (
+    "workspace",
+    "stripe_customer_id",
+    "status",
+    "total_amount",
+    "amount_due",
+    "currency",
+    "hosted_invoice_url",
+    "metadata",
+    "initiator",
+    "failure_reason",
+    "payload_hash",
+) + INVOICE_TIMESTAMP_FIELDS
+PAYMENT_REFRESH_FIELDS = (
+    "invoice",
+    "workspace",
+    "status",
+    "amount",
+    "currency",
+    "stripe_charge_id",
+    "metadata",
+    "initiator",
+    "failure_code",
+    "failure_message",
+    "retryable_until",
+)
+TRANSACTION_REFRESH_FIELDS = (
+    "workspace",
+    "status",
+    "amount",
+    "currency",
+    "payment",
+    "metadata",
+    "occurred_at",
+)
+PAYMENT_STATUS_BY_INVOICE_STATUS = {
+    "paid": PaymentRecord.Status.SUCCEEDED,
+    "open": PaymentRecord.Status.PROCESSING,
+}
+# Bursts of invoice webhooks for one customer resolve to the same workspace, so
+# subscription references are memoised briefly in-process (hits only, never misses).
+SUBSCRIPTION_WORKSPACE_CACHE_TTL = 60
+SUBSCRIPTION_WORKSPACE_CACHE_MAX_ENTRIES = 2048
+_subscription_workspace_cache: Dict[Tuple[Any, Any, Any], Tuple[float, int]] = {}
 logger = logging.getLogger(__name__)
 
 
@@ -27,12 +122,15 @@ def _extract_invoice_metadata(invoice_payload: Dict[str, Any]) -> Dict[str, Any]
 
     aggregated: Dict[str, Any] = {}
 
+    setdefault = aggregated.setdefault
+
     def _merge(source: Optional[Dict[str, Any]]) -> None:
-        if not isinstance(source, dict):
+        if not source or not isinstance(source, dict):
             return
         for key, value in source.items():
-            if key not in aggregated and value not in (None, ""):
-                aggregated[key] = value
+            if value is None or value == "":
+                continue
+            setdefault(key, value)
 
     _merge(invoice_payload.get("metadata"))
 
@@ -40,8 +138,9 @@ def _extract_invoice_metadata(invoice_payload: Dict[str, Any]) -> Dict[str, Any]
     subscription_details = parent.get("subscription_details") or {}
     _merge(subscription_details.get("metadata"))
 
-    lines = ((invoice_payload.get("lines") or {}).get("data") or [])
-    for line in lines:
+    # Every line is still walked: the aggregate is persisted on InvoiceRecord.metadata,
+    # so stopping once the lookup keys are known would drop line-only keys.
+    for line in (invoice_payload.get("lines") or {}).get("data") or ():
         _merge(line.get("metadata"))
 
     return aggregated
@@ -61,66 +160,73 @@ class InvoiceSyncResult:
 
 def _from_minor(amount_minor: Optional[int]) -> Decimal:
     if amount_minor is None:
-        return Decimal("0.00")
-    return (Decimal(amount_minor) / Decimal("100")).quantize(Decimal("0.01"))
+        return _ZERO
+    return (Decimal(amount_minor) / _HUNDRED).quantize(TWO_PLACES)
 
 
 def _from_timestamp(value: Optional[int]) -> Optional[datetime]:
     if not value:
         return None
-    import datetime as dt
-    return datetime.fromtimestamp(value, tz=dt.timezone.utc)
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
 
 
-def _resolve_workspace(invoice_payload: Dict[str, Any]) -> Optional[Workspace]:
-    metadata = _extract_invoice_metadata(invoice_payload)
+def _resolve_workspace(invoice_payload: Dict[str, Any], metadata: Dict[str, Any]) -> Optional[Workspace]:
     workspace_id = metadata.get("workspace_id")
     if workspace_id:
-        try:
-            return Workspace.objects.get(id=workspace_id)
-        except Workspace.DoesNotExist:
-            pass
+        workspace = Workspace.objects.filter(id=workspace_id).first()
+        if workspace is not None:
+            return workspace
 
     subscription_metadata_id = metadata.get("workspace_subscription_id")
-    if subscription_metadata_id:
-        workspace_id = (
-            WorkspaceSubscription.objects.filter(id=subscription_metadata_id)
-            .values_list("workspace_id", flat=True)
-            .first()
-        )
-        if workspace_id:
-            try:
-                return Workspace.objects.get(id=workspace_id)
-            except Workspace.DoesNotExist:
-                pass
-
     subscription_id = invoice_payload.get("subscription")
-    if subscription_id:
-        workspace_id = (
-            WorkspaceSubscription.objects.filter(stripe_subscription_id=subscription_id)
-            .values_list("workspace_id", flat=True)
-            .first()
-        )
-        if workspace_id:
-            try:
-                return Workspace.objects.get(id=workspace_id)
-            except Workspace.DoesNotExist:
-                pass
-
     customer_id = invoice_payload.get("customer")
-    if customer_id:
-        workspace_id = (
-            WorkspaceSubscription.objects.filter(stripe_customer_id=customer_id)
-            .values_list("workspace_id", flat=True)
-            .first()
-        )
-        if workspace_id:
-            try:
-                return Workspace.objects.get(id=workspace_id)
-            except Workspace.DoesNotExist:
-                pass
+    cache_key = (subscription_metadata_id, subscription_id, customer_id)
+
+    now = time.monotonic()
+    cached = _subscription_workspace_cache.get(cache_key)
+    if cached is not None and cached[0] > now:
+        workspace = Workspace.objects.filter(id=cached[1]).first()
+        if workspace is not None:
+            return workspace
+        _subscription_workspace_cache.pop(cache_key, None)
+
+    # Try every subscription reference in one query; ``match_rank`` keeps the previous
+    # precedence of metadata id, then Stripe subscription id, then Stripe customer id.
+    candidates = (
+        ("id", subscription_metadata_id),
+        ("stripe_subscription_id", subscription_id),
+        ("stripe_customer_id", customer_id),
+    )
+    query = Q()
+    ranks = []
+    for rank, (field, value) in enumerate(candidates):
+        if value:
+            query |= Q(**{field: value})
+            ranks.append(When(Q(**{field: value}), then=Value(rank)))
+    if not ranks:
+        return None
 
-    return None
+    subscription = (
+        WorkspaceSubscription.objects.filter(query)
+        .select_related("workspace")
+        .annotate(match_rank=Case(*ranks, output_field=IntegerField()))
+        .order_by("match_rank", "pk")
+        .only("workspace")
+        .first()
+    )
+    if subscription is None:
+        return None
+
+    if len(_subscription_workspace_cache) >= SUBSCRIPTION_WORKSPACE_CACHE_MAX_ENTRIES:
+        _subscription_workspace_cache.clear()
+    _subscription_workspace_cache[cache_key] = (now + SUBSCRIPTION_WORKSPACE_CACHE_TTL, subscription.workspace_id)
+    return subscription.workspace
+
+
+def clear_subscription_workspace_cache() -> None:
+    """Forget memoised subscription-to-workspace lookups, e.g. after a subscription is deleted."""
+
+    _subscription_workspace_cache.clear()
 
 
 def _extract_failure_reason(invoice_payload: Dict[str, Any]) -> str:
@@ -144,10 +250,24 @@ def _first_not_none(payload: Dict[str, Any], *keys: str) -> Optional[int]:
     return None
 
 
-def _resolve_invoice_amounts(
-    invoice_payload: Dict[str, Any],
-    existing_invoice: Optional[InvoiceRecord] = None,
-) -> Tuple[Decimal, Decimal]:
+def _invoice_payload_snapshot(invoice_payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: invoice_payload[key] for key in PERSISTED_INVOICE_KEYS if key in invoice_payload}
+
+
+def _invoice_payload_hash(invoice_payload: Dict[str, Any], initiator=None) -> str:
+    # The initiator is folded in because it is applied alongside the payload.
+    encoded = json.dumps(
+        [invoice_payload, getattr(initiator, "pk", None)],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    ).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+def _resolve_invoice_amounts(invoice_payload: Dict[str, Any]) -> Tuple[Optional[Decimal], Optional[Decimal]]:
+    """Return (total_amount, amount_due) from the payload, ``None`` where Stripe sent neither."""
+
     total_minor = _first_not_none(invoice_payload, "total", "amount_paid", "amount_due", "amount_remaining")
     amount_paid_minor = invoice_payload.get("amount_paid")
     amount_remaining_minor = _first_not_none(invoice_payload, "amount_remaining", "amount_due")
@@ -155,164 +275,232 @@ def _resolve_invoice_amounts(
     if amount_remaining_minor is None and total_minor is not None and amount_paid_minor is not None:
         amount_remaining_minor = max(total_minor - amount_paid_minor, 0)
 
-    if total_minor is not None:
-        total_amount = _from_minor(total_minor)
-    elif existing_invoice and existing_invoice.total_amount is not None:
-        total_amount = existing_invoice.total_amount
-    else:
-        total_amount = Decimal("0.00")
-
-    if amount_remaining_minor is not None:
-        amount_due = _from_minor(amount_remaining_minor)
-    elif existing_invoice and existing_invoice.amount_due is not None:
-        amount_due = existing_invoice.amount_due
-    elif total_minor is not None and amount_paid_minor is not None:
-        amount_due = _from_minor(max(total_minor - amount_paid_minor, 0))
-    else:
-        amount_due = Decimal("0.00")
-
+    total_amount = _from_minor(total_minor) if total_minor is not None else None
+    amount_due = _from_minor(amount_remaining_minor) if amount_remaining_minor is not None else None
     return total_amount, amount_due
 
 
-def _upsert_invoice(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceRecord:
-    stripe_invoice_id = invoice_payload.get("id")
-    if not stripe_invoice_id:
-        raise ValueError("Stripe invoice payload is missing id.")
+def _changed_fields(instance, update_fields: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the subset of ``update_fields`` that differs from ``instance``.
+
+    Relations are compared by primary key so the check never loads related rows.
+    """
+
+    opts = instance._meta
+    dirty = {}
+    for name, value in update_fields.items():
+        field = opts.get_field(name)
+        if field.is_relation:
+            current, new = getattr(instance, field.attname), getattr(value, "pk", None)
+        else:
+            current, new = getattr(instance, name), value
+        if current != new:
+            dirty[name] = value
+    return dirty
+
+
+def _update_existing(instance, update_fields: Dict[str, Any]) -> None:
+    """Write the changed ``update_fields`` with one queryset UPDATE and mirror them on ``instance``.
+
+    Callers have already normalised the values, so skipping ``save()`` only drops the
+    model-level invariant pass that would be a no-op here. Replays that change nothing
+    issue no UPDATE at all.
+    """
+
+    dirty = _changed_fields(instance, update_fields)
+    if not dirty:
+        return
+    now = timezone.now()
+    type(instance)._base_manager.filter(pk=instance.pk).update(**dirty, updated_at=now)
+    for field, value in dirty.items():
+        setattr(instance, field, value)
+    instance.updated_at = now
+
+
+def _prepare_invoice_values(invoice_payload: Dict[str, Any], initiator=None) -> Dict[str, Any]:
+    """Derive InvoiceRecord values from a payload; amounts Stripe did not send are ``None``."""
 
-    workspace = _resolve_workspace(invoice_payload)
-    status = (invoice_payload.get("status") or "open").lower()
-    total_amount, amount_due = _resolve_invoice_amounts(invoice_payload)
-    currency = (invoice_payload.get("currency") or "aud").lower()
     metadata = _extract_invoice_metadata(invoice_payload)
+    total_amount, amount_due = _resolve_invoice_amounts(invoice_payload)
 
-    defaults = {
-        "workspace": workspace,
+    # Converted once and shared by the insert and update paths.
+    timestamp_fields = {
+        field: _from_timestamp(invoice_payload.get(key)) for field, key in INVOICE_TIMESTAMP_SOURCES
+    }
+    timestamp_fields["last_payment_attempt_at"] = _from_timestamp(
+        invoice_payload.get("last_payment_attempt") or invoice_payload.get("next_payment_attempt")
+    )
+
+    return {
+        "workspace": _resolve_workspace(invoice_payload, metadata),
         "stripe_customer_id": invoice_payload.get("customer") or "",
-        "status": status,
+        "status": (invoice_payload.get("status") or "open").lower(),
         "total_amount": total_amount,
         "amount_due": amount_due,
-        "currency": currency,
+        "currency": (invoice_payload.get("currency") or "aud").lower(),
         "hosted_invoice_url": invoice_payload.get("hosted_invoice_url") or "",
-        "issued_at": _from_timestamp(invoice_payload.get("created")),
-        "due_at": _from_timestamp(invoice_payload.get("due_date")),
-        "paid_at": _from_timestamp(invoice_payload.get("paid_at")),
-        "canceled_at": _from_timestamp(invoice_payload.get("canceled_at")),
-        "last_payment_attempt_at": _from_timestamp(
-            invoice_payload.get("last_payment_attempt") or invoice_payload.get("next_payment_attempt")
-        ),
-        "failure_reason": invoice_payload.get("collection_reason") or "",
+        **timestamp_fields,
+        "failure_reason": _extract_failure_reason(invoice_payload),
         "metadata": metadata,
         "initiator": initiator,
+        "payload_hash": _invoice_payload_hash(invoice_payload, initiator),
+    }
+
+
+def _invoice_insert_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        **values,
+        "total_amount": values["total_amount"] if values["total_amount"] is not None else _ZERO,
+        "amount_due": values["amount_due"] if values["amount_due"] is not None else _ZERO,
     }
 
-    invoice, created = InvoiceRecord.objects.get_or_create(
-        stripe_invoice_id=stripe_invoice_id,
-        defaults=defaults,
-    )
 
-    # Re-evaluate resolved amounts using the persisted invoice as fallback.
-    resolved_total, resolved_due = _resolve_invoice_amounts(invoice_payload, invoice)
+def _invoice_is_unchanged(values: Dict[str, Any], invoice: InvoiceRecord) -> bool:
+    # An identical redelivery changes nothing, unless the workspace can now be resolved.
+    return invoice.payload_hash == values["payload_hash"] and bool(invoice.workspace_id or values["workspace"] is None)
+
+
+def _invoice_update_values(values: Dict[str, Any], invoice: InvoiceRecord) -> Dict[str, Any]:
+    """Merge fresh values over ``invoice``; blanks in the payload keep what is stored."""
+
+    total_amount = values["total_amount"]
+    if total_amount is None:
+        total_amount = invoice.total_amount if invoice.total_amount is not None else _ZERO
+    amount_due = values["amount_due"]
+    if amount_due is None:
+        amount_due = invoice.amount_due if invoice.amount_due is not None else _ZERO
 
     update_fields = {
-        "workspace": workspace or invoice.workspace,
-        "stripe_customer_id": invoice_payload.get("customer") or invoice.stripe_customer_id,
-        "status": status,
-        "total_amount": resolved_total,
-        "amount_due": resolved_due,
-        "currency": currency,
-        "hosted_invoice_url": invoice_payload.get("hosted_invoice_url") or invoice.hosted_invoice_url,
-        "metadata": metadata or invoice.metadata or {},
-        "initiator": initiator or invoice.initiator,
+        "workspace": values["workspace"] or invoice.workspace,
+        "stripe_customer_id": values["stripe_customer_id"] or invoice.stripe_customer_id,
+        "status": values["status"],
+        "total_amount": total_amount,
+        "amount_due": amount_due,
+        "currency": values["currency"],
+        "hosted_invoice_url": values["hosted_invoice_url"] or invoice.hosted_invoice_url,
+        "metadata": values["metadata"] or invoice.metadata or {},
+        "initiator": values["initiator"] or invoice.initiator,
+        "failure_reason": values["failure_reason"],
+        "payload_hash": values["payload_hash"],
     }
+    update_fields.update((field, values[field]) for field in INVOICE_TIMESTAMP_FIELDS if values[field])
+    return update_fields
 
-    timestamp_fields = {
-        "issued_at": _from_timestamp(invoice_payload.get("created")),
-        "due_at": _from_timestamp(invoice_payload.get("due_date")),
-        "paid_at": _from_timestamp(invoice_payload.get("paid_at")),
-        "canceled_at": _from_timestamp(invoice_payload.get("canceled_at")),
-        "last_payment_attempt_at": _from_timestamp(
-            invoice_payload.get("last_payment_attempt") or invoice_payload.get("next_payment_attempt")
-        ),
-    }
-    for field, ts in timestamp_fields.items():
-        if ts:
-            update_fields[field] = ts
-
-    failure_reason = _extract_failure_reason(invoice_payload)
-    if failure_reason:
-        update_fields["failure_reason"] = failure_reason
-    else:
-        update_fields["failure_reason"] = ""
-
-    for field, value in update_fields.items():
-        setattr(invoice, field, value)
-    invoice.save(update_fields=list(update_fields.keys()) + ["updated_at"])
+
+def _upsert_invoice(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceRecord:
+    stripe_invoice_id = invoice_payload.get("id")
+    if not stripe_invoice_id:
+        raise ValueError("Stripe invoice payload is missing id.")
+
+    values = _prepare_invoice_values(invoice_payload, initiator)
+    invoice, created = InvoiceRecord.objects.get_or_create(
+        stripe_invoice_id=stripe_invoice_id,
+        defaults=_invoice_insert_values(values),
+    )
+    if created or _invoice_is_unchanged(values, invoice):
+        return invoice
+
+    _update_existing(invoice, _invoice_update_values(values, invoice))
     return invoice
 
 
-def _upsert_payment(
+def _prepare_payment_values(
     invoice: InvoiceRecord,
     invoice_payload: Dict[str, Any],
     initiator=None,
-) -> Optional[PaymentRecord]:
-    payment_intent = invoice_payload.get("payment_intent")
-    if not payment_intent:
+    payment_status_override: Optional[str] = None,
+) -> Optional[Dict[str, Any]]:
+    """Derive PaymentRecord values, or ``None`` when the invoice has no payment intent.
+
+    ``amount`` is ``None`` when Stripe reports nothing paid yet; see the insert/update helpers.
+    """
+
+    if not invoice_payload.get("payment_intent"):
         return None
 
     amount_paid = _from_minor(invoice_payload.get("amount_paid"))
-    currency = invoice.currency
-    status_map = {
-        "paid": PaymentRecord.Status.SUCCEEDED,
-        "open": PaymentRecord.Status.PROCESSING,
-    }
     invoice_status = invoice_payload.get("status", "open").lower()
-    payment_status = status_map.get(invoice_status, PaymentRecord.Status.PROCESSING)
+    payment_status = payment_status_override or PAYMENT_STATUS_BY_INVOICE_STATUS.get(
+        invoice_status, PaymentRecord.Status.PROCESSING
+    )
+
+    outcome_fields: Dict[str, Any] = {}
+    if payment_status_override == PaymentRecord.Status.SUCCEEDED:
+        outcome_fields = {"failure_code": "", "failure_message": "", "retryable_until": None}
+    elif payment_status_override == PaymentRecord.Status.FAILED:
+        outcome_fields = {
+            "failure_message": _extract_failure_reason(invoice_payload),
+            "retryable_until": timezone.now() + RETRY_WINDOW,
+        }
 
-    defaults = {
+    return {
         "invoice": invoice,
         "workspace": invoice.workspace,
         "status": payment_status,
-        "amount": amount_paid if amount_paid > 0 else invoice.total_amount,
-        "currency": currency,
+        "amount": amount_paid if amount_paid > 0 else None,
+        "currency": invoice.currency,
         "stripe_charge_id": invoice_payload.get("charge") or "",
-        "metadata": invoice_payload,
+        "metadata": _invoice_payload_snapshot(invoice_payload),
         "initiator": initiator,
+        **outcome_fields,
+    }
+
+
+def _payment_insert_values(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {**values, "amount": values["amount"] if values["amount"] is not None else values["invoice"].total_amount}
+
+
+def _payment_update_values(values: Dict[str, Any], payment: PaymentRecord) -> Dict[str, Any]:
+    return {
+        **values,
+        "amount": values["amount"] if values["amount"] is not None else payment.amount,
+        "stripe_charge_id": values["stripe_charge_id"] or payment.stripe_charge_id,
+        "initiator": values["initiator"] or payment.initiator,
     }
 
+
+def _upsert_payment(
+    invoice: InvoiceRecord,
+    invoice_payload: Dict[str, Any],
+    initiator=None,
+    payment_status_override: Optional[str] = None,
+) -> Optional[PaymentRecord]:
+    """Create or refresh the payment for ``invoice_payload`` with a single write.
+
+    ``payment_status_override`` pins the final status (and its failure bookkeeping)
+    instead of deriving it from the invoice status.
+    """
+
+    values = _prepare_payment_values(invoice, invoice_payload, initiator, payment_status_override)
+    if values is None:
+        return None
+
     payment, created = PaymentRecord.objects.get_or_create(
-        stripe_payment_intent_id=payment_intent,
-        defaults=defaults,
+        stripe_payment_intent_id=invoice_payload["payment_intent"],
+        defaults=_payment_insert_values(values),
     )
+    if created:
+        return payment
 
-    update_fields = {
-        "invoice": invoice,
-        "workspace": invoice.workspace,
-        "status": payment_status,
-        "amount": amount_paid if amount_paid > 0 else payment.amount,
-        "currency": currency,
-        "stripe_charge_id": invoice_payload.get("charge") or payment.stripe_charge_id,
-        "metadata": invoice_payload,
-        "initiator": initiator or payment.initiator,
-    }
-    for field, value in update_fields.items():
-        setattr(payment, field, value)
-    payment.save(update_fields=list(update_fields.keys()) + ["updated_at"])
+    _update_existing(payment, _payment_update_values(values, payment))
     return payment
 
 
-def _record_invoice_transaction(
+def _prepare_transaction_values(
     invoice: InvoiceRecord,
     payment: Optional[PaymentRecord],
     payload: Dict[str, Any],
     status: BillingTransaction.Status,
     initiator=None,
-) -> Optional[BillingTransaction]:
+) -> Optional[Dict[str, Any]]:
+    """Derive the ledger row for an invoice, or ``None`` when there is nothing to record."""
+
     occurred_at = invoice.paid_at or invoice.issued_at or timezone.now()
-    invoice_amount = invoice.total_amount or Decimal("0.00")
-    payment_amount = payment.amount if payment and payment.amount else Decimal("0.00")
+    invoice_amount = invoice.total_amount or _ZERO
+    payment_amount = payment.amount if payment and payment.amount else _ZERO
     effective_amount = invoice_amount if invoice_amount > 0 else payment_amount
 
-    if effective_amount <= Decimal("0.00"):
+    if effective_amount <= _ZERO:
         logger.debug(
             "Skipping invoice transaction for zero/negative amount.",
             extra={
@@ -321,10 +509,9 @@ def _record_invoice_transaction(
                 "status": status,
             },
         )
-        existing_txn = BillingTransaction.objects.filter(invoice=invoice).first()
-        return existing_txn
+        return None
 
-    defaults = {
+    return {
         "workspace": invoice.workspace,
         "user": initiator,
         "initiator": initiator,
@@ -337,64 +524,127 @@ def _record_invoice_transaction(
         "payment": payment,
         "source_reference": invoice.stripe_invoice_id,
         "description": "Stripe subscription invoice",
-        "metadata": payload,
+        "metadata": _invoice_payload_snapshot(payload),
         "occurred_at": occurred_at,
     }
 
-    txn, created = BillingTransaction.objects.get_or_create(
-        invoice=invoice,
-        defaults=defaults,
-    )
+
+def _transaction_update_values(values: Dict[str, Any], txn: BillingTransaction) -> Dict[str, Any]:
+    update_fields = {field: values[field] for field in TRANSACTION_REFRESH_FIELDS}
+    update_fields["user"] = values["user"] or txn.user
+    update_fields["initiator"] = values["initiator"] or txn.initiator
+    return update_fields
+
+
+def _record_invoice_transaction(
+    invoice: InvoiceRecord,
+    payment: Optional[PaymentRecord],
+    payload: Dict[str, Any],
+    status: BillingTransaction.Status,
+    initiator=None,
+) -> Optional[BillingTransaction]:
+    values = _prepare_transaction_values(invoice, payment, payload, status, initiator)
+    if values is None:
+        # Callers only need to know whether a ledger row exists; anything else loads lazily.
+        return BillingTransaction.objects.filter(invoice=invoice).only("id").first()
+
+    txn, created = BillingTransaction.objects.get_or_create(invoice=invoice, defaults=values)
     if not created:
-        update_fields = {
-            "workspace": invoice.workspace,
-            "status": status,
-            "amount": effective_amount,
-            "currency": invoice.currency,
-            "payment": payment,
-            "metadata": payload,
-            "occurred_at": occurred_at,
-            "user": initiator or txn.user,
-            "initiator": initiator or txn.initiator,
-        }
-        for field, value in update_fields.items():
-            setattr(txn, field, value)
-        txn.save(update_fields=list(update_fields.keys()) + ["updated_at"])
+        _update_existing(txn, _transaction_update_values(values, txn))
     return txn
 
 
+def _invoice_event_cache_key(kind: str, invoice_payload: Dict[str, Any]) -> Optional[str]:
+    stripe_invoice_id = invoice_payload.get("id")
+    if not stripe_invoice_id:
+        return None
+    return "stripe:invoice_event:{}:{}:{}:{}:{}:{}".format(
+        kind,
+        stripe_invoice_id,
+        invoice_payload.get("status"),
+        invoice_payload.get("attempt_count"),
+        invoice_payload.get("amount_remaining"),
+        invoice_payload.get("updated") or invoice_payload.get("created"),
+    )
+
+
+def _load_existing_result(invoice_payload: Dict[str, Any]) -> Optional[InvoiceSyncResult]:
+    invoice = InvoiceRecord.objects.filter(stripe_invoice_id=invoice_payload["id"]).first()
+    if invoice is None:
+        return None
+    payment = None
+    payment_intent = invoice_payload.get("payment_intent")
+    if payment_intent:
+        payment = PaymentRecord.objects.filter(stripe_payment_intent_id=payment_intent).first()
+    return InvoiceSyncResult(invoice=invoice, payment=payment)
+
+
+def _process_once(
+    kind: str,
+    invoice_payload: Dict[str, Any],
+    process: Callable[[], InvoiceSyncResult],
+) -> InvoiceSyncResult:
+    """Run ``process`` unless the same invoice payload was handled within the dedup window.
+
+    Stripe redelivers webhooks freely. ``cache.add`` claims the payload atomically, so a
+    replay costs one cache round trip and a lookup of the stored rows. If those rows are
+    missing (e.g. the first delivery rolled back) the payload is processed again.
+    """
+
+    cache_key = _invoice_event_cache_key(kind, invoice_payload)
+    if cache_key is not None and not cache.add(cache_key, 1, timeout=INVOICE_EVENT_DEDUP_TTL):
+        existing = _load_existing_result(invoice_payload)
+        if existing is not None:
+            logger.debug(
+                "Skipping replayed Stripe invoice event.",
+                extra={"invoice_id": invoice_payload.get("id"), "kind": kind},
+            )
+            return existing
+
+    try:
+        return process()
+    except Exception:
+        if cache_key is not None:
+            cache.delete(cache_key)
+        raise
+
+
 def process_invoice_paid_event(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceSyncResult:
+    return _process_once("paid", invoice_payload, lambda: _process_invoice_paid(invoice_payload, initiator))
+
+
+def _resolve_initiator(metadata: Dict[str, Any]):
+    """Return the first existing user named by the initiator metadata keys, in priority order."""
+
+    candidates = []
+    for candidate_key in ("initiator_user_id", "billing_owner_user_id", "purchaser_user_id"):
+        initiator_user_id = metadata.get(candidate_key)
+        if not initiator_user_id:
+            continue
+        try:
+            candidates.append(int(initiator_user_id))
+        except (TypeError, ValueError):
+            continue
+    if not candidates:
+        return None
+
+    users = {user.pk: user for user in User.objects.filter(pk__in=candidates)}
+    return next((users[pk] for pk in candidates if pk in users), None)
+
+
+def _process_invoice_paid(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceSyncResult:
     # Extract initiator from metadata if not explicitly provided
     if initiator is None:
-        metadata = _extract_invoice_metadata(invoice_payload)
-        for candidate_key in ("initiator_user_id", "billing_owner_user_id", "purchaser_user_id"):
-            initiator_user_id = metadata.get(candidate_key)
-            if not initiator_user_id:
-                continue
-            try:
-                from accounts.models import User
-                initiator = User.objects.get(id=int(initiator_user_id))
-                break
-            except (ValueError, User.DoesNotExist):
-                continue
+        initiator = _resolve_initiator(_extract_invoice_metadata(invoice_payload))
 
     with transaction.atomic():
         invoice = _upsert_invoice(invoice_payload, initiator=initiator)
-        payment = _upsert_payment(invoice, invoice_payload, initiator=initiator)
-        if payment:
-            payment.status = PaymentRecord.Status.SUCCEEDED
-            payment.failure_code = ""
-            payment.failure_message = ""
-            payment.retryable_until = None
-            payment.metadata = invoice_payload
-            payment.save(update_fields=[
-                "status",
-                "failure_code",
-                "failure_message",
-                "retryable_until",
-                "metadata",
-                "updated_at",
-            ])
+        payment = _upsert_payment(
+            invoice,
+            invoice_payload,
+            initiator=initiator,
+            payment_status_override=PaymentRecord.Status.SUCCEEDED,
+        )
         _record_invoice_transaction(
             invoice,
             payment,
@@ -406,21 +656,22 @@ def process_invoice_paid_event(invoice_payload: Dict[str, Any], initiator=None)
 
 
 def process_invoice_payment_failed_event(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceSyncResult:
+    return _process_once(
+        "payment_failed",
+        invoice_payload,
+        lambda: _process_invoice_payment_failed(invoice_payload, initiator),
+    )
+
+
+def _process_invoice_payment_failed(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceSyncResult:
     with transaction.atomic():
         invoice = _upsert_invoice(invoice_payload, initiator=initiator)
-        payment = _upsert_payment(invoice, invoice_payload, initiator=initiator)
-        if payment:
-            payment.status = PaymentRecord.Status.FAILED
-            payment.failure_message = _extract_failure_reason(invoice_payload)
-            payment.retryable_until = timezone.now() + RETRY_WINDOW
-            payment.metadata = invoice_payload
-            payment.save(update_fields=[
-                "status",
-                "failure_message",
-                "retryable_until",
-                "metadata",
-                "updated_at",
-            ])
+        payment = _upsert_payment(
+            invoice,
+            invoice_payload,
+            initiator=initiator,
+            payment_status_override=PaymentRecord.Status.FAILED,
+        )
         _record_invoice_transaction(
             invoice,
             payment,
@@ -432,6 +683,10 @@ def process_invoice_payment_failed_event(invoice_payload: Dict[str, Any], initia
 
 
 def process_invoice_created_event(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceSyncResult:
+    return _process_once("created", invoice_payload, lambda: _process_invoice_created(invoice_payload, initiator))
+
+
+def _process_invoice_created(invoice_payload: Dict[str, Any], initiator=None) -> InvoiceSyncResult:
     with transaction.atomic():
         invoice = _upsert_invoice(invoice_payload, initiator=initiator)
         payment = _upsert_payment(invoice, invoice_payload, initiator=initiator)
@@ -443,3 +698,167 @@ def process_invoice_created_event(invoice_payload: Dict[str, Any], initiator=Non
             initiator=initiator,
         )
     return InvoiceSyncResult(invoice=invoice, payment=payment)
+
+
+def process_invoice_paid_events(entries: Iterable[Tuple[Dict[str, Any], Any]]) -> List[InvoiceSyncResult]:
+    """Apply many paid invoice payloads inside one transaction using set-based writes.
+
+    ``entries`` are ``(invoice_payload, initiator)`` pairs; a later payload for the same
+    invoice supersedes an earlier one. Produces the same rows as calling
+    ``process_invoice_paid_event`` per payload, but existing invoices, payments and ledger
+    rows are loaded with one query per table, refreshed with ``bulk_update`` and new ones
+    inserted with ``bulk_create(update_conflicts=True)``.
+    """
+
+    latest: Dict[str, Tuple[Dict[str, Any], Any]] = {}
+    for invoice_payload, initiator in entries:
+        stripe_invoice_id = invoice_payload.get("id")
+        if not stripe_invoice_id:
+            raise ValueError("Stripe invoice payload is missing id.")
+        if initiator is None:
+            initiator = _resolve_initiator(_extract_invoice_metadata(invoice_payload))
+        latest[stripe_invoice_id] = (invoice_payload, initiator)
+    if not latest:
+        return []
+
+    now = timezone.now()
+    with transaction.atomic():
+        invoices = _bulk_upsert_invoices(latest, now)
+        payments = _bulk_upsert_payments(latest, invoices, now)
+        _bulk_record_invoice_transactions(latest, invoices, payments, now)
+
+    return [
+        InvoiceSyncResult(invoice=invoices[stripe_invoice_id], payment=payments.get(stripe_invoice_id))
+        for stripe_invoice_id in latest
+    ]
+
+
+def _bulk_upsert_invoices(
+    latest: Dict[str, Tuple[Dict[str, Any], Any]],
+    now: datetime,
+) -> Dict[str, InvoiceRecord]:
+    existing = InvoiceRecord.objects.in_bulk(list(latest), field_name="stripe_invoice_id")
+    invoices: Dict[str, InvoiceRecord] = {}
+    changed, created = [], []
+    for stripe_invoice_id, (invoice_payload, initiator) in latest.items():
+        values = _prepare_invoice_values(invoice_payload, initiator)
+        invoice = existing.get(stripe_invoice_id)
+        if invoice is None:
+            invoice = InvoiceRecord(stripe_invoice_id=stripe_invoice_id, **_invoice_insert_values(values))
+            invoice._check_invariants()
+            created.append(invoice)
+        elif not _invoice_is_unchanged(values, invoice):
+            for field, value in _invoice_update_values(values, invoice).items():
+                setattr(invoice, field, value)
+            invoice.updated_at = now
+            changed.append(invoice)
+        invoices[stripe_invoice_id] = invoice
+
+    if changed:
+        InvoiceRecord.objects.bulk_update(changed, INVOICE_REFRESH_FIELDS + ("updated_at",))
+    if created:
+        # A row inserted concurrently since the lookup above is refreshed rather than
+        # failing the batch; the stored primary keys are re-read for the dependent rows.
+        InvoiceRecord.objects.bulk_create(
+            created,
+            update_conflicts=True,
+            unique_fields=["stripe_invoice_id"],
+            update_fields=INVOICE_REFRESH_FIELDS,
+        )
+        rebind_upserted_pks(created, "stripe_invoice_id")
+    return invoices
+
+
+def _bulk_upsert_payments(
+    latest: Dict[str, Tuple[Dict[str, Any], Any]],
+    invoices: Dict[str, InvoiceRecord],
+    now: datetime,
+) -> Dict[str, PaymentRecord]:
+    intents = {
+        stripe_invoice_id: invoice_payload["payment_intent"]
+        for stripe_invoice_id, (invoice_payload, _initiator) in latest.items()
+        if invoice_payload.get("payment_intent")
+    }
+    existing = PaymentRecord.objects.in_bulk(list(intents.values()), field_name="stripe_payment_intent_id")
+    payments: Dict[str, PaymentRecord] = {}
+    changed, created = [], []
+    for stripe_invoice_id, payment_intent in intents.items():
+        invoice_payload, initiator = latest[stripe_invoice_id]
+        values = _prepare_payment_values(
+            invoices[stripe_invoice_id],
+            invoice_payload,
+            initiator,
+            payment_status_override=PaymentRecord.Status.SUCCEEDED,
+        )
+        payment = existing.get(payment_intent)
+        if payment is None:
+            payment = PaymentRecord(stripe_payment_intent_id=payment_intent, **_payment_insert_values(values))
+            payment._check_invariants()
+            created.append(payment)
+            existing[payment_intent] = payment
+        else:
+            dirty = _changed_fields(payment, _payment_update_values(values, payment))
+            for field, value in dirty.items():
+                setattr(payment, field, value)
+            # Payloads sharing an intent reuse the pending row rather than writing it twice.
+            if dirty and not payment._state.adding and payment not in changed:
+                payment.updated_at = now
+                changed.append(payment)
+        payments[stripe_invoice_id] = payment
+
+    if changed:
+        PaymentRecord.objects.bulk_update(changed, PAYMENT_REFRESH_FIELDS + ("updated_at",))
+    if created:
+        PaymentRecord.objects.bulk_create(
+            created,
+            update_conflicts=True,
+            unique_fields=["stripe_payment_intent_id"],
+            update_fields=PAYMENT_REFRESH_FIELDS,
+        )
+        rebind_upserted_pks(created, "stripe_payment_intent_id")
+    return payments
+
+
+def _bulk_record_invoice_transactions(
+    latest: Dict[str, Tuple[Dict[str, Any], Any]],
+    invoices: Dict[str, InvoiceRecord],
+    payments: Dict[str, PaymentRecord],
+    now: datetime,
+) -> None:
+    existing = {
+        txn.invoice_id: txn
+        for txn in BillingTransaction.objects.filter(invoice__in=list(invoices.values()))
+    }
+    changed, created = [], []
+    for stripe_invoice_id, (invoice_payload, initiator) in latest.items():
+        invoice = invoices[stripe_invoice_id]
+        values = _prepare_transaction_values(
+            invoice,
+            payments.get(stripe_invoice_id),
+            invoice_payload,
+            BillingTransaction.Status.POSTED,
+            initiator,
+        )
+        if values is None:
+            continue
+        txn = existing.get(invoice.pk)
+        if txn is None:
+            created.append(BillingTransaction.normalize(BillingTransaction(**values)))
+            continue
+        dirty = _changed_fields(txn, _transaction_update_values(values, txn))
+        if dirty:
+            for field, value in dirty.items():
+                setattr(txn, field, value)
+            txn.updated_at = now
+            changed.append(txn)
+
+    if changed:
+        BillingTransaction.objects.bulk_update(changed, TRANSACTION_REFRESH_FIELDS + ("user", "initiator", "updated_at"))
+    if created:
+        BillingTransaction.objects.bulk_create(
+            created,
+            update_conflicts=True,
+            unique_fields=["invoice"],
+            update_fields=TRANSACTION_REFRESH_FIELDS + ("user", "initiator"),
+        )
+        rebind_upserted_pks(created, "invoice_id")
@@ -0,0 +1,28 @@
+"""Cached name lookups for the workspace plan catalog."""
+from __future__ import annotations
+
+from typing import Dict, Optional
+
+from django.core.cache import cache
+
+from billing.models import WorkspacePlan
+
+PLANS_BY_LOWER_NAME_CACHE_KEY = "billing:plans_by_lname"
+PLAN_LOOKUP_TTL = 60
+
+
+def _load_plans_by_lower_name() -> Dict[str, WorkspacePlan]:
+    return {plan.name.lower(): plan for plan in WorkspacePlan.objects.all()}
+
+
+def get_plan_by_name(name: str) -> Optional[WorkspacePlan]:
+    """Return the plan whose name matches ``name`` case-insensitively, if any."""
+
+    plans = cache.get_or_set(PLANS_BY_LOWER_NAME_CACHE_KEY, _load_plans_by_lower_name, PLAN_LOOKUP_TTL)
+    return plans.get((name or "").lower())
+
+
+def invalidate_plan_lookup(**kwargs) -> None:
+    """Signal receiver dropping the cached catalog when a plan changes."""
+
+    cache.delete(PLANS_BY_LOWER_NAME_CACHE_KEY)
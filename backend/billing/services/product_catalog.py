@@ -3,16 +3,28 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from decimal import Decimal
+from functools import lru_cache
+import hashlib
 import logging
 import re
+import time
+from types import MappingProxyType
 from typing import Dict, Mapping, Optional, Tuple
 
 from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.dispatch import receiver
 import stripe
 
 from .stripe_sdk import ensure_stripe_modules_loaded
 logger = logging.getLogger(__name__)
 
+_TAIL_DIGITS = re.compile(r"(\d+)$")
+_ANY_DIGITS = re.compile(r"(\d+)")
+_ONE = Decimal(1)
+_HUNDRED = Decimal(100)
+
 
 class ProductCatalogError(Exception):
     """Base exception for product catalog issues."""
@@ -46,16 +58,19 @@ class WorkspacePlanProduct:
     stripe_product_id: Optional[str]
 
 
+@lru_cache(maxsize=1)
 def _get_product_settings() -> Mapping[str, object]:
+    """Return a validated, read-only snapshot of STRIPE_PRODUCT_IDS (cleared by ``invalidate_catalog``)."""
+
     try:
         product_settings = settings.STRIPE_PRODUCT_IDS
     except AttributeError as exc:
         raise CatalogConfigurationError("STRIPE_PRODUCT_IDS is not defined in Django settings.") from exc
 
-    if not isinstance(product_settings, Mapping):
+    if type(product_settings) is not dict and not isinstance(product_settings, Mapping):
         raise CatalogConfigurationError("STRIPE_PRODUCT_IDS must be a mapping of product keys to identifiers.")
 
-    return product_settings
+    return MappingProxyType(dict(product_settings))
 
 
 def _resolve_token_pack_details(key: str) -> Tuple[int, int, Decimal, str]:
@@ -77,19 +92,20 @@ def _resolve_token_pack_details(key: str) -> Tuple[int, int, Decimal, str]:
             raise CatalogConfigurationError(
                 "STRIPE_TOKEN_PRICE_PER_100 must be configured (> 0) to derive token pricing."
             )
-        derived = (price_per_100 / Decimal("100")) * Decimal(tokens)
-        unit_amount_cents = int((derived * 100).quantize(Decimal("1")))
+        derived = (price_per_100 / _HUNDRED) * Decimal(tokens)
+        unit_amount_cents = int((derived * 100).quantize(_ONE))
     else:
         unit_amount_cents = int(unit_amount_cents)
 
     if unit_amount_cents <= 0:
         raise CatalogConfigurationError(f"Token product '{key}' must resolve to a positive unit amount.")
 
-    return tokens, unit_amount_cents, (Decimal(unit_amount_cents) / Decimal("100")), currency
+    return tokens, unit_amount_cents, (Decimal(unit_amount_cents) / _HUNDRED), currency
 
 
+@lru_cache(maxsize=128)
 def _infer_token_quantity(key: str) -> int:
-    match = re.search(r"(\d+)$", key)
+    match = _TAIL_DIGITS.search(key)
     if not match:
         raise CatalogConfigurationError(
             f"Unable to infer token quantity from product key '{key}'. Configure STRIPE_TOKEN_PRODUCT_DETAILS."
@@ -111,53 +127,60 @@ def _build_token_catalog(product_settings: Mapping[str, object]) -> Dict[str, To
     stripe.api_key = secret_key
     ensure_stripe_modules_loaded()
 
-    for key, value in product_settings.items():
-        if isinstance(value, str) and key.startswith("token_"):
-            stripe_product_id = value
+    wanted = {
+        value: key
+        for key, value in product_settings.items()
+        if isinstance(value, str) and key.startswith("token_")
+    }
+    if not wanted:
+        return catalog
 
+    try:
+        # One paginated listing with the product expanded replaces a Product.retrieve +
+        # Price.list pair per pack. Prices are returned newest first, so the first active
+        # price seen for a product wins, as with the previous ``limit=1`` lookup.
+        prices = stripe.Price.list(active=True, limit=100, expand=["data.product"])
+        for price in prices.auto_paging_iter():
+            product = price.product
+            stripe_product_id = product if isinstance(product, str) else product.id
+            key = wanted.get(stripe_product_id)
+            if key is None or key in catalog:
+                continue
+
+            tokens = _extract_token_quantity(product, key)
+            catalog[key] = TokenProduct(
+                key=key,
+                stripe_product_id=stripe_product_id,
+                tokens=tokens,
+                unit_amount=price.unit_amount,
+                unit_amount_decimal=Decimal(price.unit_amount) / _HUNDRED,
+                currency=price.currency,
+            )
+            logger.info(f"Loaded token product from Stripe: {key} ({tokens} tokens @ {price.unit_amount} {price.currency})")
+    except stripe.error.StripeError as exc:
+        logger.error(f"Failed to list Stripe prices for token products: {exc}")
+        # Fall back to config-based pricing for every product not loaded yet
+        for stripe_product_id, key in wanted.items():
+            if key in catalog:
+                continue
             try:
-                # Fetch product details from Stripe
-                product = stripe.Product.retrieve(stripe_product_id)
-
-                # Get the active price for this product
-                prices = stripe.Price.list(product=stripe_product_id, active=True, limit=1)
-
-                if not prices.data:
-                    logger.warning(f"No active price found for product {stripe_product_id}, skipping")
-                    continue
-
-                price = prices.data[0]
-
-                # Extract token quantity from product name or metadata
-                tokens = _extract_token_quantity(product, key)
-
+                tokens, unit_amount, unit_amount_decimal, currency = _resolve_token_pack_details(key)
                 catalog[key] = TokenProduct(
                     key=key,
                     stripe_product_id=stripe_product_id,
                     tokens=tokens,
-                    unit_amount=price.unit_amount,
-                    unit_amount_decimal=Decimal(price.unit_amount) / Decimal("100"),
-                    currency=price.currency,
+                    unit_amount=unit_amount,
+                    unit_amount_decimal=unit_amount_decimal,
+                    currency=currency,
                 )
+                logger.warning(f"Using config-based pricing for {key} due to Stripe API error")
+            except Exception as e:
+                logger.error(f"Failed to create product {key}: {e}")
+        return catalog
 
-                logger.info(f"Loaded token product from Stripe: {key} ({tokens} tokens @ {price.unit_amount} {price.currency})")
-
-            except stripe.error.StripeError as exc:
-                logger.error(f"Failed to fetch Stripe product {stripe_product_id}: {exc}")
-                # Fall back to config-based pricing for this product
-                try:
-                    tokens, unit_amount, unit_amount_decimal, currency = _resolve_token_pack_details(key)
-                    catalog[key] = TokenProduct(
-                        key=key,
-                        stripe_product_id=stripe_product_id,
-                        tokens=tokens,
-                        unit_amount=unit_amount,
-                        unit_amount_decimal=unit_amount_decimal,
-                        currency=currency,
-                    )
-                    logger.warning(f"Using config-based pricing for {key} due to Stripe API error")
-                except Exception as e:
-                    logger.error(f"Failed to create product {key}: {e}")
+    for stripe_product_id, key in wanted.items():
+        if key not in catalog:
+            logger.warning(f"No active price found for product {stripe_product_id}, skipping")
 
     return catalog
 
@@ -174,7 +197,7 @@ def _extract_token_quantity(product, key: str) -> int:
 
     # Try extracting from product name
     if hasattr(product, 'name') and product.name:
-        match = re.search(r'(\d+)', product.name)
+        match = _ANY_DIGITS.search(product.name)
         if match:
             return int(match.group(1))
 
@@ -218,27 +241,82 @@ def _build_workspace_plan_catalog(product_settings: Mapping[str, object]) -> Dic
     return catalog
 
 
-_TOKEN_CATALOG: Optional[Dict[str, TokenProduct]] = None
-_WORKSPACE_PLAN_CATALOG: Optional[Dict[str, WorkspacePlanProduct]] = None
+DEFAULT_CATALOG_TTL_SECONDS = 300
+
+_TOKEN_CATALOG: Dict[str, TokenProduct] = {}
+_TOKEN_CATALOG_EXPIRES_AT: float = 0.0
+_WORKSPACE_PLAN_CATALOG: Dict[str, WorkspacePlanProduct] = {}
+_WORKSPACE_PLAN_CATALOG_EXPIRES_AT: float = 0.0
+
+
+def _catalog_ttl() -> float:
+    return float(getattr(settings, "BILLING_PRODUCT_CATALOG_TTL", DEFAULT_CATALOG_TTL_SECONDS))
+
+
+def _token_catalog_cache_key() -> str:
+    """Shared-cache key for the token catalog, tied to the settings it is built from."""
+
+    fingerprint = repr((
+        sorted(_get_product_settings().items(), key=lambda item: item[0]),
+        getattr(settings, "STRIPE_TOKEN_PRODUCT_DETAILS", None),
+        getattr(settings, "STRIPE_TOKEN_PRICE_PER_100", None),
+        getattr(settings, "STRIPE_CURRENCY", None),
+    ))
+    return "billing:token_catalog:" + hashlib.sha256(fingerprint.encode()).hexdigest()[:16]
+
+
+def _token_catalog() -> Dict[str, TokenProduct]:
+    global _TOKEN_CATALOG, _TOKEN_CATALOG_EXPIRES_AT
+    if time.monotonic() >= _TOKEN_CATALOG_EXPIRES_AT:
+        # A freshly started worker reuses the catalog another process already loaded
+        # from Stripe instead of paying for the price listing itself.
+        cache_key = _token_catalog_cache_key()
+        catalog = cache.get(cache_key)
+        if catalog is None:
+            catalog = _build_token_catalog(_get_product_settings())
+            if catalog:
+                cache.set(cache_key, catalog, _catalog_ttl())
+        _TOKEN_CATALOG = catalog
+        _TOKEN_CATALOG_EXPIRES_AT = time.monotonic() + _catalog_ttl()
+    return _TOKEN_CATALOG
+
+
+def _workspace_plan_catalog() -> Dict[str, WorkspacePlanProduct]:
+    global _WORKSPACE_PLAN_CATALOG, _WORKSPACE_PLAN_CATALOG_EXPIRES_AT
+    if time.monotonic() >= _WORKSPACE_PLAN_CATALOG_EXPIRES_AT:
+        _WORKSPACE_PLAN_CATALOG = _build_workspace_plan_catalog(_get_product_settings())
+        _WORKSPACE_PLAN_CATALOG_EXPIRES_AT = time.monotonic() + _catalog_ttl()
+    return _WORKSPACE_PLAN_CATALOG
+
+
+def invalidate_catalog() -> None:
+    """Force the next lookup to rebuild both catalogs, dropping the shared token catalog too."""
+
+    global _TOKEN_CATALOG, _TOKEN_CATALOG_EXPIRES_AT, _WORKSPACE_PLAN_CATALOG, _WORKSPACE_PLAN_CATALOG_EXPIRES_AT
+    try:
+        cache.delete(_token_catalog_cache_key())
+    except CatalogConfigurationError:
+        pass
+    _TOKEN_CATALOG = {}
+    _TOKEN_CATALOG_EXPIRES_AT = 0.0
+    _WORKSPACE_PLAN_CATALOG = {}
+    _WORKSPACE_PLAN_CATALOG_EXPIRES_AT = 0.0
+    _get_product_settings.cache_clear()
 
 
 def get_token_products() -> Tuple[TokenProduct, ...]:
     """Return all configured token products."""
 
-    global _TOKEN_CATALOG
-    if _TOKEN_CATALOG is None:
-        _TOKEN_CATALOG = _build_token_catalog(_get_product_settings())
-    return tuple(_TOKEN_CATALOG.values())
+    return tuple(_token_catalog().values())
 
 
 def get_token_product(key: str) -> TokenProduct:
     """Fetch a single token product by key, raising if it does not exist."""
 
-    products = {product.key: product for product in get_token_products()}
     try:
-        return products[key]
-    except KeyError as exc:
-        raise ProductNotFound(f"Unknown token product '{key}'.") from exc
+        return _token_catalog()[key]
+    except KeyError:
+        raise ProductNotFound(f"Unknown token product '{key}'.") from None
 
 
 def get_workspace_plan_products(include_free: bool = True) -> Tuple[WorkspacePlanProduct, ...]:
@@ -248,11 +326,7 @@ def get_workspace_plan_products(include_free: bool = True) -> Tuple[WorkspacePla
         include_free: Whether to include the implicit free plan in the result.
     """
 
-    global _WORKSPACE_PLAN_CATALOG
-    if _WORKSPACE_PLAN_CATALOG is None:
-        _WORKSPACE_PLAN_CATALOG = _build_workspace_plan_catalog(_get_product_settings())
-
-    plans = tuple(_WORKSPACE_PLAN_CATALOG.values())
+    plans = tuple(_workspace_plan_catalog().values())
     if include_free:
         return plans
 
@@ -262,8 +336,25 @@ def get_workspace_plan_products(include_free: bool = True) -> Tuple[WorkspacePla
 def get_workspace_plan_product(key: str) -> WorkspacePlanProduct:
     """Fetch a workspace plan by key, raising if it is not configured."""
 
-    plans = {plan.key: plan for plan in get_workspace_plan_products(include_free=True)}
     try:
-        return plans[key]
-    except KeyError as exc:
-        raise ProductNotFound(f"Unknown workspace plan '{key}'.") from exc
+        return _workspace_plan_catalog()[key]
+    except KeyError:
+        raise ProductNotFound(f"Unknown workspace plan '{key}'.") from None
+
+
+_CATALOG_SETTINGS = frozenset({
+    "STRIPE_PRODUCT_IDS",
+    "STRIPE_TOKEN_PRODUCT_DETAILS",
+    "STRIPE_TOKEN_PRICE_PER_100",
+    "STRIPE_CURRENCY",
+    "STRIPE_SECRET_KEY",
+    "BILLING_PRODUCT_CATALOG_TTL",
+})
+
+
+@receiver(setting_changed)
+def _reset_catalogs_on_setting_change(*, setting: str, **kwargs) -> None:
+    """Drop the memoised catalogs when a setting they are built from changes."""
+
+    if setting in _CATALOG_SETTINGS:
+        invalidate_catalog()
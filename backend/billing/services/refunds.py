@@ -2,14 +2,42 @@
 from __future__ import annotations
 
 from decimal import Decimal
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Tuple
 
 from django.db import transaction
+from django.db.models import Sum, prefetch_related_objects
 from django.utils import timezone
 
+from billing.db import rebind_upserted_pks, serializable_atomic
 from billing.models import BillingTransaction, PaymentRecord, RefundRecord
 
 
+REFUND_REFRESH_FIELDS = (
+    "payment",
+    "workspace",
+    "amount",
+    "currency",
+    "status",
+    "reason",
+    "metadata",
+    "initiator",
+)
+REFUND_TRANSACTION_FIELDS = (
+    "workspace",
+    "user",
+    "initiator",
+    "category",
+    "direction",
+    "status",
+    "amount",
+    "currency",
+    "source_reference",
+    "description",
+    "metadata",
+    "occurred_at",
+)
+
+
 def record_refund(
     *,
     payment: PaymentRecord,
@@ -19,73 +47,199 @@ def record_refund(
     payload: Dict[str, Any],
     initiator=None,
 ) -> RefundRecord:
-    stripe_refund_id = payload.get("id") or f"manual-{payment.id}-{timezone.now().timestamp()}"
-    status = (payload.get("status") or RefundRecord.Status.PENDING).lower()
-    normalized_currency = (currency or payment.currency).lower()
-    metadata = payload or {}
+    return record_refunds_bulk([
+        {
+            "payment": payment,
+            "amount": amount,
+            "currency": currency,
+            "reason": reason,
+            "payload": payload,
+            "initiator": initiator,
+        }
+    ])[0]
+
+
+@serializable_atomic
+def record_refunds_bulk(items: Iterable[Dict[str, Any]]) -> List[RefundRecord]:
+    """Record many refunds with one upsert per table.
+
+    Each item carries the keyword arguments of ``record_refund``. Existing refunds and
+    their ledger rows are loaded with one query and refreshed with ``bulk_update``; new
+    ones are inserted with ``bulk_create(update_conflicts=True)``. A later item for the
+    same Stripe refund supersedes an earlier one.
+    """
+
+    items = list(items)
+    # Callers may hand over bare payment rows; resolve their workspace and initiator in
+    # one query per relation instead of one lazy fetch per refund.
+    prefetch_related_objects([item["payment"] for item in items], "workspace", "initiator")
+
+    now = timezone.now()
+    latest: Dict[str, Dict[str, Any]] = {}
+    for item in items:
+        stripe_refund_id, values = _refund_values(item, now)
+        latest[stripe_refund_id] = values
+    if not latest:
+        return []
+
+    refunds = _bulk_upsert_refunds(latest, now)
+    _bulk_record_refund_transactions(refunds, now)
+    _mark_refunded_payments(refunds.values(), now)
+    return list(refunds.values())
+
+
+def create_pending_refund(
+    *,
+    payment: PaymentRecord,
+    amount: Decimal,
+    currency: str,
+    reason: str,
+    payload: Dict[str, Any],
+    initiator=None,
+) -> RefundRecord:
+    """Insert the refund row and settle the payment status, leaving the ledger entry to ``record_refund``.
+
+    Lets a caller answer with the refund and payment as they will be stored while the
+    ledger write runs elsewhere. The status check only reads committed refunds, so a
+    concurrent refund can at worst be missed here and is picked up by ``record_refund``.
+    """
 
+    stripe_refund_id, values = _refund_values(
+        {
+            "payment": payment,
+            "amount": amount,
+            "currency": currency,
+            "reason": reason,
+            "payload": payload,
+            "initiator": initiator,
+        },
+        timezone.now(),
+    )
+    values["initiator"] = values["initiator"] or payment.initiator
     with transaction.atomic():
-        refund, created = RefundRecord.objects.get_or_create(
-            stripe_refund_id=stripe_refund_id,
-            defaults={
-                "payment": payment,
-                "workspace": payment.workspace,
-                "amount": amount,
-                "currency": normalized_currency,
-                "status": status,
-                "reason": reason,
-                "metadata": metadata,
-                "initiator": initiator or payment.initiator,
-            },
+        refund, _ = RefundRecord.objects.get_or_create(stripe_refund_id=stripe_refund_id, defaults=values)
+        _mark_refunded_payments([refund], timezone.now())
+    return refund
+
+
+def _refund_values(item: Dict[str, Any], now) -> Tuple[str, Dict[str, Any]]:
+    payment = item["payment"]
+    payload = item.get("payload") or {}
+    stripe_refund_id = payload.get("id") or f"manual-{payment.id}-{now.timestamp()}"
+    return stripe_refund_id, {
+        "payment": payment,
+        "workspace": payment.workspace,
+        "amount": item["amount"],
+        "currency": (item.get("currency") or payment.currency).lower(),
+        "status": (payload.get("status") or RefundRecord.Status.PENDING).lower(),
+        "reason": item.get("reason") or "",
+        "metadata": payload,
+        "initiator": item.get("initiator"),
+    }
+
+
+def _bulk_upsert_refunds(latest: Dict[str, Dict[str, Any]], now) -> Dict[str, RefundRecord]:
+    existing = RefundRecord.objects.select_related("initiator").in_bulk(list(latest), field_name="stripe_refund_id")
+    refunds: Dict[str, RefundRecord] = {}
+    changed, created = [], []
+    for stripe_refund_id, values in latest.items():
+        refund = existing.get(stripe_refund_id)
+        if refund is None:
+            values["initiator"] = values["initiator"] or values["payment"].initiator
+            refund = RefundRecord(stripe_refund_id=stripe_refund_id, **values)
+            refund._check_invariants()
+            created.append(refund)
+        else:
+            # A redelivered refund keeps its recorded initiator unless one is supplied.
+            values["initiator"] = values["initiator"] or refund.initiator
+            for field, value in values.items():
+                setattr(refund, field, value)
+            refund._check_invariants()
+            refund.updated_at = now
+            changed.append(refund)
+        refunds[stripe_refund_id] = refund
+
+    if changed:
+        RefundRecord.objects.bulk_update(changed, REFUND_REFRESH_FIELDS + ("updated_at",))
+    if created:
+        RefundRecord.objects.bulk_create(
+            created,
+            update_conflicts=True,
+            unique_fields=["stripe_refund_id"],
+            update_fields=REFUND_REFRESH_FIELDS,
         )
-        if not created:
-            refund.payment = payment
-            refund.workspace = payment.workspace
-            refund.amount = amount
-            refund.currency = normalized_currency
-            refund.status = status
-            refund.reason = reason
-            refund.metadata = metadata
-            if initiator:
-                refund.initiator = initiator
-            refund.save(update_fields=[
-                "payment",
-                "workspace",
-                "amount",
-                "currency",
-                "status",
-                "reason",
-                "metadata",
-                "initiator",
-                "updated_at",
-            ])
-
-        billing_tx_defaults = {
-            "workspace": payment.workspace,
-            "user": initiator or payment.initiator,
-            "initiator": initiator or payment.initiator,
+        rebind_upserted_pks(created, "stripe_refund_id")
+    return refunds
+
+
+def _bulk_record_refund_transactions(refunds: Dict[str, RefundRecord], now) -> None:
+    existing = {
+        txn.refund_id: txn
+        for txn in BillingTransaction.objects.filter(refund__in=list(refunds.values()))
+    }
+    changed, created = [], []
+    for refund in refunds.values():
+        payer = refund.initiator or refund.payment.initiator
+        values = {
+            "workspace": refund.workspace,
+            "user": payer,
+            "initiator": payer,
             "category": BillingTransaction.Category.REFUND,
             "direction": BillingTransaction.Direction.CREDIT,
             "status": BillingTransaction.Status.POSTED,
-            "amount": amount,
-            "currency": normalized_currency,
-            "refund": refund,
+            "amount": refund.amount,
+            "currency": refund.currency,
             "source_reference": refund.stripe_refund_id,
             "description": "Stripe refund",
-            "metadata": metadata,
+            "metadata": refund.metadata,
             "occurred_at": refund.created_at,
         }
+        txn = existing.get(refund.pk)
+        if txn is None:
+            created.append(BillingTransaction.normalize(BillingTransaction(refund=refund, **values)))
+            continue
+        for field, value in values.items():
+            setattr(txn, field, value)
+        BillingTransaction.normalize(txn)
+        txn.updated_at = now
+        changed.append(txn)
 
-        existing_billing_tx = getattr(refund, "billing_transaction", None)
-        if existing_billing_tx:
-            for field, value in billing_tx_defaults.items():
-                setattr(existing_billing_tx, field, value)
-            existing_billing_tx.save()
-        else:
-            BillingTransaction.objects.create(**billing_tx_defaults)
+    if changed:
+        BillingTransaction.objects.bulk_update(changed, REFUND_TRANSACTION_FIELDS + ("updated_at",))
+    if created:
+        BillingTransaction.objects.bulk_create(
+            created,
+            update_conflicts=True,
+            unique_fields=["refund"],
+            update_fields=REFUND_TRANSACTION_FIELDS,
+        )
+        rebind_upserted_pks(created, "refund_id")
 
-        if status == RefundRecord.Status.SUCCEEDED and amount >= payment.amount:
-            payment.status = PaymentRecord.Status.REFUNDED
-            payment.save(update_fields=["status", "updated_at"])
 
-    return refund
+def _mark_refunded_payments(refunds: Iterable[RefundRecord], now) -> None:
+    # Partial refunds count towards the payment too; reading the running total
+    # and flipping the status is why this runs under SERIALIZABLE.
+    payments = {
+        refund.payment_id: refund.payment
+        for refund in refunds
+        if refund.status == RefundRecord.Status.SUCCEEDED
+    }
+    if not payments:
+        return
+
+    totals = dict(
+        RefundRecord.objects.filter(payment__in=list(payments), status=RefundRecord.Status.SUCCEEDED)
+        .values("payment")
+        .annotate(total=Sum("amount"))
+        .values_list("payment", "total")
+    )
+    refunded = [
+        payment
+        for payment_id, payment in payments.items()
+        if (totals.get(payment_id) or Decimal("0.00")) >= payment.amount
+    ]
+    for payment in refunded:
+        payment.status = PaymentRecord.Status.REFUNDED
+        payment.updated_at = now
+    if refunded:
+        PaymentRecord.objects.bulk_update(refunded, ["status", "updated_at"])
@@ -1,12 +1,14 @@
 """Stripe checkout and webhook helpers used across the billing flows."""
 from __future__ import annotations
 
+import json
 import logging
 from decimal import Decimal
 from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
-from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from urllib.parse import parse_qsl, quote_plus, urlencode, urljoin, urlsplit, urlunsplit
 
 from django.conf import settings
+from django.core.cache import cache
 import stripe
 
 from .product_catalog import get_token_product, get_workspace_plan_product
@@ -14,6 +16,13 @@ from .stripe_sdk import ensure_stripe_modules_loaded
 
 logger = logging.getLogger(__name__)
 
+# Product -> price resolution costs two Stripe round trips and rarely changes;
+# price/product webhooks clear it through ``invalidate_price_cache``. That only reaches
+# other processes when REDIS_CACHE_URL points every service at a shared cache; with the
+# per-process fallback a price change can take up to this long to reach checkout.
+PRICE_ID_CACHE_TTL = 300
+_PRICE_INTERVAL_KEYS = ("any", "day", "week", "month", "year")
+
 if TYPE_CHECKING:
     from billing.models import WorkspacePlan, WorkspaceSubscription
 
@@ -34,16 +43,27 @@ class StripeInvoiceNotFound(StripeServiceError):
     """Raised when a specific Stripe invoice cannot be found."""
 
 
+# (secret key, api version) last applied to the SDK; lets repeat calls return at once.
+_STRIPE_READY: Optional[tuple] = None
+
+
 def _configure_stripe() -> None:
+    global _STRIPE_READY
+
     secret_key = getattr(settings, "STRIPE_SECRET_KEY", "")
     if not secret_key:
         raise StripeConfigurationError("STRIPE_SECRET_KEY is not configured.")
 
+    api_version = getattr(settings, "STRIPE_API_VERSION", None)
+    ready = (secret_key, api_version)
+    if _STRIPE_READY == ready and stripe.api_key == secret_key:
+        return
+
     ensure_stripe_modules_loaded()
     stripe.api_key = secret_key
-    api_version = getattr(settings, "STRIPE_API_VERSION", None)
     if api_version:
         stripe.api_version = api_version
+    _STRIPE_READY = ready
 
 
 def _build_public_url(path: str) -> str:
@@ -79,6 +99,18 @@ def _append_checkout_params(url: str, params: Dict[str, Any], *, include_session
     if not params and not include_session:
         return url
 
+    if "?" not in url and "#" not in url:
+        # Configured success/cancel URLs normally carry no query; build it directly
+        # instead of splitting, parsing and re-joining the URL.
+        query = "&".join(
+            f"{quote_plus(str(key))}={quote_plus(str(value))}"
+            for key, value in params.items()
+            if value not in (None, "")
+        )
+        if include_session:
+            query = f"{query}&session_id={{CHECKOUT_SESSION_ID}}" if query else "session_id={CHECKOUT_SESSION_ID}"
+        return f"{url}?{query}" if query else url
+
     split_url = urlsplit(url)
     existing_params = dict(parse_qsl(split_url.query, keep_blank_values=True))
 
@@ -101,6 +133,18 @@ def _append_checkout_params(url: str, params: Dict[str, Any], *, include_session
     return urlunsplit((split_url.scheme, split_url.netloc, split_url.path, query, split_url.fragment))
 
 
+def _stripe_payload(obj: Any, as_dict: bool) -> Dict[str, Any]:
+    """Return ``obj`` as-is, or as plain JSON data when the caller needs a real ``dict``.
+
+    ``StripeObject`` already subclasses ``dict``, so most callers can read it directly
+    and skip the recursive copy.
+    """
+
+    if not as_dict:
+        return obj
+    return json.loads(json.dumps(obj, default=str))
+
+
 def _ensure_user_billing_profile(user):
     from billing.models import UserBillingProfile  # Lazy import to avoid circular dependency
 
@@ -140,7 +184,27 @@ def resolve_plan_price_id(identifier: str, *, interval: Optional[str] = None) ->
     return _find_price_for_product(identifier, interval=interval)
 
 
+def _price_cache_key(product_id: str, interval: Optional[str]) -> str:
+    return f"stripe:price:{product_id}:{interval or 'any'}"
+
+
+def invalidate_price_cache(product_id: str) -> None:
+    """Forget the cached price ids for ``product_id`` across every billing interval."""
+
+    cache.delete_many([_price_cache_key(product_id, interval) for interval in _PRICE_INTERVAL_KEYS])
+
+
 def _find_price_for_product(product_id: str, *, interval: Optional[str]) -> str:
+    """Return the active price id for a Stripe product, cached per billing interval."""
+
+    return cache.get_or_set(
+        _price_cache_key(product_id, interval),
+        lambda: _lookup_price_for_product(product_id, interval=interval),
+        PRICE_ID_CACHE_TTL,
+    )
+
+
+def _lookup_price_for_product(product_id: str, *, interval: Optional[str]) -> str:
     """Fetch the active price id for a Stripe product, matching the interval when possible."""
 
     _configure_stripe()
@@ -447,6 +511,7 @@ def create_checkout_session(
     expand: Optional[Iterable[str]] = None,
     subscription_data: Optional[Dict[str, Any]] = None,
     invoice_creation: Optional[Dict[str, Any]] = None,
+    as_dict: bool = False,
 ) -> Dict[str, Any]:
     """Wrapper around ``stripe.checkout.Session.create`` with consistent error handling."""
 
@@ -482,10 +547,7 @@ def create_checkout_session(
         logger.warning("Stripe checkout session creation failed: %s", exc)
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return session.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(session)
+    return _stripe_payload(session, as_dict)
 
 
 def parse_event(payload: str, sig_header: str, secret: Optional[str] = None) -> stripe.Event:
@@ -510,8 +572,13 @@ def parse_event(payload: str, sig_header: str, secret: Optional[str] = None) ->
         raise StripeServiceError("Malformed Stripe webhook payload.") from exc
 
 
-def retrieve_subscription(subscription_id: str, *, expand: Optional[Iterable[str]] = None) -> Dict[str, Any]:
-    """Fetch a Stripe subscription object as a plain dictionary."""
+def retrieve_subscription(
+    subscription_id: str,
+    *,
+    expand: Optional[Iterable[str]] = None,
+    as_dict: bool = False,
+) -> Dict[str, Any]:
+    """Fetch a Stripe subscription object; ``as_dict`` returns a plain dictionary copy."""
 
     if not subscription_id:
         raise ValueError("subscription_id is required.")
@@ -528,13 +595,10 @@ def retrieve_subscription(subscription_id: str, *, expand: Optional[Iterable[str
         logger.warning("Failed to retrieve Stripe subscription %s: %s", subscription_id, exc)
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return subscription.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(subscription)
+    return _stripe_payload(subscription, as_dict)
 
 
-def retrieve_customer(customer_id: str) -> Dict[str, Any]:
+def retrieve_customer(customer_id: str, *, as_dict: bool = False) -> Dict[str, Any]:
     """Fetch a Stripe customer object."""
 
     if not customer_id:
@@ -548,14 +612,16 @@ def retrieve_customer(customer_id: str) -> Dict[str, Any]:
         logger.warning("Failed to retrieve Stripe customer %s: %s", customer_id, exc)
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return customer.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(customer)
+    return _stripe_payload(customer, as_dict)
 
 
-def retrieve_invoice(invoice_id: str, *, expand: Optional[Iterable[str]] = None) -> Dict[str, Any]:
-    """Fetch a Stripe invoice object as a plain dictionary."""
+def retrieve_invoice(
+    invoice_id: str,
+    *,
+    expand: Optional[Iterable[str]] = None,
+    as_dict: bool = False,
+) -> Dict[str, Any]:
+    """Fetch a Stripe invoice object; ``as_dict`` returns a plain dictionary copy."""
 
     if not invoice_id:
         raise ValueError("invoice_id is required.")
@@ -576,13 +642,10 @@ def retrieve_invoice(invoice_id: str, *, expand: Optional[Iterable[str]] = None)
             raise StripeInvoiceNotFound(str(exc)) from exc
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return invoice.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(invoice)
+    return _stripe_payload(invoice, as_dict)
 
 
-def pay_invoice(invoice_id: str) -> Dict[str, Any]:
+def pay_invoice(invoice_id: str, *, as_dict: bool = False) -> Dict[str, Any]:
     """Attempt to pay a pending Stripe invoice and return the resulting payload."""
 
     if not invoice_id:
@@ -596,10 +659,7 @@ def pay_invoice(invoice_id: str) -> Dict[str, Any]:
         logger.warning("Failed to pay Stripe invoice %s: %s", invoice_id, exc)
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return invoice.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(invoice)
+    return _stripe_payload(invoice, as_dict)
 
 
 def create_refund(
@@ -609,6 +669,7 @@ def create_refund(
     currency: str,
     reason: Optional[str] = None,
     metadata: Optional[Dict[str, Any]] = None,
+    as_dict: bool = False,
 ) -> Dict[str, Any]:
     """Create a Stripe refund for a payment intent."""
 
@@ -634,10 +695,7 @@ def create_refund(
         logger.warning("Failed to create Stripe refund for payment %s: %s", payment_intent, exc)
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return refund.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(refund)
+    return _stripe_payload(refund, as_dict)
 
 
 def modify_subscription_item_price(
@@ -648,6 +706,7 @@ def modify_subscription_item_price(
     proration_behavior: str = "create_prorations",
     payment_behavior: str = "pending_if_incomplete",
     idempotency_key: Optional[str] = None,
+    as_dict: bool = False,
 ) -> Dict[str, Any]:
     """Update a Stripe subscription item's price with optional proration."""
 
@@ -682,7 +741,4 @@ def modify_subscription_item_price(
         logger.warning("Failed to modify Stripe subscription %s: %s", subscription_id, exc)
         raise StripeServiceError(str(exc)) from exc
 
-    try:
-        return subscription.to_dict_recursive()  # type: ignore[attr-defined]
-    except AttributeError:
-        return dict(subscription)
+    return _stripe_payload(subscription, as_dict)
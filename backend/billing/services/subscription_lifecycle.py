@@ -57,9 +57,8 @@ def apply_local_plan_change(subscription: WorkspaceSubscription, target_plan: Wo
     subscription.save(update_fields=["plan"])
 
     from workspace.models import Workspace  # Lazy import to avoid circular dependency
-    from billing.serializers import resolve_plan_key
 
-    plan_key = resolve_plan_key(target_plan.name)
+    plan_key = target_plan.key
     workspace = subscription.workspace
     if workspace.plan != plan_key:
         config = workspace.PLAN_CONFIG.get(plan_key, workspace.PLAN_CONFIG["free"])
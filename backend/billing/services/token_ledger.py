@@ -6,6 +6,7 @@ from typing import Optional
 
 from django.contrib.auth import get_user_model
 from django.db import transaction
+from django.utils import timezone
 
 from billing.models import TokenAccount, TokenTransaction
 from workspace.models import Workspace
@@ -149,7 +150,7 @@ def consume(
         raise ValueError("Amount must be a positive integer for consumption.")
 
     with transaction.atomic():
-        locked_account = TokenAccount.objects.select_for_update().get(pk=token_account.pk)
+        locked_account = TokenAccount.objects.select_for_update(no_key=True, of=("self",)).get(pk=token_account.pk)
         return _apply_transaction(
             account=locked_account,
             amount=-abs(amount),
@@ -173,7 +174,7 @@ def credit(
         raise ValueError("Amount must be a positive integer for credits.")
 
     with transaction.atomic():
-        locked_account = TokenAccount.objects.select_for_update().get(pk=token_account.pk)
+        locked_account = TokenAccount.objects.select_for_update(no_key=True, of=("self",)).get(pk=token_account.pk)
         return _apply_transaction(
             account=locked_account,
             amount=amount,
@@ -206,8 +207,12 @@ def _apply_transaction(
     if transaction_type == TokenTransaction.TransactionType.CONSUME and (account.balance + signed_amount) < 0:
         raise InsufficientTokenBalance("Token balance is insufficient for the requested debit.")
 
+    # The account row is locked by the caller; a queryset update skips save()'s full_clean(),
+    # which would otherwise load both owner relations on every ledger write.
+    now = timezone.now()
     account.balance = (account.balance or 0) + signed_amount
-    account.save(update_fields=["balance", "updated_at"])
+    account.updated_at = now
+    TokenAccount.objects.filter(pk=account.pk).update(balance=account.balance, updated_at=now)
 
     transaction = TokenTransaction.objects.create(
         account=account,
@@ -253,12 +258,12 @@ def _validate_existing(
 
 def _lock_workspace_account(workspace: Workspace) -> TokenAccount:
     account, _ = TokenAccount.objects.get_or_create(workspace=workspace)
-    return TokenAccount.objects.select_for_update().get(pk=account.pk)
+    return TokenAccount.objects.select_for_update(no_key=True, of=("self",)).get(pk=account.pk)
 
 
 def _lock_user_account(user: User) -> TokenAccount:
     account, _ = TokenAccount.objects.get_or_create(user=user)
-    return TokenAccount.objects.select_for_update().get(pk=account.pk)
+    return TokenAccount.objects.select_for_update(no_key=True, of=("self",)).get(pk=account.pk)
 
 
 def _get_workspace(workspace_id) -> Workspace:
@@ -5,24 +5,35 @@ import hashlib
 import json
 import logging
 import uuid
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal
 from typing import Any, Dict, Optional
 
 from celery import shared_task
-from django.db import IntegrityError, transaction
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, OperationalError, connection, transaction
 from django.utils import timezone
 
 from billing.models import (
     BillingAuditLog,
     BillingEventDeadLetter,
+    InvoiceRecord,
+    PaymentRecord,
     PlanChangeRequest,
     UserBillingProfile,
     WebhookEventLog,
     WorkspaceSubscription,
 )
 from billing.services.credit_ledger import reconcile_balance
+from billing.services.invoice_pdf import (
+    InvoicePdfError,
+    clear_invoice_pdf_queued,
+    record_invoice_pdf_failure,
+    resolve_invoice_pdf_sync,
+)
+from billing.services.refunds import record_refund
 from billing.services.stripe_payments import (
     StripeServiceError,
     pay_invoice,
@@ -49,6 +60,7 @@ from billing.tasks_webhooks import (
 from workspace.models import Workspace
 
 logger = logging.getLogger(__name__)
+User = get_user_model()
 
 AUTO_RENEW_LOOKAHEAD_MINUTES = 10
 AUTO_RENEW_RETRY_DELAY_MINUTES = 15
@@ -157,12 +169,27 @@ def process_stripe_event_async(self, event_data: Dict[str, Any]) -> Dict[str, An
 
     try:
         with transaction.atomic():
+            # Hold the log row for the whole dispatch so a redelivered copy picked up by
+            # another worker skips instead of racing this one through the handlers.
+            if not _claim_event_log(log_entry):
+                logger.info("Stripe event %s (%s) is being handled by another worker.", event_id, event_type)
+                return {"status": "skipped"}
+
             result = dispatch_event(
                 event_id=event_id or "",
                 event_type=event_type or "",
                 payload=event_data,
                 received_at=received_at,
             )
+            if result.status != HandlerResult.DEAD_LETTER:
+                _mark_event_completed(
+                    log_entry,
+                    WebhookEventLog.Status.PROCESSED
+                    if result.status == HandlerResult.PROCESSED
+                    else WebhookEventLog.Status.IGNORED,
+                    workspace_id=result.workspace_id,
+                    idempotency_key=result.idempotency_key or (event_id or ""),
+                )
 
     except WebhookProcessingError as exc:
         logger.warning("Webhook processing error for event %s: %s", event_id, exc)
@@ -199,14 +226,6 @@ def process_stripe_event_async(self, event_data: Dict[str, Any]) -> Dict[str, An
         )
         return {"status": HandlerResult.DEAD_LETTER, "detail": result.detail}
 
-    status = WebhookEventLog.Status.PROCESSED if result.status == HandlerResult.PROCESSED else WebhookEventLog.Status.IGNORED
-    _mark_event_completed(
-        log_entry,
-        status,
-        workspace_id=result.workspace_id,
-        idempotency_key=result.idempotency_key or (event_id or ""),
-    )
-
     logger.info(
         "Processed Stripe event %s (%s): %s",
         event_id,
@@ -609,6 +628,20 @@ def _reserve_event_log(event_id: Optional[str], event_type: Optional[str], paylo
         return log_entry, False
 
 
+def _claim_event_log(log_entry: Optional[WebhookEventLog]) -> bool:
+    """Lock ``log_entry`` for the current transaction unless it is locked elsewhere or already handled."""
+
+    if not log_entry:
+        return True
+    return (
+        WebhookEventLog.objects.select_for_update(skip_locked=True)
+        .filter(pk=log_entry.pk, handled=False)
+        .values_list("pk", flat=True)
+        .first()
+        is not None
+    )
+
+
 def _mark_event_completed(
     log_entry: Optional[WebhookEventLog],
     status: str,
@@ -706,3 +739,98 @@ def cleanup_webhook_event_logs(days: int = 7) -> int:
 
     logger.info("Cleaned up %s processed webhook events older than %s days.", deleted, days)
     return deleted
+
+
+@contextmanager
+def _invoice_pdf_lock(invoice_id: str):
+    """Yield whether this worker holds the PDF lock for ``invoice_id``.
+
+    The lock is session-level, so no transaction stays open while the PDF downloads.
+    Other databases have no advisory locks and always yield ``True``.
+    """
+
+    if connection.vendor != "postgresql":
+        yield True
+        return
+
+    key = f"billing:invoice_pdf:{invoice_id}"
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [key])
+        acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [key])
+
+
+@shared_task(queue="billing")
+def generate_invoice_pdf(invoice_id: str) -> bool:
+    """Download or render the PDF for ``invoice_id`` and persist it to storage."""
+
+    # Concurrent workers (e.g. repeated download polls) must not build the same PDF twice.
+    with _invoice_pdf_lock(invoice_id) as acquired:
+        if not acquired:
+            logger.info("Invoice %s PDF generation already in progress.", invoice_id)
+            return False
+
+        try:
+            invoice = InvoiceRecord.objects.select_related("workspace").filter(pk=invoice_id).first()
+            if invoice is None:
+                logger.warning("Invoice %s disappeared before PDF generation.", invoice_id)
+                return False
+
+            try:
+                resolve_invoice_pdf_sync(invoice)
+            except InvoicePdfError as exc:
+                logger.warning("Invoice %s PDF generation failed: %s", invoice_id, exc)
+                record_invoice_pdf_failure(invoice_id, exc)
+                return False
+        finally:
+            clear_invoice_pdf_queued(invoice_id)
+
+    return True
+
+
+@shared_task(bind=True, queue="billing", autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5)
+def record_refund_task(
+    self,
+    payment_id: str,
+    amount_str: str,
+    currency: str,
+    reason: str,
+    payload: Dict[str, Any],
+    initiator_id: Optional[int] = None,
+) -> Optional[str]:
+    """Persist a Stripe refund locally once the refund request has been acknowledged."""
+
+    payment = PaymentRecord.objects.select_related("workspace", "initiator").filter(pk=payment_id).first()
+    if payment is None:
+        logger.warning("Payment %s disappeared before refund %s was recorded.", payment_id, payload.get("id"))
+        return None
+
+    initiator = User.objects.filter(pk=initiator_id).first() if initiator_id is not None else None
+    refund = record_refund(
+        payment=payment,
+        amount=Decimal(amount_str),
+        currency=currency,
+        reason=reason,
+        payload=payload,
+        initiator=initiator,
+    )
+    return str(refund.id)
+
+
+@shared_task(queue="billing")
+def refresh_billing_transaction_rollup() -> bool:
+    """Refresh the daily billing transaction rollup materialized view (PostgreSQL only)."""
+
+    if connection.vendor != "postgresql":
+        return False
+
+    with connection.cursor() as cursor:
+        cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY billing_transaction_daily_rollup")
+
+    logger.info("Refreshed billing transaction daily rollup.")
+    return True
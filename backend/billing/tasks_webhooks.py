@@ -23,6 +23,7 @@ from billing.models import (
     WorkspaceSubscription,
 )
 from billing.services.credit_ledger import CreditAccountNotFound, apply_stripe_balance_delta
+from billing.services.product_catalog import invalidate_catalog
 from billing.services.subscription_lifecycle import assign_billing_owner, apply_local_plan_change
 from billing.services.subscription_toggle import has_manual_auto_renew_flag
 from billing.constants import MANUAL_AUTORENEW_DISABLED_FLAG
@@ -31,6 +32,7 @@ from billing.services.stripe_payments import (
     StripeConfigurationError,
     StripeServiceError,
     _configure_stripe,
+    invalidate_price_cache,
     retrieve_subscription,
 )
 from billing.services.token_ledger import credit
@@ -187,6 +189,11 @@ def dispatch_event(*, event_id: str, event_type: str, payload: Dict[str, Any], r
         "invoice.created": _handle_invoice_created,
         "customer.balance.updated": _handle_customer_balance_updated,
         "customer.subscription.deleted": _handle_subscription_deleted,
+        "product.updated": _handle_catalog_changed,
+        "product.deleted": _handle_catalog_changed,
+        "price.created": _handle_catalog_changed,
+        "price.updated": _handle_catalog_changed,
+        "price.deleted": _handle_catalog_changed,
     }.get(event_type)
 
     if handler is None:
@@ -196,6 +203,18 @@ def dispatch_event(*, event_id: str, event_type: str, payload: Dict[str, Any], r
     return handler(event_id=event_id, payload=payload, received_at=received_at)
 
 
+def _handle_catalog_changed(*, event_id: str, payload: Dict[str, Any], received_at: datetime) -> HandlerResult:
+    # Drops this worker's copy and the shared cache entry; other processes rebuild once their local TTL lapses.
+    invalidate_catalog()
+    stripe_object = (payload.get("data") or {}).get("object") or {}
+    product_id = stripe_object.get("id") if stripe_object.get("object") == "product" else stripe_object.get("product")
+    if isinstance(product_id, dict):
+        product_id = product_id.get("id")
+    if product_id:
+        invalidate_price_cache(product_id)
+    return HandlerResult(status=HandlerResult.PROCESSED, detail="Product catalog invalidated")
+
+
 def _handle_checkout_session_completed(*, event_id: str, payload: Dict[str, Any], received_at: datetime) -> HandlerResult:
     session = (payload.get("data") or {}).get("object") or {}
     metadata = session.get("metadata") or {}
@@ -924,6 +943,7 @@ def _handle_subscription_deleted(*, event_id: str, payload: Dict[str, Any], rece
     subscription_payload = (payload.get("data") or {}).get("object") or {}
     stripe_subscription_id = subscription_payload.get("id")
     customer_id = subscription_payload.get("customer")
+    payment_services.clear_subscription_workspace_cache()
 
     qs = WorkspaceSubscription.objects.select_for_update().select_related("workspace")
     subscription = None
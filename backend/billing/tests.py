@@ -1,8 +1,45 @@
+import json
+from io import StringIO
+from decimal import Decimal
+from unittest import mock
+
 import pytest
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import RequestFactory
+from kombu.exceptions import OperationalError as BrokerOperationalError
 from rest_framework.test import APIClient
 
-from billing.models import UserBillingProfile
+from billing.middleware.idempotency import BillingIdempotencyMiddleware
+from billing.models import (
+    BillingIdempotencyKey,
+    BillingTransaction,
+    InvoiceRecord,
+    PaymentRecord,
+    PlanChangeRequest,
+    RefundRecord,
+    UserBillingProfile,
+    UserCreditTransaction,
+    WorkspacePlan,
+    WorkspaceSubscription,
+)
+from billing.serializers import PlanChangeRequestSerializer
+from billing.services import credit_ledger
+from billing.services import payments as payment_services
+from billing.services import refunds as refund_services
+from billing.services.invoice_pdf import (
+    SIGNED_URL_TTL_SECONDS,
+    InvoicePdfNotFound,
+    ResolvedInvoicePdf,
+    ensure_invoice_pdf_async,
+    pop_invoice_pdf_failure,
+    record_invoice_pdf_failure,
+)
+from billing.tasks import generate_invoice_pdf
+from workspace.models import Workspace
 
 
 @pytest.mark.django_db
@@ -51,3 +88,468 @@ def test_profile_credit_endpoint_reflects_existing_balance():
     assert payload["credit_balance"] == "12.34"
     assert payload["last_stripe_balance"] == "12.34"
     assert payload["user"]["email"] == "bob@example.com"
+
+
+@pytest.mark.django_db
+def test_plan_change_request_serializer_includes_plan_payloads():
+    user = get_user_model().objects.create_user(
+        username="carol",
+        email="carol@example.com",
+        password="pass1234",
+    )
+    free_plan = WorkspacePlan.objects.get(name="Free")
+    pro_plan = WorkspacePlan.objects.get(name="Pro")
+    change = PlanChangeRequest(
+        from_plan=free_plan,
+        to_plan=pro_plan,
+        requested_by=user,
+        change_type="upgrade",
+        effective_timing="immediate",
+        status="pending",
+    )
+
+    payload = PlanChangeRequestSerializer(change).data
+
+    assert payload["from_plan"]["key"] == free_plan.key
+    assert payload["to_plan"] == {
+        "id": str(pro_plan.id),
+        "key": pro_plan.key,
+        "name": "Pro",
+        "monthly_price": str(pro_plan.monthly_price),
+        "max_users": pro_plan.max_users,
+        "max_storage_gb": pro_plan.max_storage_gb,
+    }
+    assert payload["requested_by"]["email"] == "carol@example.com"
+
+
+def _idempotent_post(middleware, *, key="idem-1", body=b'{"amount": "5.00"}'):
+    request = RequestFactory().post(
+        "/api/billing/payments/abc/retry/",
+        data=body,
+        content_type="application/json",
+        HTTP_IDEMPOTENCY_KEY=key,
+    )
+    response = middleware.process_request(request)
+    if response is None:
+        response = middleware.process_response(request, HttpResponse(status=202))
+    return response
+
+
+@pytest.mark.django_db
+def test_idempotency_replay_is_rejected_without_shared_cache():
+    cache.clear()
+    middleware = BillingIdempotencyMiddleware(lambda request: HttpResponse(status=202))
+
+    assert _idempotent_post(middleware).status_code == 202
+    # Another worker (or a restarted one) starts with an empty cache.
+    cache.clear()
+
+    response = _idempotent_post(middleware)
+
+    assert response.status_code == 409
+    assert json.loads(response.content)["code"] == "duplicate_request"
+    record = BillingIdempotencyKey.objects.get(key="idem-1")
+    assert record.last_result == BillingIdempotencyKey.LastResult.SUCCESS
+    assert record.response_code == 202
+
+
+@pytest.mark.django_db
+def test_idempotency_key_reused_with_different_payload_conflicts():
+    cache.clear()
+    middleware = BillingIdempotencyMiddleware(lambda request: HttpResponse(status=202))
+
+    assert _idempotent_post(middleware).status_code == 202
+    cached_response = _idempotent_post(middleware, body=b'{"amount": "6.00"}')
+    cache.clear()
+    stored_response = _idempotent_post(middleware, body=b'{"amount": "6.00"}')
+
+    for response in (cached_response, stored_response):
+        assert response.status_code == 409
+        assert json.loads(response.content)["code"] == "idempotency_conflict"
+
+
+@pytest.mark.django_db
+def test_refund_is_recorded_inline_when_the_broker_is_unavailable():
+    cache.clear()
+    user = get_user_model().objects.create_user(
+        username="dave",
+        email="dave@example.com",
+        password="pass1234",
+    )
+    workspace = Workspace.objects.create(name="Refunds", owner=user)
+    WorkspaceSubscription.objects.create(
+        workspace=workspace,
+        plan=WorkspacePlan.objects.get(name="Pro"),
+        billing_owner=user,
+        status="active",
+    )
+    invoice = InvoiceRecord.objects.create(
+        workspace=workspace,
+        stripe_invoice_id="in_refund",
+        status="paid",
+        total_amount=Decimal("10.00"),
+    )
+    payment = PaymentRecord.objects.create(
+        invoice=invoice,
+        workspace=workspace,
+        initiator=user,
+        stripe_payment_intent_id="pi_refund",
+        status="succeeded",
+        amount=Decimal("10.00"),
+        currency="usd",
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    stripe_refund = {"id": "re_inline", "status": "succeeded", "amount": 1000}
+    with mock.patch("billing.views.payments.create_refund", return_value=stripe_refund), mock.patch(
+        "billing.views.payments.record_refund_task.delay",
+        side_effect=BrokerOperationalError("broker unavailable"),
+    ):
+        response = client.post(
+            f"/api/billing/payments/{payment.id}/refund/",
+            {"amount": "10.00"},
+            format="json",
+            HTTP_IDEMPOTENCY_KEY="refund-inline",
+        )
+
+    assert response.status_code == 202
+    data = response.json()
+    refund = RefundRecord.objects.get(stripe_refund_id="re_inline")
+    assert data["refund"]["id"] == str(refund.id)
+    assert data["payment"]["status"] == PaymentRecord.Status.REFUNDED
+    assert BillingTransaction.objects.filter(refund=refund, amount=Decimal("10.00")).exists()
+
+
+@pytest.mark.django_db
+def test_invoice_pdf_failure_is_reported_once_from_the_database():
+    invoice = InvoiceRecord.objects.create(
+        stripe_invoice_id="in_pdf_missing",
+        status="paid",
+        total_amount=Decimal("10.00"),
+    )
+
+    record_invoice_pdf_failure(invoice.id, InvoicePdfNotFound("No PDF available."))
+    invoice.refresh_from_db()
+
+    assert pop_invoice_pdf_failure(invoice) == {"not_found": True, "message": "No PDF available."}
+    invoice.refresh_from_db()
+    assert invoice.pdf_failure == ""
+    assert pop_invoice_pdf_failure(invoice) is None
+
+
+@pytest.mark.django_db
+def test_invoice_pdf_is_queued_once_until_the_build_finishes():
+    cache.clear()
+    invoice = InvoiceRecord.objects.create(
+        stripe_invoice_id="in_pdf_queue",
+        status="paid",
+        total_amount=Decimal("10.00"),
+    )
+
+    with mock.patch("billing.tasks.generate_invoice_pdf.delay") as delay:
+        ensure_invoice_pdf_async(invoice.id)
+        ensure_invoice_pdf_async(invoice.id)
+        assert delay.call_count == 1
+
+        with mock.patch("billing.tasks.resolve_invoice_pdf_sync"):
+            assert generate_invoice_pdf(str(invoice.id)) is True
+        ensure_invoice_pdf_async(invoice.id)
+        assert delay.call_count == 2
+
+
+def _credit_profile(username: str, *, stripe_customer_id: str = "") -> UserBillingProfile:
+    user = get_user_model().objects.create_user(
+        username=username,
+        email=f"{username}@example.com",
+        password="pass1234",
+    )
+    profile = UserBillingProfile.get_or_create_for_user(user)
+    if stripe_customer_id:
+        profile.stripe_customer_id = stripe_customer_id
+        profile.save(update_fields=["stripe_customer_id", "updated_at"])
+    return profile
+
+
+@pytest.mark.django_db
+def test_manual_adjustment_retries_when_the_profile_version_moves():
+    profile = _credit_profile("erin")
+    apply_balance_delta = credit_ledger._apply_balance_delta
+    calls = []
+
+    def bump_version_once(current, *args, **kwargs):
+        if not calls:
+            UserBillingProfile.objects.filter(pk=current.pk).update(version=F("version") + 1)
+        calls.append(current.version)
+        return apply_balance_delta(current, *args, **kwargs)
+
+    with mock.patch.object(credit_ledger, "_apply_balance_delta", side_effect=bump_version_once):
+        result = credit_ledger.record_manual_adjustment(profile=profile, amount="5.00", reason="goodwill")
+
+    assert len(calls) == 2
+    assert result.created is True
+    assert UserCreditTransaction.objects.filter(profile=profile).count() == 1
+    profile.refresh_from_db()
+    assert profile.credit_balance == Decimal("5.00")
+
+
+@pytest.mark.django_db
+def test_manual_adjustment_with_reused_idempotency_key_returns_existing_transaction():
+    profile = _credit_profile("frank")
+
+    first = credit_ledger.record_manual_adjustment(
+        profile=profile, amount="5.00", reason="goodwill", idempotency_key="adj-1"
+    )
+    second = credit_ledger.record_manual_adjustment(
+        profile=profile, amount="5.00", reason="goodwill", idempotency_key="adj-1"
+    )
+
+    assert first.created is True
+    assert second.created is False
+    assert second.transaction.pk == first.transaction.pk
+    profile.refresh_from_db()
+    assert profile.credit_balance == Decimal("5.00")
+
+
+@pytest.mark.django_db
+def test_replayed_stripe_balance_event_returns_existing_transaction():
+    profile = _credit_profile("grace", stripe_customer_id="cus_grace")
+
+    first = credit_ledger.apply_stripe_balance_delta(
+        event_id="evt_balance", stripe_customer_id="cus_grace", new_balance_minor=500
+    )
+    replay = credit_ledger.apply_stripe_balance_delta(
+        event_id="evt_balance", stripe_customer_id="cus_grace", new_balance_minor=900
+    )
+
+    assert first.created is True
+    assert replay.created is False
+    assert replay.transaction.pk == first.transaction.pk
+    assert replay.delta == Decimal("5.00")
+    profile.refresh_from_db()
+    assert profile.credit_balance == Decimal("5.00")
+
+
+@pytest.mark.django_db
+def test_replayed_stripe_balance_event_with_zero_delta_keeps_sync_markers():
+    profile = _credit_profile("ivan", stripe_customer_id="cus_ivan")
+    first = credit_ledger.apply_stripe_balance_delta(
+        event_id="evt_same", stripe_customer_id="cus_ivan", new_balance_minor=500
+    )
+    profile.refresh_from_db()
+    synced_at = profile.last_synced_at
+
+    replay = credit_ledger.apply_stripe_balance_delta(
+        event_id="evt_same", stripe_customer_id="cus_ivan", new_balance_minor=500
+    )
+
+    assert replay.created is False
+    assert replay.transaction.pk == first.transaction.pk
+    assert replay.delta == Decimal("5.00")
+    profile.refresh_from_db()
+    assert profile.last_synced_at == synced_at
+
+
+@pytest.mark.django_db
+def test_balance_write_conflict_after_exhausting_retries():
+    profile = _credit_profile("heidi")
+
+    with mock.patch.object(credit_ledger, "_apply_balance_delta", side_effect=credit_ledger._StaleBalance):
+        with pytest.raises(credit_ledger.BalanceWriteConflict):
+            credit_ledger.record_manual_adjustment(profile=profile, amount="5.00", reason="goodwill")
+
+    assert not UserCreditTransaction.objects.filter(profile=profile).exists()
+    profile.refresh_from_db()
+    assert profile.credit_balance == Decimal("0.00")
+
+
+def _paid_invoice_payload(workspace, *, invoice_id: str, intent_id: str) -> dict:
+    return {
+        "id": invoice_id,
+        "status": "paid",
+        "customer": "cus_batch",
+        "currency": "usd",
+        "total": 2500,
+        "amount_paid": 2500,
+        "amount_due": 0,
+        "payment_intent": intent_id,
+        "metadata": {"workspace_id": str(workspace.id)},
+    }
+
+
+@pytest.mark.django_db
+def test_paid_invoice_batch_writes_invoices_payments_and_ledger_rows():
+    user = get_user_model().objects.create_user(username="judy", email="judy@example.com", password="pass1234")
+    workspace = Workspace.objects.create(name="Batch", owner=user)
+    payloads = [
+        _paid_invoice_payload(workspace, invoice_id=f"in_batch_{index}", intent_id=f"pi_batch_{index}")
+        for index in range(3)
+    ]
+
+    results = payment_services.process_invoice_paid_events([(payload, user) for payload in payloads])
+
+    assert [result.invoice.stripe_invoice_id for result in results] == ["in_batch_0", "in_batch_1", "in_batch_2"]
+    for result in results:
+        stored = InvoiceRecord.objects.get(stripe_invoice_id=result.invoice.stripe_invoice_id)
+        assert stored.pk == result.invoice.pk
+        assert stored.total_amount == Decimal("25.00")
+        assert PaymentRecord.objects.get(pk=result.payment.pk).invoice_id == stored.pk
+        assert BillingTransaction.objects.filter(invoice=stored).count() == 1
+
+
+@pytest.mark.django_db
+def test_paid_invoice_batch_rebinds_rows_inserted_concurrently():
+    user = get_user_model().objects.create_user(username="kim", email="kim@example.com", password="pass1234")
+    workspace = Workspace.objects.create(name="Race", owner=user)
+    payload = _paid_invoice_payload(workspace, invoice_id="in_race", intent_id="pi_race")
+    real_in_bulk = InvoiceRecord.objects.in_bulk
+
+    def insert_behind_lookup(*args, **kwargs):
+        # Another worker stores the invoice after this batch has looked for it.
+        InvoiceRecord.objects.create(
+            workspace=workspace,
+            stripe_invoice_id="in_race",
+            status="open",
+            total_amount=Decimal("25.00"),
+        )
+        real_in_bulk(*args, **kwargs)
+        return {}
+
+    with mock.patch.object(InvoiceRecord.objects, "in_bulk", side_effect=insert_behind_lookup):
+        [result] = payment_services.process_invoice_paid_events([(payload, user)])
+
+    stored = InvoiceRecord.objects.get(stripe_invoice_id="in_race")
+    assert result.invoice.pk == stored.pk
+    assert stored.status == "paid"
+    assert PaymentRecord.objects.get(stripe_payment_intent_id="pi_race").invoice_id == stored.pk
+    assert BillingTransaction.objects.get(invoice=stored).payment_id == result.payment.pk
+
+
+@pytest.mark.django_db
+def test_refund_batch_rebinds_refunds_inserted_concurrently():
+    user = get_user_model().objects.create_user(username="lee", email="lee@example.com", password="pass1234")
+    workspace = Workspace.objects.create(name="Refund race", owner=user)
+    invoice = InvoiceRecord.objects.create(
+        workspace=workspace,
+        stripe_invoice_id="in_refund_race",
+        status="paid",
+        total_amount=Decimal("10.00"),
+    )
+    payment = PaymentRecord.objects.create(
+        invoice=invoice,
+        workspace=workspace,
+        initiator=user,
+        stripe_payment_intent_id="pi_refund_race",
+        status="succeeded",
+        amount=Decimal("10.00"),
+        currency="usd",
+    )
+    refund_kwargs = {
+        "payment": payment,
+        "amount": Decimal("10.00"),
+        "currency": "usd",
+        "reason": "",
+        "payload": {"id": "re_race", "status": "succeeded"},
+    }
+    lookup = mock.Mock()
+
+    def insert_behind_lookup(*args, **kwargs):
+        # The API request stores the pending refund after the task has looked for it.
+        refund_services.create_pending_refund(**refund_kwargs)
+        return {}
+
+    lookup.in_bulk.side_effect = insert_behind_lookup
+    with mock.patch.object(RefundRecord.objects, "select_related", return_value=lookup):
+        refund = refund_services.record_refund(**refund_kwargs)
+
+    stored = RefundRecord.objects.get(stripe_refund_id="re_race")
+    assert refund.pk == stored.pk
+    assert BillingTransaction.objects.get(refund=stored).amount == Decimal("10.00")
+
+
+@pytest.mark.django_db
+def test_invoice_sync_command_isolates_a_bad_invoice_payload():
+    user = get_user_model().objects.create_user(username="max", email="max@example.com", password="pass1234")
+    plan = WorkspacePlan.objects.get(name="Pro")
+    invoices = {}
+    for name in ("good", "bad"):
+        workspace = Workspace.objects.create(name=f"Sync {name}", owner=user)
+        WorkspaceSubscription.objects.create(
+            workspace=workspace,
+            plan=plan,
+            billing_owner=user,
+            status="active",
+            stripe_subscription_id=f"sub_{name}",
+        )
+        invoices[f"in_{name}"] = _paid_invoice_payload(workspace, invoice_id=f"in_{name}", intent_id=f"pi_{name}")
+    invoices["in_bad"]["amount_paid"] = "not-a-number"
+
+    def retrieve_subscription(subscription_id, **kwargs):
+        return {"latest_invoice": subscription_id.replace("sub_", "in_")}
+
+    def retrieve_invoice(invoice_id):
+        return mock.Mock(to_dict_recursive=mock.Mock(return_value=invoices[invoice_id]))
+
+    out = StringIO()
+    with mock.patch("billing.management.commands.sync_subscription_invoices._configure_stripe"), mock.patch(
+        "stripe.Subscription.retrieve", side_effect=retrieve_subscription
+    ), mock.patch("stripe.Invoice.retrieve", side_effect=retrieve_invoice):
+        call_command("sync_subscription_invoices", stdout=out)
+
+    assert InvoiceRecord.objects.filter(stripe_invoice_id="in_good", status="paid").exists()
+    assert not InvoiceRecord.objects.filter(stripe_invoice_id="in_bad").exists()
+    assert "Synced 1 invoices" in out.getvalue()
+    assert "Encountered 1 errors" in out.getvalue()
+
+
+@pytest.mark.django_db
+def test_subscription_active_status_is_current_before_and_after_save():
+    user = get_user_model().objects.create_user(username="nia", email="nia@example.com", password="pass1234")
+    subscription = WorkspaceSubscription(
+        workspace=Workspace.objects.create(name="Status", owner=user),
+        plan=WorkspacePlan.objects.get(name="Pro"),
+        billing_owner=user,
+        status="trialing",
+    )
+    assert subscription.has_active_status
+
+    subscription.save()
+    subscription.status = "past_due"
+    assert not subscription.has_active_status
+    assert subscription.is_active
+
+    subscription.save()
+    assert not subscription.is_active
+    assert not WorkspaceSubscription.objects.get(pk=subscription.pk).is_active
+
+
+@pytest.mark.django_db
+def test_invoice_pdf_in_object_storage_returns_the_signed_url():
+    user = get_user_model().objects.create_user(username="oli", email="oli@example.com", password="pass1234")
+    invoice = InvoiceRecord.objects.create(
+        workspace=Workspace.objects.create(name="Signed PDF", owner=user),
+        stripe_invoice_id="in_pdf_signed",
+        status="paid",
+        total_amount=Decimal("10.00"),
+        initiator=user,
+        pdf_storage_path="billing/invoices/in_pdf_signed.pdf",
+    )
+    resolved = ResolvedInvoicePdf(
+        storage_path=invoice.pdf_storage_path,
+        filename="in_pdf_signed.pdf",
+        size=1024,
+        is_absolute=False,
+        signed_url="https://bucket.example.com/in_pdf_signed.pdf?signature=abc",
+    )
+
+    client = APIClient()
+    client.force_authenticate(user=user)
+    with mock.patch("billing.views.invoice_pdf.find_stored_invoice_pdf", return_value=resolved):
+        response = client.get(f"/api/billing/invoices/{invoice.id}/pdf/")
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "url": "https://bucket.example.com/in_pdf_signed.pdf?signature=abc",
+        "filename": "in_pdf_signed.pdf",
+        "expires_in": SIGNED_URL_TTL_SECONDS,
+    }
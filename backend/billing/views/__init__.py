@@ -114,6 +114,7 @@ class WorkspaceTokenProductListView(APIView):
             user=request.user,
             workspace_id=workspace_id,
             level=BillingPermissionLevel.MANAGE_TOKENS,
+            request=request,
         )
         request.workspace = workspace
         request.workspace_permissions = permissions
@@ -160,6 +161,7 @@ class WorkspaceTokenPurchaseView(APIView):
             user=request.user,
             workspace_id=workspace_id,
             level=BillingPermissionLevel.MANAGE_TOKENS,
+            request=request,
         )
         request.workspace = workspace
         request.workspace_permissions = permissions
@@ -24,6 +24,7 @@ class WorkspaceBillingAuditLogViewSet(ReadOnlyModelViewSet):
             user=self.request.user,
             workspace_id=self.kwargs["workspace_id"],
             level=BillingPermissionLevel.VIEW_BILLING,
+            request=self.request,
         )
         self.request.workspace = workspace
-        return BillingAuditLog.objects.filter(workspace=workspace).order_by("-created_at")
+        return BillingAuditLog.all_fields.filter(workspace=workspace).order_by("-created_at")
@@ -13,7 +13,15 @@ from rest_framework.views import APIView
 
 from billing.models import BillingAuditLog, InvoiceRecord
 from billing.permissions import BillingPermissionLevel, check_workspace_billing_permission
-from billing.services.invoice_pdf import resolve_invoice_pdf, InvoicePdfError, InvoicePdfNotFound
+from billing.services.invoice_pdf import (
+    SIGNED_URL_TTL_SECONDS,
+    ensure_invoice_pdf_async,
+    find_stored_invoice_pdf,
+    pop_invoice_pdf_failure,
+)
+
+
+PDF_PREPARING_RETRY_AFTER_SECONDS = 3
 
 
 class BaseInvoicePdfView(APIView):
@@ -22,27 +30,60 @@ class BaseInvoicePdfView(APIView):
 
     def get(self, request, *args, **kwargs):
         invoice = self._get_invoice(request, *args, **kwargs)
-        try:
-            resolved = resolve_invoice_pdf(invoice)
-            file_handle = self._open_pdf(resolved)
-        except InvoicePdfNotFound:
-            return self._error_response(
-                status=status.HTTP_404_NOT_FOUND,
-                code="invoice_pdf_not_found",
-                message=translate("Invoice PDF is not available."),
+        resolved = find_stored_invoice_pdf(invoice)
+        if resolved is None:
+            failure = pop_invoice_pdf_failure(invoice)
+            if failure is not None and failure["not_found"]:
+                return self._error_response(
+                    status=status.HTTP_404_NOT_FOUND,
+                    code="invoice_pdf_not_found",
+                    message=translate("Invoice PDF is not available."),
+                    request=request,
+                    invoice=invoice,
+                    result="not_found",
+                )
+            if failure is not None:
+                return self._error_response(
+                    status=status.HTTP_502_BAD_GATEWAY,
+                    code="invoice_pdf_fetch_failed",
+                    message=failure["message"],
+                    request=request,
+                    invoice=invoice,
+                    result="failed",
+                )
+
+            ensure_invoice_pdf_async(invoice.id)
+            response = self._error_response(
+                status=status.HTTP_202_ACCEPTED,
+                code="invoice_pdf_preparing",
+                message=translate("Invoice PDF is being prepared. Please retry shortly."),
                 request=request,
                 invoice=invoice,
-                result="not_found",
+                result="preparing",
             )
-        except InvoicePdfError as exc:
-            return self._error_response(
-                status=status.HTTP_502_BAD_GATEWAY,
-                code="invoice_pdf_fetch_failed",
-                message=str(exc),
+            response["Retry-After"] = str(PDF_PREPARING_RETRY_AFTER_SECONDS)
+            return response
+
+        if resolved.signed_url:
+            # Object storage serves the bytes directly; nothing streams through Django.
+            # The URL is returned rather than redirected to so the client navigates to it
+            # instead of following it with a credentialed cross-origin fetch.
+            self._record_audit(
                 request=request,
                 invoice=invoice,
-                result="failed",
+                storage_path=resolved.storage_path,
+                result="success",
+            )
+            return JsonResponse(
+                {
+                    "url": resolved.signed_url,
+                    "filename": resolved.filename,
+                    "expires_in": SIGNED_URL_TTL_SECONDS,
+                }
             )
+
+        try:
+            file_handle = self._open_pdf(resolved)
         except OSError:
             return self._error_response(
                 status=status.HTTP_404_NOT_FOUND,
@@ -130,6 +171,7 @@ class WorkspaceInvoicePdfView(BaseInvoicePdfView):
             user=request.user,
             workspace_id=workspace_id,
             level=BillingPermissionLevel.VIEW_BILLING,
+            request=request,
         )
 
         try:
@@ -1,9 +1,11 @@
 """Payment retry and refund endpoints."""
 from __future__ import annotations
 
+import logging
 from decimal import Decimal
 
 from django.conf import settings
+from kombu.exceptions import OperationalError as BrokerOperationalError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
@@ -13,10 +15,10 @@ from billing.filters import PaymentRecordFilter
 from billing.models import PaymentRecord, WorkspaceSubscription
 from billing.observability.logging import log_billing_event
 from billing.observability.metrics import (
-    BILLING_REQUEST_COUNT,
-    BILLING_REQUEST_LATENCY,
-    PAYMENT_FAILURE_COUNT,
     PAYMENT_SUCCESS_COUNT,
+    payment_failure_counter,
+    request_counter,
+    request_latency,
 )
 from billing.pagination import BoundedPageNumberPagination
 from billing.permissions import BillingPermissionLevel, check_workspace_billing_permission
@@ -27,8 +29,11 @@ from billing.serializers import (
     RefundRecordSerializer,
 )
 from billing.services import payments as payment_services
-from billing.services.refunds import record_refund
+from billing.services.refunds import create_pending_refund, record_refund
 from billing.services.stripe_payments import StripeServiceError, create_refund, pay_invoice
+from billing.tasks import record_refund_task
+
+logger = logging.getLogger(__name__)
 
 
 class BillingMetricsMixin:
@@ -36,11 +41,7 @@ class BillingMetricsMixin:
     method: str = "POST"
 
     def _record_request(self, status: int) -> None:
-        BILLING_REQUEST_COUNT.labels(
-            endpoint=self.endpoint_label,
-            method=self.method,
-            status=str(status),
-        ).inc()
+        request_counter(self.endpoint_label, self.method, str(status)).inc()
 
     def _success_response(
         self,
@@ -52,7 +53,7 @@ class BillingMetricsMixin:
     ):
         self._record_request(status)
         if workspace_id:
-            PAYMENT_SUCCESS_COUNT.labels(workspace_id=workspace_id).inc()
+            PAYMENT_SUCCESS_COUNT.inc()
         log_billing_event(message=message, workspace_id=workspace_id)
         return Response(payload, status=status)
 
@@ -68,7 +69,7 @@ class BillingMetricsMixin:
     ):
         self._record_request(status)
         if workspace_id and failure_reason:
-            PAYMENT_FAILURE_COUNT.labels(workspace_id=workspace_id, reason=failure_reason).inc()
+            payment_failure_counter(failure_reason).inc()
         log_billing_event(
             message=message,
             workspace_id=workspace_id,
@@ -95,7 +96,7 @@ class UserPaymentViewSet(ReadOnlyModelViewSet):
     def get_queryset(self):
         user = self.request.user
         return (
-            PaymentRecord.objects.select_related("invoice", "workspace", "initiator")
+            PaymentRecordSerializer.setup_eager_loading(PaymentRecord.active_objects.all())
             .filter(initiator=user)
             .order_by("-created_at")
         )
@@ -116,6 +117,7 @@ class WorkspacePaymentViewSet(ReadOnlyModelViewSet):
             user=self.request.user,
             workspace_id=self.kwargs["workspace_id"],
             level=BillingPermissionLevel.VIEW_BILLING,
+            request=self.request,
         )
         self.request.workspace = workspace
         try:
@@ -124,7 +126,7 @@ class WorkspacePaymentViewSet(ReadOnlyModelViewSet):
             return PaymentRecord.objects.none()
 
         return (
-            PaymentRecord.objects.select_related("invoice", "workspace", "initiator")
+            PaymentRecordSerializer.setup_eager_loading(PaymentRecord.active_objects.all())
             .filter(workspace=workspace, initiator=self.request.user)
             .order_by("-created_at")
         )
@@ -135,7 +137,7 @@ class PaymentRetryView(BillingMetricsMixin, APIView):
     endpoint_label = "payments.retry"
 
     def post(self, request, payment_id, workspace_id=None):
-        with BILLING_REQUEST_LATENCY.labels(endpoint=self.endpoint_label, method=self.method).time():
+        with request_latency(self.endpoint_label, self.method).time():
             if not getattr(settings, "BILLING_API_WRITE_ENABLED", True):
                 return self._error_response(
                     status=503,
@@ -193,6 +195,7 @@ class PaymentRetryView(BillingMetricsMixin, APIView):
                     user=request.user,
                     workspace_id=workspace_id,
                     level=BillingPermissionLevel.MANAGE_BILLING,
+                    request=request,
                 )
                 if payment.workspace_id != workspace.id:
                     return self._error_response(
@@ -279,7 +282,7 @@ class PaymentRefundView(BillingMetricsMixin, APIView):
     endpoint_label = "payments.refund"
 
     def post(self, request, payment_id, workspace_id=None):
-        with BILLING_REQUEST_LATENCY.labels(endpoint=self.endpoint_label, method=self.method).time():
+        with request_latency(self.endpoint_label, self.method).time():
             if not getattr(settings, "BILLING_API_WRITE_ENABLED", True):
                 return self._error_response(
                     status=503,
@@ -328,6 +331,7 @@ class PaymentRefundView(BillingMetricsMixin, APIView):
                     user=request.user,
                     workspace_id=workspace_id,
                     level=BillingPermissionLevel.MANAGE_BILLING,
+                    request=request,
                 )
                 if payment.workspace_id != workspace.id:
                     return self._error_response(
@@ -397,6 +401,7 @@ class PaymentRefundView(BillingMetricsMixin, APIView):
                     currency=currency,
                     reason=data.get("reason"),
                     metadata=data.get("metadata", {}),
+                    as_dict=True,
                 )
             except StripeServiceError as exc:
                 return self._error_response(
@@ -407,14 +412,30 @@ class PaymentRefundView(BillingMetricsMixin, APIView):
                     failure_reason="stripe_error",
                 )
 
-            refund = record_refund(
-                payment=payment,
-                amount=amount,
-                currency=currency,
-                reason=data.get("reason", ""),
-                payload=refund_payload,
-                initiator=request.user,
-            )
+            # Stripe has already moved the money, so the refund row and payment status are
+            # written before responding; only the ledger entry is left to a worker.
+            refund_kwargs = {
+                "payment": payment,
+                "amount": amount,
+                "currency": currency,
+                "reason": data.get("reason", ""),
+                "initiator": request.user,
+            }
+            refund = create_pending_refund(payload=refund_payload, **refund_kwargs)
+            if not refund_payload.get("id"):
+                refund_payload = {**refund_payload, "id": refund.stripe_refund_id}
+            try:
+                record_refund_task.delay(
+                    str(payment.id),
+                    str(amount),
+                    currency,
+                    data.get("reason", ""),
+                    refund_payload,
+                    request.user.pk,
+                )
+            except BrokerOperationalError:
+                logger.exception("Unable to queue refund %s; recording it inline.", refund.stripe_refund_id)
+                refund = record_refund(payload=refund_payload, **refund_kwargs)
 
             response_payload = {
                 "payment": PaymentRecordSerializer(payment, context={"request": request}).data,
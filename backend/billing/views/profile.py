@@ -6,7 +6,7 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from billing.models import UserBillingProfile, WorkspaceSubscription
-from billing.serializers import UserBillingProfileSerializer, WorkspaceSubscriptionSerializer
+from billing.serializers import UserBillingProfileSerializer, WorkspaceSubscriptionSerializer, plan_payload_prefetch
 
 
 class UserBillingProfileCreditView(APIView):
@@ -33,9 +33,9 @@ class UserWorkspaceSubscriptionListView(APIView):
             Workspace.objects.filter(memberships__user=request.user, memberships__is_active=True)
             .select_related(
                 'subscription__plan',
-                'subscription__pending_plan',
                 'subscription__billing_owner',
             )
+            .prefetch_related(plan_payload_prefetch('subscription__pending_plan'))
             .distinct()
             .order_by('name')
         )
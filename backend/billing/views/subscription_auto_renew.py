@@ -56,7 +56,9 @@ class WorkspaceAutoRenewView(APIView):
         )
 
     def _get_subscription(self, user, workspace_id: str, level: BillingPermissionLevel) -> WorkspaceSubscription:
-        workspace, _perms = check_workspace_billing_permission(user=user, workspace_id=workspace_id, level=level)
+        workspace, _perms = check_workspace_billing_permission(
+            user=user, workspace_id=workspace_id, level=level, request=self.request
+        )
         try:
             subscription = WorkspaceSubscription.objects.select_related("workspace", "plan").get(workspace=workspace)
         except WorkspaceSubscription.DoesNotExist as exc:
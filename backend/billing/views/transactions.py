@@ -6,7 +6,7 @@ from rest_framework.viewsets import ReadOnlyModelViewSet
 
 from billing.filters import BillingTransactionFilter
 from billing.models import BillingTransaction
-from billing.pagination import BoundedPageNumberPagination
+from billing.pagination import BillingCursorPagination
 from billing.permissions import BillingPermissionLevel, check_workspace_billing_permission
 from billing.serializers import BillingTransactionSerializer
 
@@ -14,7 +14,7 @@ from billing.serializers import BillingTransactionSerializer
 class UserBillingTransactionViewSet(ReadOnlyModelViewSet):
     serializer_class = BillingTransactionSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = BoundedPageNumberPagination
+    pagination_class = BillingCursorPagination
     filterset_class = BillingTransactionFilter
     ordering_fields = ("occurred_at", "amount", "created_at", "category")
     ordering = ("-occurred_at", "-created_at")
@@ -22,7 +22,7 @@ class UserBillingTransactionViewSet(ReadOnlyModelViewSet):
     def get_queryset(self):
         user = self.request.user
         return (
-            BillingTransaction.objects.select_related("workspace", "user", "initiator", "invoice", "payment")
+            BillingTransaction.active_objects.with_sources()
             .filter(initiator=user)
             .order_by("-occurred_at", "-created_at")
         )
@@ -31,7 +31,7 @@ class UserBillingTransactionViewSet(ReadOnlyModelViewSet):
 class WorkspaceBillingTransactionViewSet(ReadOnlyModelViewSet):
     serializer_class = BillingTransactionSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = BoundedPageNumberPagination
+    pagination_class = BillingCursorPagination
     filterset_class = BillingTransactionFilter
     ordering_fields = ("occurred_at", "amount", "created_at", "category")
     ordering = ("-occurred_at", "-created_at")
@@ -41,10 +41,11 @@ class WorkspaceBillingTransactionViewSet(ReadOnlyModelViewSet):
             user=self.request.user,
             workspace_id=self.kwargs["workspace_id"],
             level=BillingPermissionLevel.VIEW_BILLING,
+            request=self.request,
         )
         self.request.workspace = workspace
         return (
-            BillingTransaction.objects.select_related("workspace", "user", "initiator", "invoice", "payment")
+            BillingTransaction.active_objects.with_sources()
             .filter(workspace=workspace)
             .order_by("-occurred_at", "-created_at")
         )
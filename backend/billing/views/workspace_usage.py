@@ -25,6 +25,7 @@ class WorkspaceUsageView(APIView):
             user=request.user,
             workspace_id=workspace_id,
             level=BillingPermissionLevel.VIEW_BASIC,
+            request=request,
         )
 
         member_count = workspace.memberships.filter(is_active=True).count()
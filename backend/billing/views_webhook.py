@@ -88,29 +88,28 @@ def _record_event_receipt(event_id: Optional[str], event_type: Optional[str], pa
         logger.warning("Received Stripe event without identifier; proceeding without idempotency log.")
         return None, False
 
+    log_entry, created = WebhookEventLog.record(
+        {"id": event_id, "type": event_type},
+        payload_hash=payload_hash,
+    )
+    if created:
+        return log_entry, False
+    if log_entry.handled:
+        return log_entry, True
+
     with transaction.atomic():
-        log_entry = WebhookEventLog.objects.select_for_update().filter(event_id=event_id).first()
-        if log_entry:
-            if log_entry.handled:
-                return log_entry, True
-
-            log_entry.event_type = event_type or log_entry.event_type
-            log_entry.status = WebhookEventLog.Status.RECEIVED
-            log_entry.last_error = ""
-            log_entry.processed_at = None
-            if payload_hash:
-                log_entry.payload_hash = payload_hash
-            if not log_entry.idempotency_key:
-                log_entry.idempotency_key = event_id
-            log_entry.handled = False
-            log_entry.save(update_fields=["event_type", "status", "last_error", "processed_at", "payload_hash", "idempotency_key", "handled"])
-            return log_entry, False
-
-        log_entry = WebhookEventLog.objects.create(
-            event_id=event_id,
-            event_type=event_type or "",
-            status=WebhookEventLog.Status.RECEIVED,
-            payload_hash=payload_hash or "",
-            idempotency_key=event_id,
-        )
+        log_entry = WebhookEventLog.objects.select_for_update().get(pk=log_entry.pk)
+        if log_entry.handled:
+            return log_entry, True
+
+        log_entry.event_type = event_type or log_entry.event_type
+        log_entry.status = WebhookEventLog.Status.RECEIVED
+        log_entry.last_error = ""
+        log_entry.processed_at = None
+        if payload_hash:
+            log_entry.payload_hash = payload_hash
+        if not log_entry.idempotency_key:
+            log_entry.idempotency_key = event_id
+        log_entry.handled = False
+        log_entry.save(update_fields=["event_type", "status", "last_error", "processed_at", "payload_hash", "idempotency_key", "handled"])
         return log_entry, False
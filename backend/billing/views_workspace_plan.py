@@ -91,6 +91,7 @@ class WorkspacePlanListView(APIView):
                 user=request.user,
                 workspace_id=workspace_id,
                 level=BillingPermissionLevel.VIEW_BASIC,
+                request=request,
             )
         except Workspace.DoesNotExist:
             return Response(
@@ -142,6 +143,7 @@ class WorkspaceSubscriptionView(APIView):
                 user=request.user,
                 workspace_id=workspace_id,
                 level=BillingPermissionLevel.VIEW_BILLING,
+                request=request,
             )
         except Workspace.DoesNotExist:
             return Response(
@@ -150,9 +152,10 @@ class WorkspaceSubscriptionView(APIView):
             )
         permissions  # keep reference for linters
 
-        try:
-            subscription = workspace.subscription
-        except WorkspaceSubscription.DoesNotExist:
+        subscription = WorkspaceSubscriptionSerializer.setup_eager_loading(
+            WorkspaceSubscription.objects.filter(workspace=workspace)
+        ).first()
+        if subscription is None:
             return Response(status=status.HTTP_204_NO_CONTENT)
 
         serializer = WorkspaceSubscriptionSerializer(
@@ -177,6 +180,7 @@ class WorkspacePlanPurchaseView(APIView):
                 user=request.user,
                 workspace_id=workspace_id,
                 level=BillingPermissionLevel.MANAGE_BILLING,
+                request=request,
             )
         except Workspace.DoesNotExist:
             return Response(
@@ -315,6 +319,7 @@ class WorkspacePlanPurchaseView(APIView):
                 user=request.user,
                 workspace_id=workspace_id,
                 level=BillingPermissionLevel.MANAGE_BILLING,
+                request=request,
             )
         except Workspace.DoesNotExist:
             return Response(
@@ -425,6 +430,7 @@ class WorkspaceSubscriptionOwnerView(APIView):
             user=request.user,
             workspace_id=workspace_id,
             level=BillingPermissionLevel.MANAGE_BILLING,
+            request=request,
         )
         try:
             subscription = workspace.subscription
@@ -454,6 +460,7 @@ class WorkspaceSubscriptionOwnerView(APIView):
             user=request.user,
             workspace_id=workspace_id,
             level=BillingPermissionLevel.MANAGE_BILLING,
+            request=request,
         )
         try:
             subscription = workspace.subscription
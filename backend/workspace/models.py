@@ -310,6 +310,12 @@ class Membership(models.Model):
             models.Index(fields=['workspace', 'role', 'is_active']),
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['invited_by']),
+            # Billing permission checks look up the active membership per (user, workspace)
+            models.Index(
+                fields=['user', 'workspace'],
+                condition=models.Q(is_active=True),
+                name='ws_membership_active_idx',
+            ),
         ]
         constraints = [
                 # Every workspace should only one owner
@@ -996,9 +996,12 @@ export function useReleaseWorkspaceBillingOwner(workspaceId: string) {
   });
 }
 
+const INVOICE_PDF_MAX_POLLS = 10;
+
 /**
  * Download invoice PDF
- * Returns blob URL for download
+ * Returns a blob URL, or a short-lived signed storage URL when the PDF lives in
+ * object storage. Signed URLs are cross-origin: open them, do not fetch them.
  */
 export async function downloadInvoicePDF(
   invoiceId: string,
@@ -1009,16 +1012,31 @@ export async function downloadInvoicePDF(
     ? `/api/billing/workspaces/${workspaceId}/billing/invoices/${invoiceId}/pdf`
     : `/api/billing/invoices/${invoiceId}/pdf/`;
 
-  const res = await fetch(url, {
-    credentials: 'include',
-  });
+  // The backend answers 202 while the PDF is still being fetched/rendered in the background.
+  for (let attempt = 0; attempt < INVOICE_PDF_MAX_POLLS; attempt += 1) {
+    const res = await fetch(url, {
+      credentials: 'include',
+    });
 
-  if (!res.ok) {
-    await handleErrorResponse(res);
+    if (!res.ok) {
+      await handleErrorResponse(res);
+    }
+
+    if (res.status !== 202) {
+      if (res.headers.get('Content-Type')?.includes('application/json')) {
+        const data: { url: string } = await res.json();
+        return data.url;
+      }
+      const blob = await res.blob();
+      return URL.createObjectURL(blob);
+    }
+
+    const retryAfter = Number(res.headers.get('Retry-After'));
+    const delaySeconds = Number.isFinite(retryAfter) && retryAfter > 0 ? retryAfter : 2;
+    await new Promise((resolve) => setTimeout(resolve, delaySeconds * 1000));
   }
 
-  const blob = await res.blob();
-  return URL.createObjectURL(blob);
+  throw new Error('Invoice PDF is still being prepared. Please try again shortly.');
 }
 
 function normalizeCurrencyCode(value?: string | null): string {
@@ -84,6 +84,9 @@ export default function InvoicesTab({
       const blobUrl = await downloadInvoicePDF(invoice.id, isWorkspaceScope ? { workspaceId } : undefined);
       const link = document.createElement('a');
       link.href = blobUrl;
+      // Signed storage URLs are cross-origin, where `download` is ignored; open them in a new tab.
+      link.target = '_blank';
+      link.rel = 'noopener';
       link.download = `invoice-${invoice.metadata?.number || invoice.stripe_invoice_id}.pdf`;
       document.body.appendChild(link);
       link.click();
@@ -81,6 +81,9 @@ export default function PaymentsTab({
       );
       const link = document.createElement('a');
       link.href = blobUrl;
+      // Signed storage URLs are cross-origin, where `download` is ignored; open them in a new tab.
+      link.target = '_blank';
+      link.rel = 'noopener';
       link.download = `invoice-${payment.invoice.metadata?.number || payment.invoice.stripe_invoice_id}.pdf`;
       document.body.appendChild(link);
       link.click();